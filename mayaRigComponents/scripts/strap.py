@@ -118,7 +118,7 @@ class Strap(object):
         if rows == 1:
             row_curves = [srf.curve_along_surface(surface_name=surface_name, uv=uv)]
         else:
-            row_curves = srf.curve_along_surface_multi(surface_name=surface_name, rows=rows, uv=uv)
+            row_curves = srf.curve_along_surface_multi(surface_name=surface_name, rows=rows, uv=uv, live=False)
 
         # Create guide locators
         for i, curve in enumerate(row_curves):
@@ -130,7 +130,7 @@ class Strap(object):
             
             ctl_rows[f'row_{str(i)}'] = guides
 
-            [srf.constrain_to_surface_matrix(object_name=guide, surface_name=surface_name) for guide in guides]
+            srf.constrain_to_surface_matrix_batch(objects=guides, surface_name=surface_name)
 
             cmds.parent(transforms, surface_name)
 
@@ -297,7 +297,8 @@ class Strap(object):
                                                    curve_name=surface_curve, lra=lra, suffix=joint_suffix, radius=0.5)
             joint_dict[surface_curve] = joints
         else:
-            surface_curves = srf.curve_along_surface_multi(surface_name=surface_name, rows=joint_rows, uv=uv)
+            surface_curves = srf.curve_along_surface_multi(surface_name=surface_name, rows=joint_rows, uv=uv, 
+                                                            live=False)
             for i, curve in enumerate(surface_curves):
                 joints = crv.create_evenly_along_curve(object_type='joint', object_name=f'{name}_dor', 
                                 count=joint_columns, curve_name=curve, lra=lra, suffix=joint_suffix, radius=0.5)
@@ -305,7 +306,7 @@ class Strap(object):
                 all_joints.append(joints)
 
         for curve, joints in joint_dict.items():
-            [srf.constrain_to_surface_matrix(object_name=joint, surface_name=surface_name) for joint in joints]
+            srf.constrain_to_surface_matrix_batch(objects=joints, surface_name=surface_name)
             cmds.parent(joints, surface_name)
 
         return all_joints
@@ -3,7 +3,204 @@ from maya import OpenMaya as om
 from maya.api.OpenMaya import *
 from . import omUtil as omu
 from . import rigUtils as rigu
+from . import nurbsEval as nev
+import numpy as np
+import hashlib
+import logging
 
+LOG = logging.getLogger(__name__)
+
+
+class ArcLengthTable(object):
+    '''
+    Arc length <-> parameter lookup for a nurbsCurve, built once from dense samples.
+    Lengths are cumulative chord lengths between samples, inverted in batch with
+    numpy.searchsorted and refined with a Newton step on the curve derivative.
+    Evaluation runs on a nurbsEval.NurbsCurve snapshot, Maya is only queried once.
+    Get it through get_arc_length_table(), which caches tables by the curve's CV/knot hash.
+
+    Usage:
+        table = get_arc_length_table('tail_crv')
+        params = table.param_from_fraction(np.linspace(0, 1, 500))
+        points = table.points_at_params(params)
+    '''
+
+    def __init__(self, curve_name, samples_per_span=64, curve=None):
+        self.curve_name = curve_name
+        self.curve = curve or get_curve_data(curve_name)
+
+        start, end = self.curve.domain
+        span_count = len(np.unique(self.curve.knots[self.curve.degree:len(self.curve.cvs) + 1])) - 1
+        sample_count = max(span_count * samples_per_span, 16) + 1
+        self.params = np.linspace(start, end, sample_count)
+        self.points = self.points_at_params(self.params)
+        self.lengths = np.concatenate(([0.0], np.cumsum(np.linalg.norm(np.diff(self.points, axis=0), axis=1))))
+        self.length = float(self.lengths[-1])
+
+    def __repr__(self):
+        return f'ArcLengthTable({self.curve_name}, samples={len(self.params)}, length={self.length:.4f})'
+
+    def points_at_params(self, params):
+        '''
+        Object space curve positions as a (N, 3) array
+        '''
+
+        return self.curve.points(params)
+
+    def derivatives_at_params(self, params):
+        '''
+        Object space positions, first and second derivatives as (N, 3) arrays
+        '''
+
+        return tuple(self.curve.derivatives(params, order=2))
+
+    def closest_params(self, points, iterations=4):
+        '''
+        Closest curve parameter for each object space point, see nurbsEval.NurbsCurve.closest_params()
+
+        points     = (numpy array) (N, 3) object space positions
+        iterations = (int) Newton steps
+
+        Returns numpy array of parameters
+        '''
+
+        return self.curve.closest_params(points, iterations=iterations)
+
+    def length_from_param(self, params, matrix=None):
+        '''
+        Arc length from the curve start to each parameter.
+        Table length at the sample before the parameter plus the chord to the parameter.
+
+        params = ([float]) Curve parameters
+        matrix = (numpy array) 4x4 matrix (row vector, like MMatrix) to measure in another space, 
+                 the curve's world matrix gives the world space length like curveInfo.arcLength.
+
+        Returns numpy array of lengths
+        '''
+
+        params = np.clip(np.asarray(params, dtype=np.float64).ravel(), self.params[0], self.params[-1])
+        segment = np.clip(np.searchsorted(self.params, params, side='right') - 1, 0, len(self.params) - 2)
+        samples, points, lengths = self.points, self.points_at_params(params), self.lengths
+        if matrix is not None:
+            matrix = np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+            samples = samples @ matrix[:3, :3] + matrix[3, :3]
+            points = points @ matrix[:3, :3] + matrix[3, :3]
+            lengths = np.concatenate(([0.0], np.cumsum(np.linalg.norm(np.diff(samples, axis=0), axis=1))))
+
+        return lengths[segment] + np.linalg.norm(points - samples[segment], axis=1)
+
+    def param_from_length(self, lengths, refine=1):
+        '''
+        Parameter at each arc length.
+
+        lengths = ([float]) Arc lengths from the curve start
+        refine  = (int) Newton steps after the table lookup. 0 = linear interpolation only.
+
+        Returns numpy array of parameters
+        '''
+
+        lengths = np.clip(np.asarray(lengths, dtype=np.float64).ravel(), 0.0, self.length)
+        segment = np.clip(np.searchsorted(self.lengths, lengths, side='right') - 1, 0, len(self.params) - 2)
+        low, high = self.params[segment], self.params[segment + 1]
+        span = self.lengths[segment + 1] - self.lengths[segment]
+        blend = np.divide(lengths - self.lengths[segment], span, out=np.zeros_like(lengths), where=span > 0)
+        params = low + (high - low) * blend
+
+        for _ in range(refine):
+            # Length to u is the table length at the segment start plus the chord to u
+            points, first = self.curve.derivatives(params, order=1)
+            speed = np.linalg.norm(first, axis=1)
+            chord = np.linalg.norm(points - self.points[segment], axis=1)
+            step = np.divide(self.lengths[segment] + chord - lengths, speed, out=np.zeros_like(speed), where=speed > 1e-12)
+            params = np.clip(params - step, low, high)
+
+        return params
+
+    def param_from_fraction(self, fractions, refine=1):
+        '''
+        Parameter at each 0-1 fraction of the curve length
+        '''
+
+        return self.param_from_length(np.asarray(fractions, dtype=np.float64) * self.length, refine=refine)
+
+
+_ARC_LENGTH_TABLES = {}
+_CURVE_DATA = {}
+
+def get_curve_data(curve_name, rebuild=False):
+    '''
+    Object space nurbsEval.NurbsCurve snapshot of curve_name, cached by the CV/knot hash
+
+    curve_name = (str) nurbsCurve shape or transform
+    rebuild    = (bol) Ignore the cache
+    '''
+
+    key = get_curve_hash(curve_name)
+    if rebuild or key not in _CURVE_DATA:
+        dag_path = MSelectionList().add(curve_name).getDagPath(0)
+        dag_path.extendToShape()
+        curve_fn = MFnNurbsCurve(dag_path)
+        cvs = np.array([tuple(p) for p in curve_fn.cvPositions(MSpace.kObject)], dtype=np.float64).reshape(-1, 4)
+        _CURVE_DATA[key] = nev.NurbsCurve(cvs[:, :3], list(curve_fn.knots()), curve_fn.degree, 
+                                          periodic=curve_fn.form == MFnNurbsCurve.kPeriodic, weights=cvs[:, 3])
+
+    return _CURVE_DATA[key]
+
+def get_curve_hash(curve_name):
+    '''
+    Hash of the CVs, knots, degree and form of a nurbsCurve
+    '''
+
+    dag_path = MSelectionList().add(curve_name).getDagPath(0)
+    dag_path.extendToShape()
+    curve_fn = MFnNurbsCurve(dag_path)
+
+    sha = hashlib.sha1()
+    sha.update(np.array([curve_fn.degree, curve_fn.form], dtype=np.int32).tobytes())
+    sha.update(np.array(list(curve_fn.knots()), dtype=np.float64).tobytes())
+    sha.update(np.array([tuple(p) for p in curve_fn.cvPositions(MSpace.kObject)], dtype=np.float64).tobytes())
+
+    return sha.hexdigest()
+
+def get_arc_length_table(curve_name, samples_per_span=64, rebuild=False):
+    '''
+    Cached ArcLengthTable for curve_name. A new table is built when the CVs or knots changed.
+
+    curve_name       = (str) nurbsCurve shape or transform
+    samples_per_span = (int) Table density
+    rebuild          = (bol) Force a rebuild
+    '''
+
+    key = (get_curve_hash(curve_name), samples_per_span)
+    table = _ARC_LENGTH_TABLES.get(key)
+    if rebuild or table is None:
+        table = ArcLengthTable(curve_name, samples_per_span=samples_per_span, 
+                               curve=get_curve_data(curve_name, rebuild=rebuild))
+        _ARC_LENGTH_TABLES[key] = table
+    table.curve_name = curve_name
+
+    return table
+
+def get_u_params(points, curve_name, iterations=4):
+    '''
+    Closest parameter on curve_name for many world space points in one call
+
+    points     = (numpy array) (N, 3) world positions, cmds.xform(obj, q=True, ws=True, t=True) per row
+    curve_name = (str) Curve name
+    iterations = (int) Newton steps after the table lookup
+
+    Returns numpy array of parameters
+    '''
+
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    dag_path = MSelectionList().add(curve_name).getDagPath(0)
+    dag_path.extendToShape()
+
+    # Table samples are in object space
+    world_inverse = np.array(list(dag_path.inclusiveMatrixInverse()), dtype=np.float64).reshape(4, 4)
+    local = points @ world_inverse[:3, :3] + world_inverse[3, :3]
+
+    return get_arc_length_table(curve_name).closest_params(local, iterations=iterations)
 
 def create_evenly_along_curve(object_type, object_name, count, curve_name, chain=0, joint_axis='xyz', keep_curve=0, 
                                 suffix='gde', radius=0.3, lra=True):
@@ -40,69 +237,149 @@ def create_evenly_along_curve(object_type, object_name, count, curve_name, chain
         object_name = object_name+'_'
     '''
 
-    object_list = []
     curve_shape = omu.get_dag_path(curve_name, shape=1)
-    curve_fn = om.MFnNurbsCurve(omu.get_dag_path(curve_name, shape=0))
+    table = get_arc_length_table(curve_name)
 
     if count == 1:
-        parameter = curve_fn.findParamFromLength(curve_fn.length() * 0.5)
-        point = om.MPoint()
-        curve_fn.getPointAtParam(parameter, point)
-        if object_type == 'joint':
-            num = 0
-            jt = cmds.createNode('joint', n=f'{object_name}_{str(num)}_{suffix}')
-            cmds.xform(jt,t=[point.x,point.y,point.z])
-            object_list.append(jt)
-        if object_type == 'locator':
-            num = 0
-            item = cmds.spaceLocator(n=f'{object_name}_{str(num)}_{suffix}')
-            cmds.addAttr(item, at='float', k=True, ci=True, sn='U', max=1.0, min=0.0) # Used in strap.strapRigDorito()
-            cmds.addAttr(item, at='float', k=True, ci=True, sn='V', max=1.0, min=0.0) # Used in strap.strapRigDorito()
-            tra = cmds.listRelatives(item, p=1)
-            cmds.xform(tra,t=[point.x,point.y,point.z])
-            object_list.append(item[0])
-
+        fractions = [0.5]
+        names = [f'{object_name}_0_{suffix}']
     else:
         if cmds.getAttr(f'{curve_shape}.form') == 2: # Detects if open or closed curve. 2=Periodic
             spacing = 1.0/(count)
         else:
             spacing = 1.0/(count-1)
+        fractions = np.arange(count) * spacing
+        names = [f'{object_name}_{str(start_number+i)}_{suffix}' for i in range(count)]
 
-        for i in range(count):
-            parameter = curve_fn.findParamFromLength(curve_fn.length() * spacing * i)
-            point = om.MPoint()
-            curve_fn.getPointAtParam(parameter, point)
-            if object_type == 'joint':
-                num = start_number+i
-                jt = cmds.createNode('joint', n=f'{object_name}_{str(num)}_{suffix}')
-                cmds.xform(jt,t=[point.x,point.y,point.z])
-                object_list.append(jt)
-
-                if chain and i != 0:
-                    cmds.parent(jt, object_list[-2])
-
-            if object_type == 'locator':
-                num = start_number+i
-                item = cmds.spaceLocator(n=f'{object_name}_{str(num)}_{suffix}')
-                cmds.addAttr(item, at='float', k=True, ci=True, sn='U', max=1.0, min=0.0) # Used in strap.strapRigDorito()
-                cmds.addAttr(item, at='float', k=True, ci=True, sn='V', max=1.0, min=0.0) # Used in strap.strapRigDorito()
-                tra = cmds.listRelatives(item, p=1)
-                cmds.xform(tra,t=[point.x,point.y,point.z])
-                object_list.append(item[0])
-
-    if len(object_list)>0 and object_type=='joint':
-        # Orient joint
-        for jt in object_list:
-            cmds.joint(jt, edit=True, zso=True, sao='yup', oj=joint_axis)
-            cmds.setAttr(f'{jt}.radius', radius)
-            if lra == True:
-                cmds.setAttr(f'{jt}.displayLocalAxis', 1)
+    points = table.points_at_params(table.param_from_fraction(fractions))
+    object_list = create_at_positions(object_type, names, points, chain=chain and count > 1, joint_axis=joint_axis, 
+                                      radius=radius, lra=lra)
 
     if not keep_curve:
         cmds.delete(curve_name)
 
     return object_list
 
+def create_at_positions(object_type, names, positions, chain=False, joint_axis='xyz', radius=0.3, lra=True):
+    '''
+    Creates joints or locators at positions in one undoable MDagModifier pass (omUtil.UndoableModifier).
+    Joints are oriented like cmds.joint(e=1, zso=1, sao='yup', oj=joint_axis), computed with numpy.
+
+    object_type = (str) 'joint' or 'locator'
+    names       = ([str]) Name per item
+    positions   = (numpy array) (N, 3) world positions
+    chain       = (bol) If joint, parent each joint under the previous one
+    joint_axis  = (str) If joint, aim and up axis order, 'xyz', 'yzx' ... or 'none'
+    radius      = (float) If joint, set joint radius
+    lra         = (bol) If joint, turn on local rotation axis display
+
+    Returns list of created objects (transforms for locators)
+    '''
+
+    if object_type not in ['joint', 'locator']:
+        raise TypeError(f'Object type must be joint or locator >> {object_type}')
+
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    if len(names) != len(positions):
+        raise IndexError(f'{len(names)} names given for {len(positions)} positions')
+
+    with omu.UndoableModifier(name=f'Create {object_type}s') as modifier:
+        nodes = []
+        for i, name in enumerate(names):
+            parent = nodes[-1] if object_type == 'joint' and chain and nodes else None
+            node = modifier.createNode(object_type, parent)
+            modifier.renameNode(node, name)
+            nodes.append(node)
+        modifier.doIt()
+
+        if object_type == 'joint':
+            world = joint_orient_matrices(positions, joint_axis=joint_axis) if chain else np.tile(np.eye(3), (len(nodes), 1, 1))
+            translate = positions.copy()
+            orient = world.copy()
+            if chain:
+                # Local values relative to the parent joint, which has no rotation of its own
+                translate[1:] = np.einsum('ni,nji->nj', positions[1:] - positions[:-1], world[:-1])
+                orient[1:] = np.einsum('nij,nkj->nik', world[1:], world[:-1])
+            orient = np.degrees(matrix_to_euler_xyz(orient))
+
+            for node, t, o in zip(nodes, translate, orient):
+                node_fn = MFnDependencyNode(node)
+                for axis, t_value, o_value in zip('XYZ', t, o):
+                    modifier.newPlugValueDouble(node_fn.findPlug(f'translate{axis}', False), float(t_value))
+                    modifier.newPlugValueMAngle(node_fn.findPlug(f'jointOrient{axis}', False), 
+                                                MAngle(float(o_value), MAngle.kDegrees))
+                modifier.newPlugValueDouble(node_fn.findPlug('radius', False), radius)
+                if lra == True:
+                    modifier.newPlugValueBool(node_fn.findPlug('displayLocalAxis', False), True)
+
+        else:
+            for node, t in zip(nodes, positions):
+                transform_fn = MFnDagNode(node)
+                modifier.renameNode(transform_fn.child(0), f'{transform_fn.name()}Shape')
+                for axis, t_value in zip('XYZ', t):
+                    modifier.newPlugValueDouble(transform_fn.findPlug(f'translate{axis}', False), float(t_value))
+                for attr_name in ['U', 'V']: # Used in strap.strapRigDorito()
+                    modifier.addNumericAttribute(node, attr_name, 'float', 0.0, minimum=0.0, maximum=1.0)
+
+        modifier.doIt()
+
+    return [MFnDagNode(node).partialPathName() for node in nodes]
+
+def joint_orient_matrices(positions, joint_axis='xyz', up=(0.0, 1.0, 0.0)):
+    '''
+    World rotation per joint of a chain, aiming the first axis of joint_axis at the next joint
+    and the second axis towards up (cmds.joint oj / sao). The last joint copies the previous one.
+
+    positions  = (numpy array) (N, 3) joint positions
+    joint_axis = (str) 'xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx' or 'none'
+    up         = ([float]) Secondary axis world direction
+
+    Returns (N, 3, 3) array, row i is the world direction of local axis i
+    '''
+
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    matrices = np.tile(np.eye(3), (len(positions), 1, 1))
+    if joint_axis == 'none' or len(positions) < 2:
+        return matrices
+
+    axes = ['xyz'.index(x) for x in joint_axis]
+    sign = 1.0 if joint_axis in ['xyz', 'yzx', 'zxy'] else -1.0
+
+    aim = np.diff(positions, axis=0)
+    aim /= np.maximum(np.linalg.norm(aim, axis=1, keepdims=True), 1e-12)
+    up = np.asarray(up, dtype=np.float64)
+    secondary = up - aim * (aim @ up)[:, None]
+    # Aim parallel to up, fall back to world z
+    parallel = np.linalg.norm(secondary, axis=1) < 1e-6
+    secondary[parallel] = np.cross(aim[parallel], np.cross([0.0, 0.0, 1.0], aim[parallel]))
+    secondary /= np.maximum(np.linalg.norm(secondary, axis=1, keepdims=True), 1e-12)
+
+    matrices[:-1, axes[0]] = aim
+    matrices[:-1, axes[1]] = secondary
+    matrices[:-1, axes[2]] = sign * np.cross(aim, secondary)
+    matrices[-1] = matrices[-2]
+
+    return matrices
+
+def matrix_to_euler_xyz(matrices):
+    '''
+    Rotation matrices (row vector convention, like MMatrix) to xyz euler angles in radians
+
+    matrices = (numpy array) (N, 3, 3)
+    '''
+
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 3, 3)
+    y = np.arcsin(np.clip(-matrices[:, 0, 2], -1.0, 1.0))
+    x = np.arctan2(matrices[:, 1, 2], matrices[:, 2, 2])
+    z = np.arctan2(matrices[:, 0, 1], matrices[:, 0, 0])
+
+    # Gimbal lock, put the whole rotation in x
+    locked = np.abs(matrices[:, 0, 2]) > 1.0 - 1e-9
+    x[locked] = np.arctan2(-matrices[locked, 2, 1], matrices[locked, 1, 1])
+    z[locked] = 0.0
+
+    return np.stack((x, y, z), axis=1)
+
 def constrain_to_curve(constrained, curve_name):
     '''
     Constrain items to curve (position only)
@@ -110,20 +387,50 @@ def constrain_to_curve(constrained, curve_name):
     constrained = ([])  Items that will be constrained to curve
     curve_name  = (str) Curve to constrain items to
     '''
+
+    return constrain_to_curve_batch(constrained, curve_name)
+
+def constrain_to_curve_batch(constrained, curve_name):
+    '''
+    Constrain many items to curve (position only). Parameters are solved with one get_u_params() query,
+    pointOnCurveInfo nodes are created and connected in one pass (omUtil.UndoableModifier).
+
+    constrained = ([])  Items that will be constrained to curve
+    curve_name  = (str) Curve to constrain items to
+
+    Returns list of pointOnCurveInfo nodes, one per constrained item (duplicates removed)
+    '''
+
+    if cmds.objExists(curve_name):
+        if cmds.objectType(omu.get_dag_path(curve_name, shape=True)) != 'nurbsCurve':
+            raise TypeError(f'Curve is not a nurbs curve >> {curve_name}')
+    else:
+        raise NameError(f'Curve does not exist in the scene >> {curve_name}')
+
     if type(constrained) != list:
         constrained = [constrained]
+    constrained, paths = omu.get_dag_paths(constrained)
 
-    point_list = []
-    for obj in constrained:
-        ws_pos = cmds.xform(obj, q=True, ws=True, t=True)
-        uParam = get_u_param(ws_pos, curve_name)
-        curve_info_node = cmds.createNode('pointOnCurveInfo', n=f'{curve_name}_pocInf', ss=True)
-        cmds.connectAttr(f'{curve_name}.worldSpace[0]', f'{curve_info_node}.inputCurve')
-        cmds.setAttr(f'{curve_info_node}.parameter', uParam)
-        cmds.connectAttr(f'{curve_info_node}.position', f'{obj}.translate')
-        point_list.append(curve_info_node)
+    u_params = get_u_params([cmds.xform(obj, q=True, ws=True, t=True) for obj in constrained], curve_name)
 
-    return point_list
+    curve_path = MSelectionList().add(curve_name).getDagPath(0)
+    curve_path.extendToShape()
+    world_space = MFnDependencyNode(curve_path.node()).findPlug('worldSpace', False).elementByLogicalIndex(0)
+
+    with omu.UndoableModifier(name='Constrain to curve') as modifier:
+        nodes = []
+        for path, u_param in zip(paths, u_params):
+            node = modifier.createNode('pointOnCurveInfo')
+            modifier.renameNode(node, f'{curve_name}_pocInf')
+            node_fn = MFnDependencyNode(node)
+            modifier.connect(world_space, node_fn.findPlug('inputCurve', False))
+            modifier.newPlugValueDouble(node_fn.findPlug('parameter', False), float(u_param))
+            translate = MFnDependencyNode(path.node()).findPlug('translate', False)
+            modifier.connect(node_fn.findPlug('position', False), translate)
+            nodes.append(node)
+        modifier.doIt()
+
+    return [MFnDependencyNode(node).name() for node in nodes]
 
 def constrain_to_curve_parametric(constrained, curve_name, up_type=4, inverse_up=0, inverse_front=0, front_axis=0, 
                         up_axis=2, up_object=None, offset=False, rotate=False):
@@ -139,85 +446,121 @@ def constrain_to_curve_parametric(constrained, curve_name, up_type=4, inverse_up
     offset      = (bol) Create offset matrix for constrained objects
     '''
 
+    return constrain_to_curve_parametric_bulk(constrained, curve_name, up_type=up_type, inverse_up=inverse_up, 
+                                              inverse_front=inverse_front, front_axis=front_axis, up_axis=up_axis, 
+                                              up_object=up_object, offset=offset, rotate=rotate)
+
+def constrain_to_curve_parametric_bulk(constrained, curve_name, up_type=4, inverse_up=0, inverse_front=0, front_axis=0, 
+                                       up_axis=2, up_object=None, offset=False, rotate=False):
+    '''
+    Constrain many items to curve by motionPath nodes, without reparenting the items.
+    Parameters come from one get_u_params() query. Joint orients are folded into rotate with numpy,
+    keeping the joint world orientation in each joint's rotate order. All nodes are created and wired in one
+    pass (omUtil.UndoableModifier), offset matrix constraints are added after with rigu.parentConstraint().
+
+    constrained = ([]) Items that will be constrained to curve
+    curve_name  = (str) Curve to constrain items to
+    up_type     = (Int) 1=Object, 2=Object Rototation, 3=Vector, 4=Normal
+    up_object   = (str) World up object for up_type 1 and 2
+    rotate      = (bol) Constrain rotation
+    offset      = (bol) Create offset matrix for constrained objects
+
+    Returns list of motionPath nodes, one per constrained item (duplicates removed)
+    '''
+
     if cmds.objExists(curve_name):
         if cmds.objectType(omu.get_dag_path(curve_name, shape=True)) != 'nurbsCurve':
             raise TypeError (f'Curve {curve_name} is not a curve')
     else:
         raise NameError(f'Curve {curve_name} does not exist in scene')
 
-    # # If passing a single obj for constraint
+    if up_type in [1, 2] and not (up_object and cmds.objExists(up_object)):
+        raise ValueError(f'Object {up_object} does not exist')
+
     if type(constrained) != list:
         constrained = [constrained]
-
-    path_nodes = []
-    for obj in constrained:
-        if cmds.listRelatives(obj, p=True):
-            object_parent = cmds.listRelatives(obj, p=True)[0]
-            cmds.parent(obj, w=True)
-        else:
-            object_parent=None
-            
-        # Try to eliminate joint orientations that affect matrix constraint
-        if cmds.objectType(obj) == 'joint':
-            try:
-                cmds.makeIdentity(obj, apply=True, t=0, r=1, s=0, n=0, pn=1)
-                for a in ['X', 'Y', 'Z']:
-                    if cmds.getAttr(f'{obj}.jointOrient{a}') != 0:
-                        cmds.setAttr(f'{obj}.rotate{a}', cmds.getAttr(f'{obj}.jointOrient{a}'))
-                        cmds.setAttr(f'{obj}.jointOrient{a}', 0)
-            except:
-                pass
-
-        pos=cmds.xform(obj, q=True, ws=True, t=True)
-        u_param = get_u_param(pos, curve_name)
-        print('curve u_param', u_param)
-        motion_path = cmds.createNode('motionPath', n=f'{obj}_motPath', ss=True)
-        cmds.connectAttr(f'{curve_name}.worldSpace[0]', f'{motion_path}.geometryPath')
-        cmds.setAttr(f'{motion_path}.uValue', u_param)
-
+    constrained, paths = omu.get_dag_paths(constrained)
+
+    u_params = get_u_params([cmds.xform(obj, q=True, ws=True, t=True) for obj in constrained], curve_name)
+
+    with omu.UndoableModifier(name='Constrain to curve parametric') as modifier:
+        # Fold joint orients into rotate, world orientation stays the same
+        joints = [path for path in paths if path.hasFn(MFn.kJoint)]
+        if joints:
+            world = np.array([list(path.inclusiveMatrix()) for path in joints], dtype=np.float64).reshape(-1, 4, 4)
+            parent = np.array([list(path.exclusiveMatrixInverse()) for path in joints], dtype=np.float64).reshape(-1, 4, 4)
+            local = np.einsum('nij,njk->nik', world[:, :3, :3], parent[:, :3, :3])
+            local /= np.maximum(np.linalg.norm(local, axis=2, keepdims=True), 1e-12) # Remove scale
+            rotations = matrix_to_euler_xyz(local)
+
+            # Maya rotateOrder 0-5 matches MEulerRotation kXYZ-kZYX, numpy handles xyz
+            orders = [MFnDependencyNode(path.node()).findPlug('rotateOrder', False).asInt() for path in joints]
+            for i, order in enumerate(orders):
+                if order != 0:
+                    matrix = np.eye(4)
+                    matrix[:3, :3] = local[i]
+                    euler = MEulerRotation.decompose(MMatrix(matrix.ravel().tolist()), order)
+                    rotations[i] = [euler.x, euler.y, euler.z]
+            rotations = np.degrees(rotations)
+
+            for path, rotation in zip(joints, rotations):
+                joint_fn = MFnDependencyNode(path.node())
+                plugs = [joint_fn.findPlug(f'{attr}{axis}', False) for attr in ['rotate', 'jointOrient'] for axis in 'XYZ']
+                if any(plug.isLocked or plug.isDestination for plug in plugs):
+                    LOG.debug(f'Joint orient left as is, locked or connected >> {path.partialPathName()}')
+                    continue
+                for plug, value in zip(plugs, list(rotation) + [0.0, 0.0, 0.0]):
+                    modifier.newPlugValueMAngle(plug, MAngle(float(value), MAngle.kDegrees))
+
+        curve_path = MSelectionList().add(curve_name).getDagPath(0)
+        curve_path.extendToShape()
+        world_space = MFnDependencyNode(curve_path.node()).findPlug('worldSpace', False).elementByLogicalIndex(0)
         if up_type in [1, 2]:
-            cmds.setAttr(f'{motion_path}.worldUpType', up_type)
-            if cmds.objExists(up_object):
-                cmds.connectAttr(f'{up_object}.worldMatrix[0]', f'{motion_path}.worldUpMatrix')
+            up_matrix = MFnDependencyNode(MSelectionList().add(up_object).getDependNode(0)).findPlug('worldMatrix', False)
+            up_matrix = up_matrix.elementByLogicalIndex(0)
+
+        path_nodes = []
+        matrix_nodes = []
+        for obj, path, u_param in zip(constrained, paths, u_params):
+            LOG.debug(f'{obj} curve u_param {u_param}')
+            motion_path = modifier.createNode('motionPath')
+            modifier.renameNode(motion_path, f'{obj}_motPath')
+            path_fn = MFnDependencyNode(motion_path)
+            modifier.connect(world_space, path_fn.findPlug('geometryPath', False))
+            modifier.newPlugValueDouble(path_fn.findPlug('uValue', False), float(u_param))
+            modifier.newPlugValueInt(path_fn.findPlug('worldUpType', False), up_type)
+            if up_type in [1, 2]:
+                modifier.connect(up_matrix, path_fn.findPlug('worldUpMatrix', False))
+            modifier.newPlugValueBool(path_fn.findPlug('inverseUp', False), bool(inverse_up))
+            modifier.newPlugValueBool(path_fn.findPlug('inverseFront', False), bool(inverse_front))
+            modifier.newPlugValueInt(path_fn.findPlug('frontAxis', False), front_axis)
+            modifier.newPlugValueInt(path_fn.findPlug('upAxis', False), up_axis)
+            path_nodes.append(motion_path)
+
+            if offset:
+                matrix = modifier.createNode('composeMatrix')
+                modifier.renameNode(matrix, f'{obj}_motPath_worldMatrix')
+                matrix_fn = MFnDependencyNode(matrix)
+                modifier.connect(path_fn.findPlug('allCoordinates', False), matrix_fn.findPlug('inputTranslate', False))
+                modifier.connect(path_fn.findPlug('rotate', False), matrix_fn.findPlug('inputRotate', False))
+                matrix_nodes.append(matrix)
             else:
-                raise ValueError(f'Object {up_object} does not exist')
-        else:
-            cmds.setAttr(f'{motion_path}.worldUpType', up_type)
-
-        cmds.setAttr(f'{motion_path}.inverseUp', inverse_up)
-        cmds.setAttr(f'{motion_path}.inverseFront', inverse_front)
-        cmds.setAttr(f'{motion_path}.frontAxis', front_axis)
-        cmds.setAttr(f'{motion_path}.upAxis', up_axis)
-        path_nodes.append(motion_path)
+                obj_fn = MFnDependencyNode(path.node())
+                modifier.connect(path_fn.findPlug('allCoordinates', False), obj_fn.findPlug('translate', False))
+                if rotate:
+                    modifier.connect(path_fn.findPlug('rotate', False), obj_fn.findPlug('rotate', False))
 
-        if offset:
-            matrix = cmds.createNode('composeMatrix', n=f'{motion_path}_worldMatrix', ss=True)
-            cmds.connectAttr(f'{motion_path}.allCoordinates', f'{matrix}.inputTranslate')
-            cmds.connectAttr(f'{motion_path}.rotate', f'{matrix}.inputRotate')
+        modifier.doIt()
 
+        # Maintain offset reads the evaluated matrices, so these follow the modifier
+        for obj, matrix in zip(constrained, matrix_nodes):
+            matrix_plug = f'{MFnDependencyNode(matrix).name()}.outputMatrix'
             if rotate:
-                rigu.parentConstraint(parent=None, child=obj, s=[], mo=True, 
-                                    pm=f'{matrix}.outputMatrix')
-                if object_parent:
-                    cmds.parent(obj, object_parent)
-
-                if cmds.objectType(obj) == 'joint':
-                    for a in ['X', 'Y', 'Z']:
-                        cmds.setAttr(f'{obj}.jointOrient{a}', 0)
+                rigu.parentConstraint(parent=None, child=obj, s=[], mo=True, pm=matrix_plug)
             else:
-                rigu.parentConstraint(parent=None, child=obj, r=[], s=[], mo=True, 
-                                    pm=f'{matrix}.outputMatrix')
-                if object_parent:
-                    cmds.parent(obj, object_parent)
+                rigu.parentConstraint(parent=None, child=obj, r=[], s=[], mo=True, pm=matrix_plug)
 
-        else:
-            cmds.connectAttr(f'{motion_path}.allCoordinates', f'{obj}.translate')
-            if rotate:
-                cmds.connectAttr(f'{motion_path}.rotate', f'{obj}.rotate')
-            if object_parent:
-                cmds.parent(obj, object_parent)
-
-    return path_nodes
+    return [MFnDependencyNode(node).name() for node in path_nodes]
 
 def constrain_to_curve_nonparametric(constrained, curve_name, up_type=4, inverse_up=0, inverse_front=0, front_axis=0, 
                             up_axis=2, up_object=None, offset=False, rotate=False):
@@ -251,8 +594,11 @@ def constrain_to_curve_nonparametric(constrained, curve_name, up_type=4, inverse
     if isinstance(up_axis, str):
         up_axis = axis_dict[up_axis]
 
+    # World positions do not change when unparenting below, query every value at once
+    u_params = get_u_parms_by_length(constrained, curve_name)
+
     path_nodes = []
-    for obj in constrained:
+    for obj, u_param in zip(constrained, u_params):
         if cmds.listRelatives(obj, p=True):
             object_parent = cmds.listRelatives(obj, p=True)[0]
             cmds.parent(obj, w=True)
@@ -271,11 +617,10 @@ def constrain_to_curve_nonparametric(constrained, curve_name, up_type=4, inverse
                 pass
 
         motion_path = cmds.createNode('motionPath', n=f'{obj}_motionPath', ss=True)
-        u_param = get_u_parm_by_length(obj, curve_name)
         print('curve u_param', u_param)
         cmds.connectAttr(f'{curve_name}.ws[0]', f'{motion_path}.geometryPath')
         cmds.setAttr(f'{motion_path}.fractionMode', 1)
-        cmds.setAttr(f'{motion_path}.uValue', u_param)
+        cmds.setAttr(f'{motion_path}.uValue', float(u_param))
 
         if up_type in [1, 2]:
             cmds.setAttr(f'{motion_path}.worldUpType', up_type)
@@ -326,22 +671,8 @@ def get_u_param(ws_pos, curve_name):
     ws_pos     = [Position] cmds.xform(obj, q=True, ws=True, t=True)
     curve_name = (str) = Curve name
     '''
-    
-    point = om.MPoint(*ws_pos)
-    curveFn = om.MFnNurbsCurve(omu.get_dag_path(curve_name, shape=0))
-    paramUtill=om.MScriptUtil()
-    paramPtr=paramUtill.asDoublePtr()
-    isOnCurve = curveFn.isPointOnCurve(point)
-    
-    if isOnCurve == True:
-        curveFn.getParamAtPoint(point, paramPtr, 0.001, om.MSpace.kObject )
-    else:
-        point = curveFn.closestPoint(point, paramPtr, 0.001, om.MSpace.kObject)
-        curveFn.getParamAtPoint(point, paramPtr, 0.001, om.MSpace.kObject )
-    
-    param = paramUtill.getDouble(paramPtr)
 
-    return param
+    return float(get_u_params([ws_pos], curve_name)[0])
 
 def get_u_parm_by_length(obj, curve_name):
     '''
@@ -350,61 +681,92 @@ def get_u_parm_by_length(obj, curve_name):
     obj = (str) Object to retrieve closest point from
     curve_name = (str) Curve to query
     '''
-   
+
+    return float(get_u_parms_by_length([obj], curve_name)[0])
+
+def get_u_parms_by_length(objects, curve_name):
     '''
-    # OM (Seems to have difficulty finding closest point and fails when to close to end of curve)
-    
-    fn = MFnNurbsCurve(MGlobal.getSelectionListByName(curve_name).get_dag_path(0))_, u = fn.closestPoint(MPoint(cmds.xform(obj, q=1, ws=1, t=1)))
-    u_param = fn.findLengthFromParam(u) / fn.length()
+    Non-Parametric UParam (arc length at the closest point / curve length) for many objects.
+    Same result as the nearestPointOnCurve -> arcLengthDimension -> remapValue network, 
+    points past the curve ends clamp to 0 and 1. Lengths are measured in world space.
+
+    objects    = ([str]) Objects to retrieve closest points from, their world matrix translation is used
+    curve_name = (str) Curve to query
+
+    Returns numpy array of 0-1 values, one per object (duplicates included)
     '''
-   
-    # By Nodes
-    object_pos = cmds.createNode('decomposeMatrix', n='objWorldSpace', ss=True)
-    pnt_on_crv_node = cmds.createNode('nearestPointOnCurve', n='pocInfo', ss=True)
-    arc_length_node = cmds.createNode('curveInfo', n='arcLen', ss=True)
-    pos_length_node = cmds.createNode('arcLengthDimension', n='posInfo', ss=True)
-    val_remap_node = cmds.createNode('remapValue', n='posUVal', ss=True)
-
-    cmds.connectAttr(f'{curve_name}.ws[0]', f'{pnt_on_crv_node}.inputCurve')
-    cmds.connectAttr(f'{curve_name}.ws[0]', f'{pos_length_node}.nurbsGeometry')
-    cmds.connectAttr(f'{curve_name}.ws[0]', f'{arc_length_node}.inputCurve')
-    cmds.connectAttr(f'{obj}.wm[0]', f'{object_pos}.imat')
-    cmds.connectAttr(f'{object_pos}.outputTranslate', f'{pnt_on_crv_node}.inPosition')
-    cmds.connectAttr(f'{pnt_on_crv_node}.parameter', f'{pos_length_node}.uParamValue')
-    cmds.connectAttr(f'{pos_length_node}.arcLength', f'{val_remap_node}.inputValue')
-    cmds.connectAttr(f'{arc_length_node}.arcLength', f'{val_remap_node}.inputMax')
-
-    u_param = cmds.getAttr(f'{val_remap_node}.outValue')
-
-    cmds.delete(object_pos, pnt_on_crv_node, arc_length_node, val_remap_node)
-    cmds.delete(cmds.listRelatives(pos_length_node, p=True)) # Result: ['arcLengthDimension1']
-   
-    return u_param
 
-def curve_from_joint_chain(root, curve_name, degree=3):
+    _, paths = omu.get_dag_paths(objects, unique=False)
+    positions = np.array([list(path.inclusiveMatrix())[12:15] for path in paths], dtype=np.float64).reshape(-1, 3)
+
+    dag_path = MSelectionList().add(curve_name).getDagPath(0)
+    dag_path.extendToShape()
+    world_matrix = np.array(list(dag_path.inclusiveMatrix()), dtype=np.float64).reshape(4, 4)
+
+    table = get_arc_length_table(curve_name)
+    lengths = table.length_from_param(get_u_params(positions, curve_name), matrix=world_matrix)
+    total = table.length_from_param([table.params[-1]], matrix=world_matrix)[0]
+    if total <= 0:
+        return np.zeros(len(lengths))
+
+    return np.clip(lengths / total, 0.0, 1.0)
+
+def curve_from_joint_chain(root, curve_name, degree=3, chain_only=False):
     '''
     root       = (str) Root joint of joint chain
     degree     = (int) Curve Degree
-    curve_name = (str) Name of output curve
+    curve_name = (str) Name of output curve, the shape is named {curve_name}Shape
+    chain_only = (bol) Only follow the first child of each joint, ignore branches
     '''
 
-    joints = pos_from_joint_chain(root)
-    new_curve = cmds.curve(d=degree, p=joints)
-    cmds.rename(new_curve, curve_name)
+    positions = pos_from_joint_chain(root, chain_only=chain_only)
+    if len(positions) < 2:
+        raise IndexError(f'Joint chain needs at least two joints >> {root}')
+
+    # Same uniform clamped knots as cmds.curve(d=degree, p=positions)
+    degree = min(degree, len(positions) - 1)
+    spans = len(positions) - degree
+    knots = [0.0] * degree + [float(x) for x in range(1, spans)] + [float(spans)] * degree
+
+    with omu.UndoableModifier(name='Curve from joint chain') as modifier:
+        curve_obj = modifier.createCurve(positions, knots, degree, MFnNurbsCurve.kOpen, name=curve_name)
+        modifier.doIt()
+
+    return MFnDagNode(curve_obj).partialPathName()
 
-def pos_from_joint_chain(root):
+def pos_from_joint_chain(root, chain_only=False):
     '''
-    Gets position of each joint in joint chain.
+    Gets world position of each joint in joint chain, depth first.
+    Only joints are collected, constraints, ikEffectors and other transforms under the chain are skipped.
     Used in curve_from_joint_chain to create curve from joint chain.
    
-    root = (str) Root of joint chain
+    root       = (str) Root of joint chain
+    chain_only = (bol) Only follow the first child joint of each joint, ignore branches
+
+    Returns (N, 3) numpy array
     '''
 
-    position = [cmds.xform(root, q=True, t=True, ws=True)]
-    children = cmds.listRelatives(root, c=True) or []
-    for child in children:
-        position.extend(pos_from_joint_chain(child))
-    return position
+    root_path = MSelectionList().add(root).getDagPath(0)
+    matrices = []
+
+    if chain_only:
+        dag_path = root_path
+        while True:
+            matrices.append(list(dag_path.inclusiveMatrix())[12:15])
+            children = [dag_path.child(i) for i in range(dag_path.childCount())]
+            children = [x for x in children if x.hasFn(MFn.kJoint)]
+            if not children:
+                break
+            dag_path = MDagPath(dag_path).push(children[0])
+
+    else:
+        dag_iter = MItDag(MItDag.kDepthFirst, MFn.kJoint)
+        dag_iter.reset(root_path, MItDag.kDepthFirst, MFn.kJoint)
+        while not dag_iter.isDone():
+            matrices.append(list(dag_iter.getPath().inclusiveMatrix())[12:15])
+            dag_iter.next()
+
+    return np.array(matrices, dtype=np.float64).reshape(-1, 3)
 
 def query_cv_count(curve_name):
     '''
@@ -420,49 +782,71 @@ def query_cv_count(curve_name):
 def number_of_cv(curve_name):
     return int(cmds.getAttr (f'{curve_name}.degree')) + (cmds.getAttr (f'{curve_name}.spans'))
 
-def update_shape_crv(source, target):
+def update_shape_crv(source, target, cleanup=False):
     '''
     Updates target curve shape with source curve shape.
+
+    source  = (str) Curve to copy the shape from
+    target  = (str) Curve to update, the Orig shape is updated if target is deformed
+    cleanup = (bol) Run delete_unused_shapes_curve() first
     '''
 
-    delete_unused_shapes_curve()
+    update_shape_crv_multi([(source, target)], cleanup=cleanup)
 
-    for obj in [source, target]:
-        if cmds.objectType(omu.get_dag_path(obj, shape=1)) != 'nurbsCurve':
-            raise TypeError('Object is not of type nurbsSurface >> f{obj}')
+def update_shape_crv_multi(pairs, cleanup=False):
+    '''
+    Updates many target curve shapes in one undoable modifier pass (omUtil.UndoableModifier).
+    The source world space curve becomes the target object space curve, like a worldSpace -> create
+    connection. When degree, form and knots match, only the CVs of the target curve are replaced,
+    otherwise the source curve is copied. The result is set as the target's cached geometry.
 
-    target_shapes = cmds.listRelatives(target, c=1, s=1)
-    if len(target_shapes) > 1:
-        for shape in target_shapes:
-            if 'Orig' in shape:
-                target_shape = shape
-    else:
-        target_shape = target_shapes[0]
+    pairs   = ([(str, str)]) (source, target) curves
+    cleanup = (bol) Run delete_unused_shapes_curve() once first
+    '''
 
-    source_shapes = cmds.listRelatives(source, c=1, s=1)
-    if len(source_shapes) > 1:
-        for shape in source_shapes:
-            if 'Orig' in shape:
-                source_shape = shape
-    else:
-        source_shape = source_shapes[0]
+    if cleanup:
+        delete_unused_shapes_curve()
+
+    with omu.UndoableModifier(name='Update curve shapes') as modifier:
+        for source, target in pairs:
+            for obj in [source, target]:
+                if cmds.objectType(omu.get_dag_path(obj, shape=1)) != 'nurbsCurve':
+                    raise TypeError(f'Object is not of type nurbsCurve >> {obj}')
+
+            source_fn = MFnNurbsCurve(MSelectionList().add(_update_shape(source)).getDagPath(0))
+            target_fn = MFnNurbsCurve(MSelectionList().add(_update_shape(target)).getDagPath(0))
+            if target_fn.findPlug('create', False).isDestination:
+                raise ValueError(f'Target curve shape has construction history >> {target}')
+
+            same_curve = (source_fn.degree == target_fn.degree and source_fn.form == target_fn.form 
+                          and source_fn.numKnots == target_fn.numKnots 
+                          and np.allclose(list(source_fn.knots()), list(target_fn.knots())))
+            data = MFnNurbsCurveData().create()
+            MFnNurbsCurve().copy(target_fn.object() if same_curve else source_fn.object(), data)
+            MFnNurbsCurve(data).setCVPositions(source_fn.cvPositions(MSpace.kWorld))
+            modifier.newPlugValue(target_fn.findPlug('cached', False), data)
 
-    if target_shape and source_shape:
-        cmds.connectAttr(f'{source_shape}.worldSpace[0]', f'{target_shape}.create')
-        cmds.refresh()
-        cmds.disconnectAttr(f'{source_shape}.worldSpace[0]', f'{target_shape}.create')
+        modifier.doIt()
 
-def delete_unused_shapes_curve():
+def _update_shape(node):
     '''
-    Removes all unused shape nodes in the scene
+    Shape to read / write in update_shape_crv. The Orig shape if node has deformers.
+    '''
+
+    shapes = cmds.listRelatives(node, c=1, s=1, f=1) or []
+    if len(shapes) > 1:
+        for shape in shapes:
+            if 'Orig' in shape.split('|')[-1]:
+                return shape
+        shapes = [x for x in shapes if not cmds.getAttr(f'{x}.intermediateObject')] or shapes
+
+    return shapes[0]
+
+def delete_unused_shapes_curve(dry_run=False):
+    '''
+    Removes all unused nurbsCurve shape nodes in the scene
+
+    dry_run = (bol) Only report the shapes, nothing is deleted
     '''
-    all_curves = cmds.ls(type='nurbsCurve')
-    dead_intermediates = []
-    for crv in all_curves:
-        if cmds.getAttr(f'{crv}.io'): #intermediateObject
-            if not cmds.listConnections(crv):
-                dead_intermediates.append(crv)
 
-    if dead_intermediates:
-        for io in dead_intermediates:
-            cmds.delete(io)
\ No newline at end of file
+    return omu.delete_unused_shapes(['nurbsCurve'], dry_run=dry_run)
\ No newline at end of file
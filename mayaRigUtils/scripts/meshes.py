@@ -163,27 +163,14 @@ def constrain_to_mesh_follicle(constrained, mesh_name, orient=0): #WIP
 
             return follicle, follicle_transform
 
-def delete_unused_shapes_mesh():
+def delete_unused_shapes_mesh(dry_run=False):
     '''
-    Removes all unused shape nodes in the scene
+    Removes all unused mesh shape nodes in the scene
+
+    dry_run = (bol) Only report the shapes, nothing is deleted
     '''
 
-    all_meshes = []
-    dead_intermediates = []
-    all_meshes = cmds.ls(type="mesh")
-    if all_meshes != {}:
-        for mesh in all_meshes:
-            if cmds.getAttr(f'{mesh}.io'): #intermediateObject
-                if not cmds.listConnections(mesh):
-                    dead_intermediates.append(mesh)
-
-    if dead_intermediates != []:
-        for intermediate in dead_intermediates:
-            cmds.delete(intermediate)
-        print(f'Deleted {str(len(dead_intermediates))} shape nodes')
-
-    else:
-        print('No unused shapes found')
+    return omu.delete_unused_shapes(['mesh'], dry_run=dry_run)
 
 def copy_vertex_position():
     # get the mesh vertex position
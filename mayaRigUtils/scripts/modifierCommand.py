@@ -0,0 +1,58 @@
+'''
+Maya plugin with the rigUtilsModifier command, puts API modifiers on the undo queue.
+MDGModifier and MDagModifier edits are not undoable on their own, this command runs them
+and keeps them to undo and redo as one step. Loaded and called by omUtil.do_it_undoable().
+'''
+
+from maya.api import OpenMaya
+import sys
+import types
+
+COMMAND_NAME = 'rigUtilsModifier'
+
+# Maya loads the plugin from its file, not through the package, so the modifiers are handed over
+# in a registered module both copies of this file share.
+SHARED = sys.modules.setdefault('rigUtilsModifierShared', types.ModuleType('rigUtilsModifierShared'))
+if not hasattr(SHARED, 'pending'):
+    SHARED.pending = []
+
+
+def maya_useNewAPI():
+    pass
+
+class ModifierCommand(OpenMaya.MPxCommand):
+    '''
+    Runs the modifiers queued in SHARED.pending, in order. Undo runs them back in reverse order.
+    '''
+
+    def __init__(self):
+        super(ModifierCommand, self).__init__()
+        self.modifiers = []
+
+    @staticmethod
+    def creator():
+        return ModifierCommand()
+
+    def isUndoable(self):
+        return True
+
+    def doIt(self, args):
+        if not SHARED.pending:
+            raise RuntimeError(f'{COMMAND_NAME} has no modifiers to run, use omUtil.do_it_undoable()')
+
+        self.modifiers = SHARED.pending.pop()
+        self.redoIt()
+
+    def redoIt(self):
+        for modifier in self.modifiers:
+            modifier.doIt()
+
+    def undoIt(self):
+        for modifier in reversed(self.modifiers):
+            modifier.undoIt()
+
+def initializePlugin(plugin):
+    OpenMaya.MFnPlugin(plugin, 'lib_python_velan', '1.0').registerCommand(COMMAND_NAME, ModifierCommand.creator)
+
+def uninitializePlugin(plugin):
+    OpenMaya.MFnPlugin(plugin).deregisterCommand(COMMAND_NAME)
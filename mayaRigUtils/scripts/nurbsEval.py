@@ -0,0 +1,512 @@
+import numpy as np
+from . import spatialGrid as sg
+
+
+'''
+NURBS curve and surface evaluation in NumPy (no Maya).
+Snapshot a curve or surface once (curves.get_curve_data / surfaces.get_surface_data),
+then evaluate thousands of parameters per call with a vectorized De Boor pass.
+
+Knots use the Maya layout (number of CVs + degree - 1 values), the two
+outer knots of the full vector are added here. Periodic curves and surfaces
+hold their overlapping CVs, like Maya returns them.
+
+####################################################
+Usage:
+
+curve = NurbsCurve(cvs, knots, degree)
+points = curve.points(params)
+points, first = curve.derivatives(params, order=1)
+params = curve.closest_params(query_points)
+
+surface = NurbsSurface(cvs, knots_u, knots_v, degree_u, degree_v)
+points = surface.points(u, v)
+normals = surface.normals(u, v)
+u, v = surface.closest_params(query_points)
+####################################################
+'''
+
+
+def full_knots(knots):
+    '''
+    Maya knot vector to the full clamped vector used by De Boor (adds the two outer knots)
+    '''
+
+    knots = np.asarray(knots, dtype=np.float64).ravel()
+
+    return np.concatenate(([knots[0]], knots, [knots[-1]]))
+
+def find_spans(knots, degree, count, params):
+    '''
+    Knot span index of each parameter, knots is the full vector, count is the number of CVs
+    '''
+
+    spans = np.searchsorted(knots, params, side='right') - 1
+
+    return np.clip(spans, degree, count - 1)
+
+def de_boor(knots, degree, spans, params, control):
+    '''
+    De Boor reduction along axis 1.
+
+    knots   = (numpy array) Full knot vector
+    degree  = (int) Degree
+    spans   = (numpy int array) (N,) knot span per parameter
+    params  = (numpy array) (N,) parameters
+    control = (numpy array) (N, degree + 1, ...) control points of each span
+
+    Returns (N, ...) array
+    '''
+
+    control = np.array(control, dtype=np.float64)
+    extra = (slice(None),) + (None,) * (control.ndim - 2)
+    for r in range(1, degree + 1):
+        for j in range(degree, r - 1, -1):
+            low = knots[spans + j - degree]
+            high = knots[spans + j + 1 - r]
+            span = high - low
+            alpha = np.divide(params - low, span, out=np.zeros_like(params), where=span != 0)[extra]
+            control[:, j] = (1.0 - alpha) * control[:, j - 1] + alpha * control[:, j]
+
+    return control[:, degree]
+
+def derivative_control(knots, degree, control, axis=0):
+    '''
+    Control points of the derivative (hodograph) along axis.
+
+    knots   = (numpy array) Full knot vector
+    degree  = (int) Degree
+    control = (numpy array) Control points, CVs along axis
+
+    Returns (full knot vector, degree - 1, control points)
+    '''
+
+    control = np.moveaxis(np.asarray(control, dtype=np.float64), axis, 0)
+    count = control.shape[0]
+    span = knots[degree + 1:degree + count] - knots[1:count]
+    scale = np.divide(degree, span, out=np.zeros_like(span), where=span != 0)
+    derived = (control[1:] - control[:-1]) * scale.reshape((-1,) + (1,) * (control.ndim - 1))
+
+    return knots[1:-1], degree - 1, np.moveaxis(derived, 0, axis)
+
+def _homogeneous(cvs, weights):
+    cvs = np.asarray(cvs, dtype=np.float64)
+    if weights is None:
+        return cvs, False
+
+    weights = np.asarray(weights, dtype=np.float64)
+    if np.allclose(weights, 1.0):
+        return cvs, False
+
+    return np.concatenate((cvs * weights[..., None], weights[..., None]), axis=-1), True
+
+def _closest_segments(points, samples):
+    '''
+    Nearest polyline segment of samples (S, 3) for each point, returns (segment index, 0-1 position)
+    '''
+
+    starts, edges = samples[:-1], np.diff(samples, axis=0)
+    edge_lengths = np.maximum(np.einsum('ij,ij->i', edges, edges), 1e-20)
+    segment = np.zeros(len(points), dtype=np.int64)
+    blend = np.zeros(len(points))
+
+    batch = max(1, 4000000 // len(edges))
+    for first in range(0, len(points), batch):
+        rows = points[first:first + batch]
+        t = np.clip(np.einsum('qsi,si->qs', rows[:, None, :] - starts[None], edges) / edge_lengths, 0.0, 1.0)
+        distance = np.linalg.norm(starts[None] + t[..., None] * edges[None] - rows[:, None, :], axis=2)
+        segment[first:first + batch] = np.argmin(distance, axis=1)
+        blend[first:first + batch] = t[np.arange(len(rows)), segment[first:first + batch]]
+
+    return segment, blend
+
+
+class NurbsCurve(object):
+    '''
+    NURBS curve snapshot.
+
+    cvs      = (numpy array) (N, 3) CV positions
+    knots    = ([float]) Maya knot vector, N + degree - 1 values
+    degree   = (int) Degree
+    periodic = (bol) Periodic curve, parameters wrap around the domain
+    weights  = (numpy array) (N,) CV weights, None for a non rational curve
+    '''
+
+    def __init__(self, cvs, knots, degree, periodic=False, weights=None):
+        self.cvs = np.asarray(cvs, dtype=np.float64).reshape(-1, 3)
+        self.knots = full_knots(knots)
+        self.degree = int(degree)
+        self.periodic = bool(periodic)
+        if len(self.knots) != len(self.cvs) + self.degree + 1:
+            raise ValueError(f'{len(self.cvs)} CVs of degree {self.degree} need {len(self.cvs) + self.degree - 1} '
+                             f'knots, got {len(self.knots) - 2}')
+
+        self.control, self.rational = _homogeneous(self.cvs, weights)
+        self.domain = (float(self.knots[self.degree]), float(self.knots[len(self.cvs)]))
+        # Closed curves (start CV on the end CV) wrap like periodic ones, the position is continuous across the seam
+        self.closed = self.periodic or bool(np.allclose(self.cvs[0], self.cvs[-1]))
+        self._derived = [(self.knots, self.degree, self.control)]
+
+    def __repr__(self):
+        return f'NurbsCurve(cvs={len(self.cvs)}, degree={self.degree}, domain={self.domain})'
+
+    def wrap(self, params):
+        '''
+        Parameters moved into the domain, wrapped for periodic and closed curves, clamped otherwise
+        '''
+
+        params = np.asarray(params, dtype=np.float64).ravel()
+        start, end = self.domain
+        if self.closed:
+            wrapped = start + np.mod(params - start, end - start)
+            # Keep the domain end on the end instead of wrapping it to the start
+            return np.where(np.isclose(params, end), end, wrapped)
+
+        return np.clip(params, start, end)
+
+    def _hodograph(self, order):
+        while len(self._derived) <= order:
+            knots, degree, control = self._derived[-1]
+            if degree == 0:
+                self._derived.append((knots, 0, np.zeros_like(control)))
+            else:
+                self._derived.append(derivative_control(knots, degree, control))
+
+        return self._derived[order]
+
+    def _evaluate(self, params, order):
+        knots, degree, control = self._hodograph(order)
+        if degree == 0 and order > self.degree:
+            return np.zeros((len(params), control.shape[-1]))
+
+        spans = find_spans(knots, degree, len(control), params)
+        gather = spans[:, None] - degree + np.arange(degree + 1)
+
+        return de_boor(knots, degree, spans, params, control[gather])
+
+    def derivatives(self, params, order=1):
+        '''
+        Positions and derivatives up to order (0-2) as a list of (N, 3) arrays
+        '''
+
+        params = self.wrap(params)
+        values = [self._evaluate(params, i) for i in range(order + 1)]
+        if not self.rational:
+            return values
+
+        # Quotient rule on the homogeneous curve
+        w = [x[:, 3:] for x in values]
+        points = values[0][:, :3] / w[0]
+        result = [points]
+        if order >= 1:
+            first = (values[1][:, :3] - w[1] * points) / w[0]
+            result.append(first)
+        if order >= 2:
+            result.append((values[2][:, :3] - 2.0 * w[1] * first - w[2] * points) / w[0])
+
+        return result
+
+    def points(self, params):
+        return self.derivatives(params, order=0)[0]
+
+    def tangents(self, params, normalize=True):
+        tangents = self.derivatives(params, order=1)[1]
+        if normalize:
+            tangents = tangents / np.maximum(np.linalg.norm(tangents, axis=1, keepdims=True), 1e-12)
+
+        return tangents
+
+    def sample_params(self, samples_per_span=16):
+        '''
+        Evenly spaced parameters inside every knot span
+        '''
+
+        breaks = np.unique(self.knots[self.degree:len(self.cvs) + 1])
+        steps = np.linspace(0.0, 1.0, samples_per_span, endpoint=False)
+        params = (breaks[:-1, None] + np.diff(breaks)[:, None] * steps).ravel()
+
+        return np.concatenate((params, breaks[-1:]))
+
+    def closest_params(self, points, samples_per_span=16, iterations=6):
+        '''
+        Closest parameter for each point. Nearest sampled segment, then Newton steps on (C - P) . C' = 0.
+
+        points           = (numpy array) (N, 3) positions
+        samples_per_span = (int) Samples for the first guess
+        iterations       = (int) Newton steps
+
+        Returns numpy array of parameters
+        '''
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        sample_params = self.sample_params(samples_per_span)
+        segment, blend = _closest_segments(points, self.points(sample_params))
+        params = sample_params[segment] + np.diff(sample_params)[segment] * blend
+        max_step = np.diff(sample_params).max() # Stay near the first guess, Newton can overshoot past curve ends
+
+        for _ in range(iterations):
+            position, first, second = self.derivatives(params, order=2)
+            offset = position - points
+            gradient = np.einsum('ij,ij->i', offset, first)
+            speed = np.einsum('ij,ij->i', first, first)
+            slope = speed + np.einsum('ij,ij->i', offset, second)
+            # Gauss-Newton step where the curvature term makes the slope negative
+            slope = np.where(slope > 1e-12, slope, np.maximum(speed, 1e-12))
+            params = self.wrap(params - np.clip(gradient / slope, -max_step, max_step))
+
+        return params
+
+    def closest_points(self, points, **kwargs):
+        '''
+        Returns (parameters, closest positions, distances)
+        '''
+
+        params = self.closest_params(points, **kwargs)
+        closest = self.points(params)
+
+        return params, closest, np.linalg.norm(closest - np.asarray(points, dtype=np.float64).reshape(-1, 3), axis=1)
+
+
+class NurbsSurface(object):
+    '''
+    NURBS surface snapshot.
+
+    cvs                   = (numpy array) (U, V, 3) CV positions, Maya u major order reshaped
+    knots_u, knots_v      = ([float]) Maya knot vectors
+    degree_u, degree_v    = (int) Degrees
+    periodic_u, periodic_v = (bol) Periodic directions
+    weights               = (numpy array) (U, V) CV weights, None for a non rational surface
+    '''
+
+    def __init__(self, cvs, knots_u, knots_v, degree_u, degree_v, periodic_u=False, periodic_v=False, weights=None):
+        self.cvs = np.asarray(cvs, dtype=np.float64)
+        if self.cvs.ndim != 3 or self.cvs.shape[2] != 3:
+            raise ValueError(f'Surface CVs must be shaped (U, V, 3), got {self.cvs.shape}')
+
+        self.knots_u, self.knots_v = full_knots(knots_u), full_knots(knots_v)
+        self.degree_u, self.degree_v = int(degree_u), int(degree_v)
+        self.periodic_u, self.periodic_v = bool(periodic_u), bool(periodic_v)
+        count_u, count_v = self.cvs.shape[:2]
+        if len(self.knots_u) != count_u + self.degree_u + 1 or len(self.knots_v) != count_v + self.degree_v + 1:
+            raise ValueError('Knot vectors do not match the CV grid and degrees')
+
+        self.control, self.rational = _homogeneous(self.cvs, weights)
+        self.domain_u = (float(self.knots_u[self.degree_u]), float(self.knots_u[count_u]))
+        self.domain_v = (float(self.knots_v[self.degree_v]), float(self.knots_v[count_v]))
+        # Closed directions (first CV row on the last row) wrap like periodic ones
+        self.closed_u = self.periodic_u or bool(np.allclose(self.cvs[0], self.cvs[-1]))
+        self.closed_v = self.periodic_v or bool(np.allclose(self.cvs[:, 0], self.cvs[:, -1]))
+        self._derived = {(0, 0): (self.knots_u, self.degree_u, self.knots_v, self.degree_v, self.control)}
+
+    def __repr__(self):
+        return (f'NurbsSurface(cvs={self.cvs.shape[0]}x{self.cvs.shape[1]}, degree=({self.degree_u}, {self.degree_v}), '
+                f'domain=({self.domain_u}, {self.domain_v}))')
+
+    def wrap(self, u, v):
+        '''
+        Parameters moved into the domain, wrapped in periodic and closed directions, clamped otherwise
+        '''
+
+        result = []
+        for params, (start, end), closed in ((u, self.domain_u, self.closed_u), (v, self.domain_v, self.closed_v)):
+            params = np.asarray(params, dtype=np.float64).ravel()
+            if closed:
+                wrapped = start + np.mod(params - start, end - start)
+                result.append(np.where(np.isclose(params, end), end, wrapped))
+            else:
+                result.append(np.clip(params, start, end))
+
+        return result
+
+    def _hodograph(self, order_u, order_v):
+        key = (order_u, order_v)
+        if key not in self._derived:
+            if order_v > 0:
+                knots_u, degree_u, knots_v, degree_v, control = self._hodograph(order_u, order_v - 1)
+                if degree_v == 0:
+                    self._derived[key] = (knots_u, degree_u, knots_v, 0, np.zeros_like(control))
+                else:
+                    knots_v, degree_v, control = derivative_control(knots_v, degree_v, control, axis=1)
+                    self._derived[key] = (knots_u, degree_u, knots_v, degree_v, control)
+            else:
+                knots_u, degree_u, knots_v, degree_v, control = self._hodograph(order_u - 1, 0)
+                if degree_u == 0:
+                    self._derived[key] = (knots_u, 0, knots_v, degree_v, np.zeros_like(control))
+                else:
+                    knots_u, degree_u, control = derivative_control(knots_u, degree_u, control, axis=0)
+                    self._derived[key] = (knots_u, degree_u, knots_v, degree_v, control)
+
+        return self._derived[key]
+
+    def _evaluate(self, u, v, order_u, order_v):
+        knots_u, degree_u, knots_v, degree_v, control = self._hodograph(order_u, order_v)
+        spans_u = find_spans(knots_u, degree_u, control.shape[0], u)
+        spans_v = find_spans(knots_v, degree_v, control.shape[1], v)
+        rows = spans_u[:, None] - degree_u + np.arange(degree_u + 1)
+        columns = spans_v[:, None] - degree_v + np.arange(degree_v + 1)
+
+        gathered = control[rows[:, :, None], columns[:, None, :]] # (N, degree_u + 1, degree_v + 1, dim)
+        along_v = de_boor(knots_v, degree_v, spans_v, v, np.swapaxes(gathered, 1, 2))
+
+        return de_boor(knots_u, degree_u, spans_u, u, along_v)
+
+    def derivatives(self, u, v, order=1):
+        '''
+        Position and partial derivatives as a dict of (N, 3) arrays.
+        order 0: 'p', order 1 adds 'u', 'v', order 2 adds 'uu', 'uv', 'vv'
+        '''
+
+        u, v = self.wrap(u, v)
+        keys = {'p': (0, 0), 'u': (1, 0), 'v': (0, 1), 'uu': (2, 0), 'uv': (1, 1), 'vv': (0, 2)}
+        wanted = [k for k in keys if sum(keys[k]) <= order]
+        values = {k: self._evaluate(u, v, *keys[k]) for k in wanted}
+        if not self.rational:
+            return values
+
+        # Quotient rule on the homogeneous surface
+        w = {k: x[:, 3:] for k, x in values.items()}
+        result = {'p': values['p'][:, :3] / w['p']}
+        if order >= 1:
+            for k in ['u', 'v']:
+                result[k] = (values[k][:, :3] - w[k] * result['p']) / w['p']
+        if order >= 2:
+            result['uu'] = (values['uu'][:, :3] - 2.0 * w['u'] * result['u'] - w['uu'] * result['p']) / w['p']
+            result['vv'] = (values['vv'][:, :3] - 2.0 * w['v'] * result['v'] - w['vv'] * result['p']) / w['p']
+            result['uv'] = (values['uv'][:, :3] - w['u'] * result['v'] - w['v'] * result['u'] -
+                            w['uv'] * result['p']) / w['p']
+
+        return result
+
+    def points(self, u, v):
+        return self.derivatives(u, v, order=0)['p']
+
+    def normals(self, u, v, normalize=True):
+        values = self.derivatives(u, v, order=1)
+        normals = np.cross(values['u'], values['v'])
+        if normalize:
+            normals = normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+
+        return normals
+
+    def isoparms(self, values, direction='u'):
+        '''
+        Exact isoparm curves at constant u (direction 'u') or constant v, all values in one De Boor pass.
+        The curves keep the knots, degree and periodic form of the other direction.
+
+        values    = (numpy array) (N,) parameters
+        direction = (str) 'u' or 'v', the parameter held constant
+
+        Returns (cvs (N, count, 3), weights (N, count) or None, Maya knots, degree, periodic)
+        '''
+
+        if direction == 'u':
+            values = self.wrap(values, self.domain_v[0])[0]
+            knots, degree, control = self.knots_u, self.degree_u, self.control
+            other = (self.knots_v, self.degree_v, self.periodic_v)
+        else:
+            values = self.wrap(self.domain_u[0], values)[1]
+            knots, degree, control = self.knots_v, self.degree_v, np.swapaxes(self.control, 0, 1)
+            other = (self.knots_u, self.degree_u, self.periodic_u)
+
+        spans = find_spans(knots, degree, control.shape[0], values)
+        rows = spans[:, None] - degree + np.arange(degree + 1)
+        control = de_boor(knots, degree, spans, values, control[rows]) # (N, count, dim)
+
+        weights = None
+        if self.rational:
+            weights = control[..., 3]
+            control = control[..., :3] / weights[..., None]
+
+        return control, weights, other[0][1:-1], other[1], other[2]
+
+    def sample_params(self, samples_per_span=8):
+        '''
+        Grid of evenly spaced parameters inside every knot span, returns flattened (u, v) arrays
+        '''
+
+        params = []
+        for knots, degree, count in ((self.knots_u, self.degree_u, self.cvs.shape[0]),
+                                     (self.knots_v, self.degree_v, self.cvs.shape[1])):
+            breaks = np.unique(knots[degree:count + 1])
+            steps = np.linspace(0.0, 1.0, samples_per_span, endpoint=False)
+            params.append(np.concatenate(((breaks[:-1, None] + np.diff(breaks)[:, None] * steps).ravel(), breaks[-1:])))
+
+        u, v = np.meshgrid(params[0], params[1], indexing='ij')
+
+        return u.ravel(), v.ravel()
+
+    def closest_params(self, points, samples_per_span=8, iterations=8):
+        '''
+        Closest (u, v) for each point. Nearest sample point, then Newton steps on the
+        gradient of the squared distance.
+
+        points           = (numpy array) (N, 3) positions
+        samples_per_span = (int) Samples per span and direction for the first guess
+        iterations       = (int) Newton steps
+
+        Returns (u array, v array)
+        '''
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        sample_u, sample_v = self.sample_params(samples_per_span)
+        nearest = sg.PointGrid(self.points(sample_u, sample_v)).nearest(points)[0]
+        u, v = sample_u[nearest], sample_v[nearest]
+        # Stay near the first guess, Newton can overshoot past surface edges
+        max_step_u = np.diff(np.unique(sample_u)).max()
+        max_step_v = np.diff(np.unique(sample_v)).max()
+
+        for _ in range(iterations):
+            values = self.derivatives(u, v, order=2)
+            offset = values['p'] - points
+            gradient_u = np.einsum('ij,ij->i', offset, values['u'])
+            gradient_v = np.einsum('ij,ij->i', offset, values['v'])
+            a = np.einsum('ij,ij->i', values['u'], values['u'])
+            b = np.einsum('ij,ij->i', values['u'], values['v'])
+            c = np.einsum('ij,ij->i', values['v'], values['v'])
+
+            # Newton, or Gauss-Newton where the Hessian is not positive definite
+            hessian_a = a + np.einsum('ij,ij->i', offset, values['uu'])
+            hessian_b = b + np.einsum('ij,ij->i', offset, values['uv'])
+            hessian_c = c + np.einsum('ij,ij->i', offset, values['vv'])
+            determinant = hessian_a * hessian_c - hessian_b * hessian_b
+            gauss = (determinant <= 1e-12) | (hessian_a <= 0)
+            coupled_a = np.where(gauss, a, hessian_a)
+            coupled_b = np.where(gauss, b, hessian_b)
+            coupled_c = np.where(gauss, c, hessian_c)
+            determinant = np.maximum(coupled_a * coupled_c - coupled_b * coupled_b, 1e-20)
+
+            step_u = (coupled_c * gradient_u - coupled_b * gradient_v) / determinant
+            step_v = (coupled_a * gradient_v - coupled_b * gradient_u) / determinant
+
+            # Active set, a parameter on an open edge with the minimum past it stays there,
+            # the other one takes a 1D Newton step along the edge
+            edge_u = self._on_edge(u, gradient_u, self.domain_u, self.closed_u)
+            edge_v = self._on_edge(v, gradient_v, self.domain_v, self.closed_v)
+            step_u = np.where(edge_v, gradient_u / np.where(hessian_a > 1e-12, hessian_a, np.maximum(a, 1e-20)), step_u)
+            step_v = np.where(edge_u, gradient_v / np.where(hessian_c > 1e-12, hessian_c, np.maximum(c, 1e-20)), step_v)
+            step_u = np.where(edge_u, 0.0, step_u)
+            step_v = np.where(edge_v, 0.0, step_v)
+            u, v = self.wrap(u - np.clip(step_u, -max_step_u, max_step_u), v - np.clip(step_v, -max_step_v, max_step_v))
+
+        return u, v
+
+    @staticmethod
+    def _on_edge(params, gradient, domain, closed):
+        '''
+        Parameters held on an open edge, the squared distance keeps decreasing past it
+        '''
+
+        if closed:
+            return np.zeros(len(params), dtype=bool)
+
+        return ((params <= domain[0]) & (gradient > 0)) | ((params >= domain[1]) & (gradient < 0))
+
+    def closest_points(self, points, **kwargs):
+        '''
+        Returns (u array, v array, closest positions, distances)
+        '''
+
+        u, v = self.closest_params(points, **kwargs)
+        closest = self.points(u, v)
+
+        return u, v, closest, np.linalg.norm(closest - np.asarray(points, dtype=np.float64).reshape(-1, 3), axis=1)
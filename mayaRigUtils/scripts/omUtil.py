@@ -1,4 +1,12 @@
+import maya.cmds as cmds
 from maya import OpenMaya as om
+from maya.api import OpenMaya
+from . import modifierCommand as mc
+import logging
+import os
+
+LOG = logging.getLogger(__name__)
+LOG.setLevel(logging.INFO)
 
 
 def get_dag_path(node, shape):
@@ -44,3 +52,237 @@ def get_mdagpath_from_object_name(object_name):
   
   return dag_path
 
+def delete_unused_shapes(shape_types=None, dry_run=False):
+    '''
+    Removes unused intermediate shape nodes of every geometry type in one pass over the scene.
+    A shape is unused when intermediateObject is on and none of its plugs are connected.
+    Referenced and locked shapes are skipped. Shapes are deleted with one UndoableModifier,
+    a single undo restores everything.
+
+    shape_types = ([str]) Shape node types to sweep. Defaults to mesh, nurbsCurve and nurbsSurface
+    dry_run     = (bol) Only report the shapes, nothing is deleted
+
+    Returns list of unused shape names
+    '''
+
+    if shape_types is None:
+        shape_types = ['mesh', 'nurbsCurve', 'nurbsSurface']
+
+    dead_nodes = []
+    dead_intermediates = []
+    node_it = OpenMaya.MItDependencyNodes(OpenMaya.MFn.kShape)
+    while not node_it.isDone():
+        node = node_it.thisNode()
+        node_it.next()
+        node_fn = OpenMaya.MFnDagNode(node)
+        if node_fn.typeName not in shape_types:
+            continue
+        if not node_fn.findPlug('intermediateObject', False).asBool():
+            continue
+        if node_fn.isFromReferencedFile or node_fn.isLocked:
+            continue
+        if len(node_fn.getConnections()):
+            continue
+
+        dead_nodes.append(node)
+        dead_intermediates.append(node_fn.fullPathName())
+
+    if dead_intermediates and not dry_run:
+        with UndoableModifier(name='Delete unused shapes') as modifier:
+            for node in dead_nodes:
+                modifier.deleteNode(node)
+            modifier.doIt()
+
+    if not dead_intermediates:
+        LOG.info('No unused shapes found')
+    elif dry_run:
+        LOG.info(f'Found {len(dead_intermediates)} unused shape nodes')
+    else:
+        LOG.info(f'Deleted {len(dead_intermediates)} shape nodes')
+
+    return dead_intermediates
+
+_DAG_TYPES = {}
+
+class UndoableModifier(object):
+    '''
+    MDagModifier / MDGModifier pair that goes on the undo queue as one step.
+    Edits are queued on the API modifiers, DAG node creation on the MDagModifier, everything else on
+    the MDGModifier. The first doIt() runs both through do_it_undoable(), later doIt() calls run the
+    edits added since, and one undo reverts every pass. As a context manager it also opens an undo
+    chunk, so cmds calls made in the with block undo in the same step.
+
+    name = (str) Undo chunk name
+
+    Usage:
+        with omu.UndoableModifier(name='Constrain to curve') as modifier:
+            node = modifier.createNode('pointOnCurveInfo')
+            modifier.connect(world_space_plug, OpenMaya.MFnDependencyNode(node).findPlug('inputCurve', False))
+            modifier.doIt()
+    '''
+
+    def __init__(self, name='Modifier'):
+        self.name = name
+        self._dag_modifier = OpenMaya.MDagModifier()
+        self._dg_modifier = OpenMaya.MDGModifier()
+        self._on_undo_queue = False
+        self._chunk_open = False
+
+    def __enter__(self):
+        if cmds.undoInfo(q=True, state=True):
+            cmds.undoInfo(openChunk=True, undoName=self.name)
+            self._chunk_open = True
+
+        return self
+
+    def __exit__(self, *args):
+        if self._chunk_open:
+            cmds.undoInfo(closeChunk=True)
+            self._chunk_open = False
+
+    def doIt(self):
+        if self._on_undo_queue:
+            self._dag_modifier.doIt()
+            self._dg_modifier.doIt()
+        else:
+            do_it_undoable(self._dag_modifier, self._dg_modifier)
+            self._on_undo_queue = True
+
+    def createNode(self, node_type, parent=None):
+        '''
+        Queues node_type creation, returns its MObject. Shapes created without a parent return their new transform.
+        '''
+
+        if node_type not in _DAG_TYPES:
+            _DAG_TYPES[node_type] = 'dagNode' in (cmds.nodeType(node_type, isTypeName=True, inherited=True) or [])
+        if _DAG_TYPES[node_type]:
+            return self._dag_modifier.createNode(node_type, OpenMaya.MObject.kNullObj if parent is None else parent)
+
+        return self._dg_modifier.createNode(node_type)
+
+    def createCurve(self, cvs, knots, degree, form, weights=None, name='curve'):
+        '''
+        Queues a nurbsCurve with its transform, returns the transform MObject.
+        The curve is built in MFnNurbsCurveData and set as the shape's cached geometry.
+
+        cvs     = ([[float]]) CV positions, overlapping CVs included for periodic curves
+        knots   = ([float]) Maya knot vector
+        degree  = (int) Degree
+        form    = (int) OpenMaya.MFnNurbsCurve.kOpen, kClosed or kPeriodic
+        weights = ([float]) CV weights for a rational curve
+        name    = (str) Transform name, the shape is named {name}Shape
+        '''
+
+        if weights is None:
+            points = OpenMaya.MPointArray([OpenMaya.MPoint(*[float(x) for x in cv]) for cv in cvs])
+        else:
+            points = OpenMaya.MPointArray([OpenMaya.MPoint(*[float(x) for x in cv], float(w)) 
+                                           for cv, w in zip(cvs, weights)])
+        data = OpenMaya.MFnNurbsCurveData().create()
+        OpenMaya.MFnNurbsCurve().create(points, OpenMaya.MDoubleArray([float(x) for x in knots]), degree, form, 
+                                        False, weights is not None, data)
+
+        transform = self._dag_modifier.createNode('transform')
+        shape = self._dag_modifier.createNode('nurbsCurve', transform)
+        self._dg_modifier.newPlugValue(OpenMaya.MFnDependencyNode(shape).findPlug('cached', False), data)
+        self._dg_modifier.renameNode(transform, name)
+        self._dg_modifier.renameNode(shape, f'{name}Shape')
+
+        return transform
+
+    def deleteNode(self, node):
+        self._dg_modifier.deleteNode(node)
+
+    def renameNode(self, node, name):
+        self._dg_modifier.renameNode(node, name)
+
+    def connect(self, source, destination):
+        self._dg_modifier.connect(source, destination)
+
+    def disconnect(self, source, destination):
+        self._dg_modifier.disconnect(source, destination)
+
+    def newPlugValueDouble(self, plug, value):
+        self._dg_modifier.newPlugValueDouble(plug, float(value))
+
+    def newPlugValueInt(self, plug, value):
+        self._dg_modifier.newPlugValueInt(plug, int(value))
+
+    def newPlugValueBool(self, plug, value):
+        self._dg_modifier.newPlugValueBool(plug, bool(value))
+
+    def newPlugValueMAngle(self, plug, angle):
+        self._dg_modifier.newPlugValueMAngle(plug, angle)
+
+    def newPlugValue(self, plug, data):
+        self._dg_modifier.newPlugValue(plug, data)
+
+    def newPlugValueMMatrix(self, plug, matrix):
+        self._dg_modifier.newPlugValue(plug, OpenMaya.MFnMatrixData().create(matrix))
+
+    def addNumericAttribute(self, node, name, attribute_type='float', default=0.0, minimum=None, maximum=None, 
+                            keyable=True):
+        '''
+        Queues a numeric attribute, attribute_type is an addAttr type: 'float', 'double', 'long' or 'bool'
+        '''
+
+        numeric_types = {'float': OpenMaya.MFnNumericData.kFloat, 'double': OpenMaya.MFnNumericData.kDouble, 
+                         'long': OpenMaya.MFnNumericData.kInt, 'bool': OpenMaya.MFnNumericData.kBoolean}
+        attr_fn = OpenMaya.MFnNumericAttribute()
+        attr = attr_fn.create(name, name, numeric_types[attribute_type], default)
+        attr_fn.keyable = keyable
+        if minimum is not None:
+            attr_fn.setMin(minimum)
+        if maximum is not None:
+            attr_fn.setMax(maximum)
+        self._dg_modifier.addAttribute(node, attr)
+
+def get_dag_paths(nodes, unique=True):
+    '''
+    API 2.0 MDagPaths of nodes, looked up one node at a time.
+    MSelectionList.add() merges duplicates, so indexing one shared list by input position misaligns.
+    Duplicates (same full path) are dropped here, first occurrence order is kept.
+
+    nodes  = ([str]) Maya object names
+    unique = (bol) Drop duplicates. False keeps one path per given node, aligned with nodes
+
+    Returns (names, paths), names are the given names of the kept nodes
+    '''
+
+    names = []
+    paths = []
+    seen = set()
+    for node in nodes:
+        dag_path = OpenMaya.MSelectionList().add(node).getDagPath(0)
+        if unique and dag_path.fullPathName() in seen:
+            continue
+        seen.add(dag_path.fullPathName())
+        names.append(node)
+        paths.append(dag_path)
+
+    return names, paths
+
+def load_modifier_command():
+    '''
+    Loads the modifierCommand plugin (rigUtilsModifier command) from this folder
+    '''
+
+    if not cmds.pluginInfo('modifierCommand', q=True, loaded=True):
+        cmds.loadPlugin(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modifierCommand.py'), quiet=True)
+
+def do_it_undoable(*modifiers):
+    '''
+    Runs API 2.0 MDGModifier / MDagModifier objects as one undoable step, through the rigUtilsModifier
+    plugin command. The command keeps the modifiers, so operations added later and run with their own
+    doIt() are also reverted by the same undo.
+
+    modifiers = (MDGModifier) Modifiers to run, in order. Undo reverts them in reverse order.
+    '''
+
+    load_modifier_command()
+    mc.SHARED.pending.append(list(modifiers))
+    try:
+        getattr(cmds, mc.COMMAND_NAME)()
+    finally:
+        # The command takes its modifiers, anything left here failed before it ran
+        del mc.SHARED.pending[:]
@@ -162,7 +162,8 @@ def rdctl_prebind_matrix(dorito_list, joint_suffix=None, buffer_suffix=None):
     if not skin_cluster:
         raise AttributeError('Last selected object does not have a skinCluster')
 
-    skin_joints = skn.get_skin_cluster_influences(skin_cluster=skin_cluster)
+    skin_info = skn.get_skin_cluster_info(skin_cluster)
+    skin_joints = skin_info.influences()
 
     # Get all selected joints
     joint_list = []
@@ -179,7 +180,7 @@ def rdctl_prebind_matrix(dorito_list, joint_suffix=None, buffer_suffix=None):
     if joint_list != []:
         if 'mGear' in buffer_suffix:
             for joint in joint_list:
-                joint_index = skn.get_skin_cluster_influence_index(skin_cluster=skin_cluster, influence=joint)
+                joint_index = skin_info.index(joint)
                 joint_buffer = cmds.listConnections(f'{joint}.inv_wm_conn_{str(joint)}', d=True)[0]
                 if joint_buffer:
                     cmds.connectAttr(f'{joint_buffer}.worldInverseMatrix', 
@@ -188,7 +189,7 @@ def rdctl_prebind_matrix(dorito_list, joint_suffix=None, buffer_suffix=None):
 
         else:
             for joint in joint_list:
-                joint_index = skn.get_skin_cluster_influence_index(skin_cluster=skin_cluster, influence=joint)
+                joint_index = skin_info.index(joint)
                 joint_buffer = joint.replace(joint_suffix, buffer_suffix.split(' ')[0]) # Get joint bfr
                 if joint_buffer:
                     cmds.connectAttr(f'{joint_buffer}.worldInverseMatrix', 
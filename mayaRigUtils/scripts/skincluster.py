@@ -1,7 +1,29 @@
 import maya.cmds as cmds
 from maya.api import OpenMaya, OpenMayaAnim
 from . import omUtil as omu
+from . import spatialGrid as sg
+from concurrent import futures
 import xml.etree.ElementTree as et
+import numpy as np
+import hashlib
+import logging
+import json
+import time
+import os
+
+LOG = logging.getLogger(__name__)
+LOG.setLevel(logging.INFO)
+
+
+# Binary weight file layout.
+# <mesh>_skin.json holds the header (influences, vertex count, topology hash),
+# the weight matrix is stored next to it as plain .npy arrays so it can be
+# memory mapped with numpy.load(mmap_mode='r').
+SKIN_FILE_VERSION = 2
+SKIN_FILE_SUFFIX = '_skin.json'
+SPARSE_DENSITY = 0.25 # Use CSR storage when less than 25% of the matrix is non zero
+SKIN_BLOCK_SIZE = 1024 # Points per checksum block, used for diffs and incremental imports
+SKIN_BLOCK_DECIMALS = 5 # Weights are rounded to this precision before hashing
 
 
 def get_skin_clusters(mesh_name):
@@ -40,6 +62,9 @@ def get_skin_cluster_influences(skin_cluster, full_path=False):
 def get_skin_cluster_influence_index(skin_cluster, influence):
     """Get the index of given influence.
 
+    Uses the cached SkinClusterInfo of skin_cluster, so calling this in a
+    per-joint loop does not rebuild the function set every time.
+
     Args:
         skin_cluster (str): skinCluster node
         influence (str): influence object
@@ -47,17 +72,792 @@ def get_skin_cluster_influence_index(skin_cluster, influence):
     Return:
         int: index
     """
-    skin_cluster_obj = (
-        OpenMaya.MSelectionList().add(skin_cluster).getDependNode(0)
-    )
-    influence_dag = OpenMaya.MSelectionList().add(influence).getDagPath(0)
-    index = int(
-        OpenMayaAnim.MFnSkinCluster(
-            skin_cluster_obj
-        ).indexForInfluenceObject(influence_dag)
-    )
 
-    return index
+    return get_skin_cluster_info(skin_cluster).index(influence)
+
+
+# Cached SkinClusterInfo per skinCluster name
+_SKIN_CLUSTER_INFO = {}
+
+
+class SkinClusterInfo(object):
+    '''
+    Influence lookup for one skinCluster, built once and reused.
+
+    Holds the MFnSkinCluster, the influence dag paths with their logical
+    indices and the bindPreMatrix array plug. Names are read from the dag paths
+    at lookup, so renamed influences still resolve. is_valid() is false once
+    influences are added or removed, or the node is deleted or renamed.
+    Get it through get_skin_cluster_info(), which rebuilds stale entries.
+
+    Usage:
+        info = get_skin_cluster_info('body_skinCluster')
+        info.index('spine_01_jnt')
+        info.bind_pre_matrix_plug('spine_01_jnt')
+    '''
+
+    def __init__(self, skin_cluster):
+        self.skin_cluster = skin_cluster
+        skin_cluster_obj = OpenMaya.MSelectionList().add(skin_cluster).getDependNode(0)
+        self.handle = OpenMaya.MObjectHandle(skin_cluster_obj)
+        self.fn = OpenMayaAnim.MFnSkinCluster(skin_cluster_obj)
+        self.matrix_plug = self.fn.findPlug('matrix', False)
+        self.bind_pre_matrix = self.fn.findPlug('bindPreMatrix', False)
+
+        self.influence_paths = list(self.fn.influenceObjects())
+        self.logical_indices = [int(self.fn.indexForInfluenceObject(dag)) for dag in self.influence_paths]
+
+        self._connected = self._connected_indices()
+
+    def __repr__(self):
+        return f'SkinClusterInfo({self.skin_cluster}, influences={len(self.influence_paths)})'
+
+    def _connected_indices(self):
+        return list(self.matrix_plug.getExistingArrayAttributeIndices())
+
+    def is_valid(self):
+        '''
+        False if the node was deleted or renamed, or influences were added / removed since this was built
+        '''
+
+        if not self.handle.isValid() or not self.handle.isAlive():
+            return False
+
+        if OpenMaya.MFnDependencyNode(self.handle.object()).name() != self.skin_cluster:
+            return False
+
+        return self._connected_indices() == self._connected
+
+    def influences(self, full_path=False):
+        return [dag.fullPathName() if full_path else dag.partialPathName() for dag in self.influence_paths]
+
+    def _index_map(self):
+        '''
+        Current partial and full path name -> logical index
+        '''
+
+        index_map = {}
+        for dag, index in zip(self.influence_paths, self.logical_indices):
+            index_map[dag.partialPathName()] = index
+            index_map[dag.fullPathName()] = index
+
+        return index_map
+
+    def index(self, influence):
+        '''
+        Logical index of influence (matrix / bindPreMatrix element)
+
+        influence = (str) Influence name, partial or full path
+        '''
+
+        return self.indices([influence])[0]
+
+    def indices(self, influences):
+        index_map = self._index_map()
+        indices = []
+        for influence in influences:
+            index = index_map.get(influence)
+            if index is None:
+                # Name given differently (namespace, non unique short name), resolve the full path
+                influence_dag = OpenMaya.MSelectionList().add(influence).getDagPath(0)
+                index = index_map.get(influence_dag.fullPathName())
+                if index is None:
+                    raise ValueError(f'{influence} is not an influence of {self.skin_cluster}')
+            indices.append(index)
+
+        return indices
+
+    def bind_pre_matrix_plug(self, influence):
+        '''
+        bindPreMatrix element plug of influence
+        '''
+
+        return self.bind_pre_matrix.elementByLogicalIndex(self.index(influence))
+
+def get_skin_cluster_info(skin_cluster, rebuild=False):
+    '''
+    Cached SkinClusterInfo for skin_cluster. Rebuilt when influences changed.
+
+    skin_cluster = (str) skinCluster node
+    rebuild      = (bol) Force a rebuild
+    '''
+
+    info = _SKIN_CLUSTER_INFO.get(skin_cluster)
+    if rebuild or info is None or not info.is_valid():
+        info = SkinClusterInfo(skin_cluster)
+        _SKIN_CLUSTER_INFO[skin_cluster] = info
+
+    return info
+
+def get_skin_cluster_fn(skin_cluster):
+    '''
+    Returns MFnSkinCluster for skin_cluster
+
+    skin_cluster = (str) skinCluster node
+    '''
+
+    skin_cluster_obj = OpenMaya.MSelectionList().add(skin_cluster).getDependNode(0)
+
+    return OpenMayaAnim.MFnSkinCluster(skin_cluster_obj)
+
+def get_skin_cluster_geometry(skin_fn, points=None):
+    '''
+    Gets the deformed shape of a skinCluster, and a component object covering every point on it.
+    Used for the bulk MFnSkinCluster.getWeights / setWeights calls.
+
+    skin_fn = (MFnSkinCluster) Skin cluster function set
+    points  = ([int]) Sorted point indices. The component only covers these points.
+
+    Returns (MDagPath, MObject components, int point count)
+    Point count is the number of points in the component.
+    '''
+
+    dag_path = skin_fn.getPathAtIndex(skin_fn.indexForOutputConnection(0))
+
+    if dag_path.hasFn(OpenMaya.MFn.kMesh):
+        point_count = OpenMaya.MFnMesh(dag_path).numVertices
+        component_fn = OpenMaya.MFnSingleIndexedComponent()
+        components = component_fn.create(OpenMaya.MFn.kMeshVertComponent)
+
+    elif dag_path.hasFn(OpenMaya.MFn.kNurbsSurface):
+        surface_fn = OpenMaya.MFnNurbsSurface(dag_path)
+        point_count = surface_fn.numCVsInU * surface_fn.numCVsInV
+        component_fn = OpenMaya.MFnDoubleIndexedComponent()
+        components = component_fn.create(OpenMaya.MFn.kSurfaceCVComponent)
+        if points is None:
+            component_fn.setCompleteData(surface_fn.numCVsInU, surface_fn.numCVsInV)
+        else:
+            # Point index is u * numCVsInV + v, matching the complete component order
+            u, v = np.divmod(np.asarray(points, dtype=np.int64), surface_fn.numCVsInV)
+            component_fn.addElements(list(zip(u.tolist(), v.tolist())))
+            point_count = len(points)
+
+        return dag_path, components, point_count
+
+    elif dag_path.hasFn(OpenMaya.MFn.kNurbsCurve):
+        point_count = OpenMaya.MFnNurbsCurve(dag_path).numCVs
+        component_fn = OpenMaya.MFnSingleIndexedComponent()
+        components = component_fn.create(OpenMaya.MFn.kCurveCVComponent)
+
+    else:
+        raise TypeError(f'Unsupported skinned geometry >> {dag_path.partialPathName()}')
+
+    if points is None:
+        component_fn.setCompleteData(point_count)
+    else:
+        component_fn.addElements([int(x) for x in points])
+        point_count = len(points)
+
+    return dag_path, components, point_count
+
+def get_skin_weights(skin_cluster):
+    '''
+    Reads the full weight matrix of a skinCluster in one MFnSkinCluster.getWeights call.
+
+    skin_cluster = (str) skinCluster node
+
+    Returns (numpy array (points, influences), [influence names])
+    Matrix columns follow the influenceObjects() order.
+    '''
+
+    skin_fn = get_skin_cluster_fn(skin_cluster)
+    dag_path, components, point_count = get_skin_cluster_geometry(skin_fn)
+    weights, influence_count = skin_fn.getWeights(dag_path, components)
+    weights = np.fromiter(weights, dtype=np.float64, count=len(weights))
+    influences = [x.partialPathName() for x in skin_fn.influenceObjects()]
+
+    return weights.reshape(point_count, influence_count), influences
+
+def set_skin_weights(skin_cluster, weights, influence_indices=None, normalize=False, points=None):
+    '''
+    Writes a weight matrix to a skinCluster in one MFnSkinCluster.setWeights call.
+
+    skin_cluster      = (str) skinCluster node
+    weights           = (numpy array) (points, influences) weight matrix
+    influence_indices = ([int]) influenceObjects() indices of the matrix columns. Defaults to all influences.
+    normalize         = (bol) Let Maya normalize the weights
+    points            = ([int]) Sorted point indices of the matrix rows, for partial writes. Defaults to all points.
+    '''
+
+    skin_fn = get_skin_cluster_fn(skin_cluster)
+    dag_path, components, point_count = get_skin_cluster_geometry(skin_fn, points=points)
+
+    weights = np.asarray(weights, dtype=np.float64)
+    if influence_indices is None:
+        influence_indices = range(weights.shape[1])
+    if weights.shape[0] != point_count:
+        raise IndexError(f'Weight matrix has {weights.shape[0]} rows, {skin_cluster} deforms {point_count} points')
+
+    skin_fn.setWeights(dag_path, components, OpenMaya.MIntArray(list(influence_indices)),
+                       OpenMaya.MDoubleArray(weights.ravel().tolist()), normalize, False)
+
+def get_topology_hash(shape):
+    '''
+    Hash of the point layout of a mesh, nurbsSurface or nurbsCurve.
+    Used to check that stored weights still match the geometry.
+
+    shape = (str) Shape or transform node
+    '''
+
+    dag_path = OpenMaya.MSelectionList().add(shape).getDagPath(0)
+    dag_path.extendToShape()
+    sha = hashlib.sha1()
+
+    if dag_path.hasFn(OpenMaya.MFn.kMesh):
+        counts, connects = OpenMaya.MFnMesh(dag_path).getVertices()
+        sha.update(np.array(list(counts), dtype=np.int32).tobytes())
+        sha.update(np.array(list(connects), dtype=np.int32).tobytes())
+
+    elif dag_path.hasFn(OpenMaya.MFn.kNurbsSurface):
+        surface_fn = OpenMaya.MFnNurbsSurface(dag_path)
+        sha.update(np.array([surface_fn.numCVsInU, surface_fn.numCVsInV, surface_fn.degreeInU,
+                             surface_fn.degreeInV, surface_fn.formInU, surface_fn.formInV], dtype=np.int32).tobytes())
+        sha.update(np.array(list(surface_fn.knotsInU()), dtype=np.float64).tobytes())
+        sha.update(np.array(list(surface_fn.knotsInV()), dtype=np.float64).tobytes())
+
+    elif dag_path.hasFn(OpenMaya.MFn.kNurbsCurve):
+        curve_fn = OpenMaya.MFnNurbsCurve(dag_path)
+        sha.update(np.array([curve_fn.numCVs, curve_fn.degree, curve_fn.form], dtype=np.int32).tobytes())
+        sha.update(np.array(list(curve_fn.knots()), dtype=np.float64).tobytes())
+
+    else:
+        raise TypeError(f'Unsupported geometry type >> {shape}')
+
+    return sha.hexdigest()
+
+def write_skin_weights_file(file_path, weights, influences, topology_hash='', mesh=None, sparse=None, compress=False):
+    '''
+    Writes a weight matrix to the binary skin weight format.
+
+    file_path     = (str) Header file path (<mesh>_skin.json)
+    weights       = (numpy array) (points, influences) weight matrix
+    influences    = ([str]) Influence names, one per matrix column
+    topology_hash = (str) get_topology_hash() of the skinned shape
+    mesh          = (str) Skinned object name. Defaults to the name in file_path.
+    sparse        = (bol) Store as CSR. None picks CSR when the matrix is mostly zeros.
+    compress      = (bol) Store the arrays in one compressed .npz. Smaller, but cannot be memory mapped.
+
+    Returns file_path
+    '''
+
+    weights = np.asarray(weights, dtype=np.float32)
+    if weights.ndim != 2 or weights.shape[1] != len(influences):
+        raise ValueError(f'Weight matrix shape {weights.shape} does not match {len(influences)} influences')
+
+    if mesh is None:
+        mesh = os.path.basename(file_path).split(SKIN_FILE_SUFFIX)[0]
+    if sparse is None:
+        sparse = np.count_nonzero(weights) < weights.size * SPARSE_DENSITY
+
+    base_path = file_path[:-len('.json')] if file_path.endswith('.json') else file_path
+    arrays = {}
+    if sparse:
+        rows, columns = np.nonzero(weights)
+        arrays['data'] = weights[rows, columns]
+        arrays['indices'] = columns.astype(np.int32)
+        arrays['indptr'] = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=weights.shape[0])))).astype(np.int64)
+    else:
+        arrays['weights'] = weights
+
+    array_files = {}
+    if compress:
+        array_file = f'{base_path}.npz'
+        np.savez_compressed(array_file, **arrays)
+        array_files = {key: os.path.basename(array_file) for key in arrays}
+    else:
+        for key, array in arrays.items():
+            array_file = f'{base_path}.{key}.npy'
+            np.save(array_file, array)
+            array_files[key] = os.path.basename(array_file)
+
+    header = {
+        'version': SKIN_FILE_VERSION,
+        'mesh': mesh,
+        'influences': list(influences),
+        'vertex_count': int(weights.shape[0]),
+        'topology_hash': topology_hash,
+        'layout': 'csr' if sparse else 'dense',
+        'arrays': array_files,
+        'block_size': SKIN_BLOCK_SIZE,
+        'block_checksums': get_block_checksums(weights, influences),
+    }
+    with open(file_path, 'w') as f:
+        json.dump(header, f, indent=1)
+
+    return file_path
+
+def read_skin_weights_file(file_path, mmap=True):
+    '''
+    Reads a binary skin weight file written by write_skin_weights_file().
+
+    file_path = (str) Header file path (<mesh>_skin.json)
+    mmap      = (bol) Memory map the arrays instead of reading them into memory (.npy arrays only)
+
+    Returns header dict, with the (points, influences) matrix added as header['weights']
+    '''
+
+    with open(file_path, 'r') as f:
+        header = json.load(f)
+
+    if header.get('version', 0) > SKIN_FILE_VERSION:
+        raise ValueError(f'Skin weight file version {header["version"]} is not supported >> {file_path}')
+
+    folder = os.path.dirname(file_path)
+    mmap_mode = 'r' if mmap else None
+    arrays = {}
+    archives = {}
+    for key, name in header['arrays'].items():
+        if name.endswith('.npz'):
+            if name not in archives:
+                archives[name] = np.load(os.path.join(folder, name))
+            arrays[key] = archives[name][key]
+        else:
+            arrays[key] = np.load(os.path.join(folder, name), mmap_mode=mmap_mode)
+    [archive.close() for archive in archives.values()]
+    shape = (header['vertex_count'], len(header['influences']))
+
+    if header['layout'] == 'csr':
+        weights = np.zeros(shape, dtype=np.float32)
+        rows = np.repeat(np.arange(shape[0]), np.diff(arrays['indptr']))
+        weights[rows, arrays['indices']] = arrays['data']
+        header['weights'] = weights
+    else:
+        header['weights'] = arrays['weights']
+
+    return header
+
+def get_block_checksums(weights, influences, block_size=SKIN_BLOCK_SIZE):
+    '''
+    Checksums of consecutive point blocks of a weight matrix. Columns are hashed in influence name order,
+    so the same weights stored with a different influence order give the same checksums.
+    Weights are hashed at the float32 precision of the weight files.
+
+    weights    = (numpy array) (points, influences) weight matrix
+    influences = ([str]) Influence names, one per matrix column
+    block_size = (int) Points per block
+
+    Returns list of hex strings, one per block
+    '''
+
+    order = sorted(range(len(influences)), key=lambda i: influences[i].split('|')[-1])
+    scale = 10.0 ** SKIN_BLOCK_DECIMALS
+    checksums = []
+    for start in range(0, len(weights), block_size):
+        block = np.asarray(weights[start:start + block_size], dtype=np.float32)[:, order].astype(np.float64)
+        block = np.ascontiguousarray(np.round(block * scale).astype(np.int64))
+        checksums.append(hashlib.sha1(block.tobytes()).hexdigest())
+
+    return checksums
+
+def diff_skin_weights_files(old_file, new_file):
+    '''
+    Compares two binary skin weight files. Only blocks with different checksums are loaded and compared.
+
+    old_file = (str) Header file path (<mesh>_skin.json)
+    new_file = (str) Header file path (<mesh>_skin.json)
+
+    Returns dict with
+        mesh                = (str) Mesh name in new_file
+        topology_changed    = (bol) Topology hash or point count differs
+        ranges              = ([(int, int)]) Changed point ranges, start inclusive, end exclusive
+        influences_added    = ([str]) Influences only in new_file
+        influences_removed  = ([str]) Influences only in old_file
+        influences_changed  = ([str]) Influences with different weights on any point
+    '''
+
+    old = read_skin_weights_file(old_file)
+    new = read_skin_weights_file(new_file)
+
+    old_names = [x.split('|')[-1] for x in old['influences']]
+    new_names = [x.split('|')[-1] for x in new['influences']]
+    names = new_names + [x for x in old_names if x not in set(new_names)]
+
+    result = {
+        'mesh': new['mesh'],
+        'topology_changed': old['vertex_count'] != new['vertex_count'] or 
+                            bool(old['topology_hash'] and new['topology_hash'] and 
+                                 old['topology_hash'] != new['topology_hash']),
+        'ranges': [],
+        'influences_added': [x for x in new_names if x not in set(old_names)],
+        'influences_removed': [x for x in old_names if x not in set(new_names)],
+        'influences_changed': [],
+    }
+
+    if old['vertex_count'] != new['vertex_count']:
+        result['ranges'] = [(0, new['vertex_count'])]
+        result['influences_changed'] = names
+        return result
+
+    changed = [i for i, (a, b) in enumerate(zip(_stored_block_checksums(old), _stored_block_checksums(new)))
+               if a != b]
+    points = _block_points(changed, SKIN_BLOCK_SIZE, new['vertex_count'])
+    if not len(points):
+        return result
+
+    old_weights = _aligned_rows(old['weights'], old_names, names, points)
+    new_weights = _aligned_rows(new['weights'], new_names, names, points)
+    different = np.abs(old_weights - new_weights) > 10.0 ** -SKIN_BLOCK_DECIMALS
+
+    result['ranges'] = _point_ranges(points[different.any(axis=1)])
+    result['influences_changed'] = [names[i] for i in np.flatnonzero(different.any(axis=0))]
+
+    return result
+
+def _stored_block_checksums(header):
+    '''
+    Block checksums of a read_skin_weights_file() header, recomputed for older files 
+    or files written with a different block size
+    '''
+
+    if header.get('block_checksums') and header.get('block_size') == SKIN_BLOCK_SIZE:
+        return header['block_checksums']
+
+    return get_block_checksums(header['weights'], header['influences'])
+
+def _block_points(blocks, block_size, point_count):
+    '''
+    Sorted point indices covered by the given block numbers
+    '''
+
+    if not len(blocks):
+        return np.zeros(0, dtype=np.int64)
+
+    points = (np.asarray(blocks, dtype=np.int64)[:, None] * block_size + np.arange(block_size)).ravel()
+
+    return points[points < point_count]
+
+def _point_ranges(points):
+    '''
+    Sorted point indices to a list of (start, end) ranges, end exclusive
+    '''
+
+    if not len(points):
+        return []
+
+    breaks = np.flatnonzero(np.diff(points) != 1) + 1
+    starts = np.concatenate(([points[0]], points[breaks]))
+    ends = np.concatenate((points[breaks - 1], [points[-1]])) + 1
+
+    return [(int(a), int(b)) for a, b in zip(starts, ends)]
+
+def _match_influences(influences, targets):
+    '''
+    Index of each influence in targets, -1 when missing. Matches full or short names.
+    '''
+
+    index = {}
+    for i, inf in enumerate(targets):
+        index[inf] = i
+        index[inf.split('|')[-1]] = i
+
+    return np.array([index.get(inf, index.get(inf.split('|')[-1], -1)) for inf in influences], dtype=np.int64)
+
+def _aligned_rows(weights, influences, targets, points):
+    '''
+    Rows of weights with the columns reordered to targets. Missing influences are zero.
+    '''
+
+    mapping = _match_influences(targets, influences)
+    rows = np.asarray(weights[points], dtype=np.float64)
+    aligned = np.zeros((len(rows), len(targets)), dtype=np.float64)
+    found = mapping >= 0
+    aligned[:, found] = rows[:, mapping[found]]
+
+    return aligned
+
+def get_locked_influences(skin_cluster):
+    '''
+    Returns a bool array, True for every influence with lockInfluenceWeights on.
+    Follows the influenceObjects() order.
+
+    skin_cluster = (str) skinCluster node
+    '''
+
+    influences = get_skin_cluster_influences(skin_cluster=skin_cluster, full_path=True)
+
+    return np.array([bool(cmds.getAttr(f'{inf}.liw')) if cmds.attributeQuery('liw', node=inf, exists=True)
+                     else False for inf in influences], dtype=bool)
+
+
+class SkinWeights(object):
+    '''
+    Sparse skin weights held as parallel arrays, one entry per non zero weight.
+
+    vertex_ids    = (numpy int array) Point index of each entry
+    influence_ids = (numpy int array) Column in self.influences of each entry
+    weights       = (numpy float array) Weight value of each entry
+
+    Read with SkinWeights.from_skin_cluster(skin) and write back with apply(skin),
+    one getWeights / setWeights call each. Edits (prune, normalize, limit) run on
+    the arrays without touching Maya.
+
+    Usage:
+        sw = SkinWeights.from_skin_cluster('body_skinCluster', max_influences=4)
+        sw.prune(0.01)
+        sw.normalize()
+        sw.apply('body_skinCluster')
+    '''
+
+    def __init__(self, vertex_ids, influence_ids, weights, influences, vertex_count, locked=None):
+        self.vertex_ids = np.asarray(vertex_ids, dtype=np.int32)
+        self.influence_ids = np.asarray(influence_ids, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.influences = list(influences)
+        self.vertex_count = int(vertex_count)
+        if locked is None:
+            locked = np.zeros(len(self.influences), dtype=bool)
+        self.locked = np.asarray(locked, dtype=bool)
+        self._sort()
+
+    def __repr__(self):
+        return (f'SkinWeights(vertices={self.vertex_count}, influences={len(self.influences)}, '
+                f'entries={len(self.weights)})')
+
+    def __len__(self):
+        return len(self.weights)
+
+    @classmethod
+    def from_dense(cls, matrix, influences, max_influences=None, locked=None):
+        '''
+        matrix         = (numpy array) (points, influences) weight matrix
+        influences     = ([str]) Influence names, one per matrix column
+        max_influences = (int) Keep only the N largest weights per point
+        locked         = (numpy bool array) Locked influences
+        '''
+
+        matrix = np.asarray(matrix)
+        if max_influences and max_influences < matrix.shape[1]:
+            # Zero everything but the N largest weights per row
+            drop = np.argpartition(-matrix, max_influences, axis=1)[:, max_influences:]
+            matrix = matrix.copy()
+            np.put_along_axis(matrix, drop, 0.0, axis=1)
+
+        vertex_ids, influence_ids = np.nonzero(matrix)
+
+        return cls(vertex_ids, influence_ids, matrix[vertex_ids, influence_ids], influences, matrix.shape[0],
+                   locked=locked)
+
+    @classmethod
+    def from_skin_cluster(cls, skin_cluster, max_influences=None):
+        '''
+        Reads skin_cluster weights with one getWeights call.
+
+        skin_cluster   = (str) skinCluster node
+        max_influences = (int) Keep only the N largest weights per point
+        '''
+
+        matrix, influences = get_skin_weights(skin_cluster)
+
+        return cls.from_dense(matrix, influences, max_influences=max_influences,
+                              locked=get_locked_influences(skin_cluster))
+
+    @classmethod
+    def from_file(cls, file_path, max_influences=None):
+        '''
+        Reads a binary skin weight file (write_skin_weights_file)
+        '''
+
+        header = read_skin_weights_file(file_path)
+
+        return cls.from_dense(header['weights'], header['influences'], max_influences=max_influences)
+
+    def to_file(self, file_path, topology_hash='', mesh=None, sparse=None):
+        '''
+        Writes a binary skin weight file (write_skin_weights_file)
+        '''
+
+        return write_skin_weights_file(file_path, self.to_dense(), self.influences, topology_hash=topology_hash,
+                                       mesh=mesh, sparse=sparse)
+
+    def copy(self):
+        return SkinWeights(self.vertex_ids.copy(), self.influence_ids.copy(), self.weights.copy(), self.influences,
+                           self.vertex_count, locked=self.locked.copy())
+
+    def to_dense(self):
+        '''
+        Returns (points, influences) weight matrix
+        '''
+
+        matrix = np.zeros((self.vertex_count, len(self.influences)), dtype=np.float64)
+        matrix[self.vertex_ids, self.influence_ids] = self.weights
+
+        return matrix
+
+    def totals(self):
+        '''
+        Weight sum per point
+        '''
+
+        return np.bincount(self.vertex_ids, weights=self.weights, minlength=self.vertex_count)
+
+    def max_influence_count(self):
+        '''
+        Highest number of non zero influences on a single point
+        '''
+
+        if not len(self.weights):
+            return 0
+
+        return int(np.bincount(self.vertex_ids, minlength=self.vertex_count).max())
+
+    def prune(self, threshold=0.001):
+        '''
+        Drops weights below threshold. Locked influences are left untouched.
+
+        threshold = (float) Smallest weight to keep
+        '''
+
+        keep = (self.weights >= threshold) | self.locked[self.influence_ids]
+        self._filter(keep)
+
+        return self
+
+    def limit(self, max_influences):
+        '''
+        Keeps the N largest weights per point. Locked influences are always kept.
+
+        max_influences = (int) Influences per point
+        '''
+
+        order = np.lexsort((-self.weights, self.vertex_ids))
+        self._filter(order)
+        # Rank of each entry within its point
+        starts = np.searchsorted(self.vertex_ids, self.vertex_ids, side='left')
+        rank = np.arange(len(self.weights)) - starts
+        self._filter((rank < max_influences) | self.locked[self.influence_ids])
+        self._sort()
+
+        return self
+
+    def normalize(self):
+        '''
+        Scales unlocked weights so each point sums to 1. Locked weights keep their value.
+        '''
+
+        locked_entries = self.locked[self.influence_ids]
+        locked_total = np.bincount(self.vertex_ids, weights=self.weights * locked_entries, minlength=self.vertex_count)
+        unlocked_total = self.totals() - locked_total
+
+        scale = np.zeros(self.vertex_count, dtype=np.float64)
+        np.divide(np.clip(1.0 - locked_total, 0.0, None), unlocked_total, out=scale, where=unlocked_total > 0)
+        unlocked_entries = ~locked_entries
+        self.weights[unlocked_entries] *= scale[self.vertex_ids[unlocked_entries]]
+        self._filter(self.weights > 0)
+
+        return self
+
+    def smooth(self, indptr, indices, iterations=1, strength=0.5, mask=None, edge_weights=None):
+        '''
+        Laplacian smoothing over vertex adjacency. Each pass blends every point towards the
+        weighted average of its neighbours, then renormalizes. Locked influences keep their value.
+
+        indptr       = (numpy int array) CSR row pointers, see get_mesh_adjacency()
+        indices      = (numpy int array) CSR neighbour indices
+        iterations   = (int) Smoothing passes
+        strength     = (float) 0-1 blend towards the neighbour average per pass
+        mask         = (numpy array) Per point 0-1 multiplier on strength. None smooths every point.
+        edge_weights = (numpy array) Weight per CSR entry. Defaults to uniform, rows are normalized.
+        '''
+
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indptr) != self.vertex_count + 1:
+            raise IndexError(f'Adjacency has {len(indptr) - 1} points, weights have {self.vertex_count}')
+
+        edge_rows = np.repeat(np.arange(self.vertex_count), np.diff(indptr))
+        if edge_weights is None:
+            edge_weights = np.ones(len(indices), dtype=np.float64)
+        row_totals = np.bincount(edge_rows, weights=edge_weights, minlength=self.vertex_count)
+        edge_weights = edge_weights / np.where(row_totals > 0, row_totals, 1.0)[edge_rows]
+
+        blend = np.full(self.vertex_count, float(strength))
+        if mask is not None:
+            blend *= np.asarray(mask, dtype=np.float64)
+        blend[row_totals <= 0] = 0.0 # Nothing to average on isolated points
+
+        # Only edges into smoothed points contribute
+        active = blend[edge_rows] > 0
+        edge_rows, edge_columns, edge_weights = edge_rows[active], indices[active], edge_weights[active]
+        influence_count = len(self.influences)
+
+        for _ in range(iterations):
+            locked_entries = self.locked[self.influence_ids]
+            vertex_ids = self.vertex_ids[~locked_entries]
+            influence_ids = self.influence_ids[~locked_entries]
+            weights = self.weights[~locked_entries]
+            entry_ptr = np.searchsorted(vertex_ids, np.arange(self.vertex_count + 1))
+
+            # Expand the unlocked entries of each neighbour
+            counts = entry_ptr[edge_columns + 1] - entry_ptr[edge_columns]
+            run_starts = np.repeat(entry_ptr[edge_columns] - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+            entries = run_starts + np.arange(counts.sum())
+            rows = np.repeat(edge_rows, counts)
+
+            keys = np.concatenate((vertex_ids.astype(np.int64) * influence_count + influence_ids,
+                                   rows * influence_count + influence_ids[entries]))
+            values = np.concatenate((weights * (1.0 - blend[vertex_ids]),
+                                     weights[entries] * np.repeat(edge_weights, counts) * blend[rows]))
+            keys, inverse = np.unique(keys, return_inverse=True)
+            values = np.bincount(inverse, weights=values, minlength=len(keys))
+
+            self.vertex_ids = np.concatenate((keys // influence_count, self.vertex_ids[locked_entries])).astype(np.int32)
+            self.influence_ids = np.concatenate((keys % influence_count, 
+                                                 self.influence_ids[locked_entries])).astype(np.int32)
+            self.weights = np.concatenate((values, self.weights[locked_entries]))
+            self._sort()
+            self.normalize()
+
+        return self
+
+    def remap_influences(self, influences):
+        '''
+        Returns influence_ids mapped to a new influence list. Influences are matched by name.
+
+        influences = ([str]) Target influence names
+        '''
+
+        mapping = _match_influences(self.influences, influences).astype(np.int32)
+
+        return mapping[self.influence_ids] if len(mapping) else self.influence_ids.copy()
+
+    def apply(self, skin_cluster, normalize=False, points=None):
+        '''
+        Writes the weights to skin_cluster with one setWeights call.
+        Influences missing from skin_cluster are added, locked while the weights are written, then unlocked.
+
+        skin_cluster = (str) skinCluster node
+        normalize    = (bol) normalize() before writing
+        points       = ([int]) Sorted skin point index of each row, for partial writes. Defaults to all points.
+        '''
+
+        if normalize:
+            self.normalize()
+
+        skin_influences = get_skin_cluster_influences(skin_cluster=skin_cluster)
+        missing = [inf for inf in self.influences if inf not in skin_influences
+                   and inf.split('|')[-1] not in skin_influences]
+        if missing:
+            cmds.skinCluster(skin_cluster, e=1, ai=missing, lw=1, wt=0)
+            skin_influences = get_skin_cluster_influences(skin_cluster=skin_cluster)
+
+        columns = self.remap_influences(skin_influences)
+        found = columns >= 0
+        matrix = np.zeros((self.vertex_count, len(skin_influences)), dtype=np.float64)
+        np.add.at(matrix, (self.vertex_ids[found], columns[found]), self.weights[found])
+        set_skin_weights(skin_cluster, matrix, points=points)
+
+        # Added with lw=1, unlock so they can be painted and normalized
+        for inf in missing:
+            cmds.setAttr(f'{inf}.liw', 0)
+
+    def _sort(self):
+        order = np.lexsort((self.influence_ids, self.vertex_ids))
+        self._filter(order)
+
+    def _filter(self, selection):
+        self.vertex_ids = self.vertex_ids[selection]
+        self.influence_ids = self.influence_ids[selection]
+        self.weights = self.weights[selection]
 
 def set_bind_pose(mesh_name=None, set_angle=0, skin_cluster=None):
     '''
@@ -79,28 +879,66 @@ def set_bind_pose(mesh_name=None, set_angle=0, skin_cluster=None):
         skin_cluster = [skin_cluster]
 
     if len(skin_cluster) != 0:
-        for skin in skin_cluster:
-            skin_joints = get_skin_cluster_influences(skin_cluster=skin)
+        set_bind_pose_bulk(skin_cluster, set_angle=set_angle)
+
+def set_bind_pose_bulk(skin_clusters, set_angle=False):
+    '''
+    Resets the bind pose of many skinClusters in one pass. Joint world inverse matrices are read 
+    through MDagPath.inclusiveMatrixInverse(), bindPose nodes are deleted and every bindPreMatrix
+    element is written in one MDGModifier, run with omUtil.do_it_undoable() so one undo restores everything.
+
+    skin_clusters = ([str]) skinCluster nodes
+    set_angle     = (bol) Set joints current orientation as preferred angle
+
+    Returns number of bindPreMatrix elements written
+    '''
 
-            # Delete bindPose
-            if cmds.listConnections(skin+'.bindPose'):
-                cmds.delete(cmds.listConnections(skin+'.bindPose'))
+    if not isinstance(skin_clusters, (list, tuple)):
+        skin_clusters = [skin_clusters]
 
-            # Connect pre bind matrix
-            for joint in skin_joints:
-                joint_index = get_skin_cluster_influence_index(skin_cluster=skin, influence=joint)
-                if set_angle > 0:
-                    cmds.joint(joint, e=1, spa=1) # Set preferred angle
-                pos = cmds.getAttr(f'{joint}.wim')
-                try:
-                    cmds.setAttr(f'{skin}.bindPreMatrix[{joint_index}]', pos, type='matrix')
-                except:
-                    raise IndexError(f'bind_pre_matrix could not be set for joint >> {joint}. \
-                                        This action cannot be performed on a "dorito" mesh.')
+    matrix_values = [] # (plug, MMatrix)
+    angle_values = [] # (plug, MAngle)
+    for skin in skin_clusters:
+        skin_info = get_skin_cluster_info(skin)
+        for influence_path, index in zip(skin_info.influence_paths, skin_info.logical_indices):
+            plug = skin_info.bind_pre_matrix.elementByLogicalIndex(index)
+            if plug.isDestination or plug.isLocked:
+                raise IndexError(f'bind_pre_matrix could not be set for joint >> {influence_path.partialPathName()}. '
+                                 'This action cannot be performed on a "dorito" mesh.')
+            matrix_values.append((plug, influence_path.inclusiveMatrixInverse()))
 
-def export_skin_weights(skin_obj=None):
+            if set_angle and influence_path.hasFn(OpenMaya.MFn.kJoint):
+                joint_fn = OpenMaya.MFnDependencyNode(influence_path.node())
+                for axis in 'XYZ':
+                    angle_plug = joint_fn.findPlug(f'preferredAngle{axis}', False)
+                    if not angle_plug.isLocked and not angle_plug.isDestination:
+                        angle_values.append((angle_plug, joint_fn.findPlug(f'rotate{axis}', False).asMAngle()))
+
+    bind_poses = list(set(cmds.listConnections([f'{skin}.bindPose' for skin in skin_clusters], 
+                                               s=1, d=0, type='dagPose') or []))
+
+    modifier = OpenMaya.MDGModifier()
+    for bind_pose in bind_poses:
+        modifier.deleteNode(OpenMaya.MSelectionList().add(bind_pose).getDependNode(0))
+    for plug, matrix in matrix_values:
+        modifier.newPlugValue(plug, OpenMaya.MFnMatrixData().create(matrix))
+    for plug, angle in angle_values:
+        modifier.newPlugValueMAngle(plug, angle)
+    omu.do_it_undoable(modifier)
+
+    return len(matrix_values)
+
+def export_skin_weights(skin_obj=None, path=None, file_format='npy', sparse=None, compress=False):
     '''
-    skin_obj = ([]) List of objects
+    Exports skinWeights, one file per object.
+
+    skin_obj    = ([]) List of objects
+    path        = (str) Folder to write to. Opens a folder dialog if not specified.
+    file_format = (str) 'npy' = binary weight format, 'xml' = cmds.deformerWeights xml
+    sparse      = (bol) npy only. Store weights as CSR. None picks CSR when the matrix is mostly zeros.
+    compress    = (bol) npy only. Store the arrays in one compressed .npz next to the header
+
+    Returns list of written files
     '''
 
     if skin_obj:
@@ -117,9 +955,18 @@ def export_skin_weights(skin_obj=None):
     if not meshes:
         raise IndexError('Specified objects do not contain a skinCluster')
 
-    file_filter = 'directories'
-    save_link = cmds.fileDialog2(fm=2, ds=2, ff=file_filter, okc='Select Folder')
+    if path:
+        save_link = [path]
+    else:
+        file_filter = 'directories'
+        save_link = cmds.fileDialog2(fm=2, ds=2, ff=file_filter, okc='Select Folder')
+
+    written = []
     if save_link:
+        if file_format != 'xml':
+            report = export_skin_weights_batch(meshes, save_link[0], sparse=sparse, compress=compress)
+            return [x['file'] for x in report if x['file']]
+
         for mesh in meshes:
             skin = get_skin_clusters(mesh_name=mesh)
             saveFile = mesh + '_skin.xml'
@@ -127,62 +974,513 @@ def export_skin_weights(skin_obj=None):
                 cmds.deformerWeights(saveFile, p = save_link[0], df = skin, ex=1, vc=1)
             if cmds.nodeType(cmds.listRelatives(mesh, s=1)[0]) not in 'mesh':
                 cmds.deformerWeights(saveFile, p = save_link[0], df = skin, ex=1)
+            written.append(os.path.join(save_link[0], saveFile))
 
-def import_skin_weights(xml=None):
-    '''
-    Imports skinWeights from xml. Creates skinCluster on obj if it does not exist.
-
-    xml = (list) List of xml skin files to import
-    '''
-
-    if not xml:
-        xml = cmds.fileDialog2(fileMode=4, fileFilter='*.xml', okc='Import File(s)')
-    if xml:
-        for skin_file in xml:
-            weight_file = skin_file.split('/')[-1]
-            weight_path = skin_file[:-len(weight_file)] # Set path arg for cmds.deformerWeights()
-            skin_file_xml = None
-            skin_file_xml = et.parse(skin_file)
-            skin_mesh = weight_file.split('_skin.xml')[0]
-            
-            # root = skin_file_xml.getroot()
-            influences = []
-            for element in skin_file_xml.findall('weights'):
-                jnt = element.get('source')
-                influences.append(jnt)
-            
-            # Make sure objects exists
-            skin_influences = []
-            for jnt in influences:
-                if cmds.objExists(jnt):
-                    skin_influences.append(jnt)
-
-            if cmds.objExists(skin_mesh) and skin_influences != []:
-                # Check for existing skinCluster
-                if get_skin_clusters(mesh_name=skin_mesh):
-                    skin_cluster = get_skin_clusters(mesh_name=skin_mesh)
-                    current_influence = get_skin_cluster_influences(skin_cluster=skin_cluster)
-                    
-                    # add any missing joints to current skinCluster
-                    cluster_joints = [joint for joint in skin_influences if joint not in current_influence]
-                    if cluster_joints:
-                        cmds.skinCluster(skin_cluster, e=1, ai=cluster_joints , lw=1, wt=0)
-                    
-                    # load skin weights
-                    cmds.deformerWeights(weight_file, path=weight_path, im=1, df=skin_cluster, m='index')
-                    [cmds.setAttr(f'{infs}.liw', 0) for infs in cmds.skinCluster(skin_cluster, q=1, inf=1)]
-                    cmds.skinPercent(skin_cluster, skin_mesh, nrm=1)
-                else:
-                    skin = cmds.skinCluster(skin_mesh, skin_influences, tsb=1)[0]
-                    cmds.deformerWeights(weight_file, path=weight_path, im=1, df=skin, m='index')
-                    cmds.skinPercent(skin, skin_mesh, nrm=1)
-            else:
-                cmds.warning(f'Skin object does not exist in the scene >> {skin_mesh}')
+    return written
+
+def import_skin_weights(weight_files=None, xml=None, incremental=False):
+    '''
+    Imports skinWeights from binary (_skin.json) or xml files. Creates skinCluster on obj if it does not exist.
+
+    weight_files = (list) List of skin files to import. xml files use cmds.deformerWeights.
+    xml          = (list) Kept for older calls, same as weight_files
+    incremental  = (bol) Binary files only. Only write the point blocks that differ from the current weights.
+    '''
+
+    weight_files = weight_files or xml
+    if not weight_files:
+        weight_files = cmds.fileDialog2(fileMode=4, fileFilter=f'Skin Weights (*{SKIN_FILE_SUFFIX} *.xml)', 
+                                        okc='Import File(s)')
+    if weight_files:
+        for skin_file in [x for x in weight_files if x.endswith('.xml')]:
+            _import_skin_weights_xml(skin_file)
+
+        binary_files = [x for x in weight_files if not x.endswith('.xml')]
+        if binary_files:
+            import_skin_weights_batch(binary_files, incremental=incremental)
+
+def export_skin_weights_batch(meshes, path, sparse=None, compress=False, workers=None):
+    '''
+    Headless binary export for many meshes. Weights are read on the main thread, 
+    file writing runs in a thread pool so disk I/O overlaps with reading the next mesh.
+
+    meshes   = ([]) Skinned mesh objects
+    path     = (str) Folder to write to
+    sparse   = (bol) Store weights as CSR. None picks CSR when the matrix is mostly zeros.
+    compress = (bol) Store the arrays in one compressed .npz next to the header
+    workers  = (int) Writer threads. None uses the concurrent.futures default.
+
+    Returns list of dicts per mesh: mesh, file, gather and write time in seconds
+    '''
+
+    if not os.path.isdir(path):
+        raise NameError(f'Export folder does not exist >> {path}')
+
+    report = []
+    jobs = {}
+    start = time.perf_counter()
+    with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        for mesh in meshes:
+            entry = {'mesh': mesh, 'file': None, 'gather': 0.0, 'write': 0.0}
+            report.append(entry)
+
+            skin = get_skin_clusters(mesh_name=mesh)
+            if not skin:
+                cmds.warning(f'Object does not contain a skinCluster >> {mesh}')
+                continue
+
+            # Maya API work stays on the main thread
+            tick = time.perf_counter()
+            weights, influences = get_skin_weights(skin)
+            topology_hash = get_topology_hash(mesh)
+            entry['gather'] = time.perf_counter() - tick
+
+            save_file = os.path.join(path, _skin_file_name(mesh))
+            jobs[pool.submit(_timed, write_skin_weights_file, save_file, weights, influences, 
+                             topology_hash=topology_hash, mesh=mesh, sparse=sparse, compress=compress)] = entry
+
+        for job in futures.as_completed(jobs):
+            entry = jobs[job]
+            try:
+                entry['write'], _ = job.result()
+                entry['file'] = os.path.join(path, _skin_file_name(entry['mesh']))
+            except (IOError, OSError, ValueError) as error:
+                cmds.warning(f'Could not write skin weights ({error}) >> {entry["mesh"]}')
+
+    _log_batch_report('Exported', report, ('gather', 'write'), time.perf_counter() - start)
+
+    return report
+
+def import_skin_weights_batch(weight_files, workers=None, incremental=False):
+    '''
+    Headless binary import for many files. Files are parsed in a thread pool,
+    weights are applied on the main thread as soon as each file is ready.
+
+    weight_files = ([]) Binary skin weight header files (_skin.json)
+    workers      = (int) Reader threads. None uses the concurrent.futures default.
+    incremental  = (bol) Only write the point blocks that differ from the current weights
+
+    Returns list of dicts per file: file, mesh, skin_cluster, read and apply time in seconds
+    '''
+
+    report = []
+    start = time.perf_counter()
+    with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        # Fully load the arrays in the worker, a memory map would defer the disk reads to the main thread.
+        # Incremental imports keep the map, only the changed rows are read.
+        jobs = {pool.submit(_timed, read_skin_weights_file, skin_file, mmap=incremental): skin_file 
+                for skin_file in weight_files}
+
+        for job in futures.as_completed(jobs):
+            entry = {'file': jobs[job], 'mesh': None, 'skin_cluster': None, 'read': 0.0, 'apply': 0.0}
+            report.append(entry)
+            try:
+                entry['read'], header = job.result()
+            except (IOError, OSError, ValueError, KeyError) as error:
+                cmds.warning(f'Could not read skin weights ({error}) >> {entry["file"]}')
+                continue
+
+            entry['mesh'] = header['mesh']
+            tick = time.perf_counter()
+            entry['skin_cluster'] = _apply_skin_weights_header(header, incremental=incremental)
+            entry['apply'] = time.perf_counter() - tick
+
+    _log_batch_report('Imported', report, ('read', 'apply'), time.perf_counter() - start)
+
+    return report
+
+def _timed(function, *args, **kwargs):
+    '''
+    Runs function, returns (seconds, result)
+    '''
+
+    tick = time.perf_counter()
+    result = function(*args, **kwargs)
+
+    return time.perf_counter() - tick, result
+
+def _log_batch_report(action, report, phases, total):
+    '''
+    Logs a per mesh timing summary for the batch export/import
+    '''
+
+    for entry in report:
+        timings = ', '.join(f'{phase} {entry[phase]:.3f}s' for phase in phases)
+        LOG.info(f'{entry["mesh"] or entry.get("file")}: {timings}')
+
+    sums = ', '.join(f'{phase} {sum(x[phase] for x in report):.3f}s' for phase in phases)
+    LOG.info(f'{action} skin weights for {len(report)} object(s) in {total:.3f}s ({sums})')
+
+def _skin_file_name(mesh):
+    '''
+    Binary weight header file name for mesh
+    '''
+
+    return mesh.split('|')[-1].replace(':', '_') + SKIN_FILE_SUFFIX
+
+def _prepare_skin_cluster(skin_mesh, skin_influences):
+    '''
+    Gets the skinCluster on skin_mesh, adding missing influences. Creates one if it does not exist.
+    '''
+
+    skin_cluster = get_skin_clusters(mesh_name=skin_mesh)
+    if skin_cluster:
+        current_influence = get_skin_cluster_influences(skin_cluster=skin_cluster)
+
+        # add any missing joints to current skinCluster
+        cluster_joints = [joint for joint in skin_influences if joint not in current_influence]
+        if cluster_joints:
+            cmds.skinCluster(skin_cluster, e=1, ai=cluster_joints , lw=1, wt=0)
+    else:
+        skin_cluster = cmds.skinCluster(skin_mesh, skin_influences, tsb=1)[0]
+
+    return skin_cluster
+
+def _import_skin_weights_binary(skin_file):
+    '''
+    Imports one binary skin weight file with a single setWeights call
+    '''
+
+    return _apply_skin_weights_header(read_skin_weights_file(skin_file))
+
+def _apply_skin_weights_header(header, incremental=False):
+    '''
+    Applies weights from a read_skin_weights_file() header. Main thread only.
+
+    header      = (dict) read_skin_weights_file() result
+    incremental = (bol) Compare block checksums with the current weights and only write changed blocks
+
+    Returns the skinCluster, None if the weights could not be applied
+    '''
+
+    skin_mesh = header['mesh']
+
+    # Make sure objects exists
+    columns = [i for i, jnt in enumerate(header['influences']) if cmds.objExists(jnt)]
+    skin_influences = [header['influences'][i] for i in columns]
+
+    if not cmds.objExists(skin_mesh) or skin_influences == []:
+        cmds.warning(f'Skin object does not exist in the scene >> {skin_mesh}')
+        return
+
+    topology_hash = get_topology_hash(skin_mesh)
+    if header['topology_hash'] and header['topology_hash'] != topology_hash:
+        cmds.warning(f'Topology changed since export, weights are applied by index >> {skin_mesh}')
+
+    skin_cluster = _prepare_skin_cluster(skin_mesh, skin_influences)
+    skin_fn = get_skin_cluster_fn(skin_cluster)
+    point_count = get_skin_cluster_geometry(skin_fn)[2]
+    if point_count != header['vertex_count']:
+        cmds.warning(f'Point count does not match weight file ({point_count} != {header["vertex_count"]}) >> '
+                     f'{skin_mesh}')
+        return
+
+    points = None
+    weights = header['weights']
+    if incremental:
+        points = _changed_skin_points(skin_cluster, header)
+        if not len(points):
+            LOG.info(f'Skin weights are up to date >> {skin_mesh}')
+            return skin_cluster
+        weights = weights[points]
+
+    skin_weights = SkinWeights.from_dense(np.asarray(weights)[:, columns], skin_influences)
+    skin_weights.normalize() # Replaces cmds.skinPercent(nrm=1)
+
+    [cmds.setAttr(f'{infs}.liw', 0) for infs in cmds.skinCluster(skin_cluster, q=1, inf=1)]
+    skin_weights.apply(skin_cluster, points=points)
+
+    return skin_cluster
+
+def _changed_skin_points(skin_cluster, header):
+    '''
+    Points in blocks where the current skinCluster weights differ from the header weights.
+    Blocks with matching checksums are skipped, the others are compared with a tolerance
+    so rounding noise from earlier imports does not count as a change.
+    '''
+
+    current, current_influences = get_skin_weights(skin_cluster)
+    block_size = header.get('block_size') or SKIN_BLOCK_SIZE
+    stored = header.get('block_checksums') or get_block_checksums(header['weights'], header['influences'], 
+                                                                  block_size)
+    live = _aligned_rows(current, current_influences, header['influences'], slice(None))
+    candidates = [i for i, (a, b) in enumerate(zip(stored, get_block_checksums(live, header['influences'], 
+                                                                               block_size))) if a != b]
+
+    points = _block_points(candidates, block_size, header['vertex_count'])
+    different = np.abs(live[points] - np.asarray(header['weights'][points], dtype=np.float64)) 
+    changed = np.unique(points[(different > 10.0 ** -SKIN_BLOCK_DECIMALS).any(axis=1)] // block_size)
+    LOG.info(f'{len(changed)} of {len(stored)} weight blocks changed >> {header["mesh"]}')
+
+    return _block_points(changed, block_size, header['vertex_count'])
+
+def _import_skin_weights_xml(skin_file):
+    '''
+    Imports one cmds.deformerWeights xml file
+    '''
+
+    weight_file = skin_file.split('/')[-1]
+    weight_path = skin_file[:-len(weight_file)] # Set path arg for cmds.deformerWeights()
+    skin_file_xml = None
+    skin_file_xml = et.parse(skin_file)
+    skin_mesh = weight_file.split('_skin.xml')[0]
 
-def transfer_weights(object_list=[], remove=False):
+    # root = skin_file_xml.getroot()
+    influences = []
+    for element in skin_file_xml.findall('weights'):
+        jnt = element.get('source')
+        influences.append(jnt)
+
+    # Make sure objects exists
+    skin_influences = []
+    for jnt in influences:
+        if cmds.objExists(jnt):
+            skin_influences.append(jnt)
+
+    if cmds.objExists(skin_mesh) and skin_influences != []:
+        # Check for existing skinCluster
+        if get_skin_clusters(mesh_name=skin_mesh):
+            skin_cluster = _prepare_skin_cluster(skin_mesh, skin_influences)
+
+            # load skin weights
+            cmds.deformerWeights(weight_file, path=weight_path, im=1, df=skin_cluster, m='index')
+            [cmds.setAttr(f'{infs}.liw', 0) for infs in cmds.skinCluster(skin_cluster, q=1, inf=1)]
+            cmds.skinPercent(skin_cluster, skin_mesh, nrm=1)
+        else:
+            skin = cmds.skinCluster(skin_mesh, skin_influences, tsb=1)[0]
+            cmds.deformerWeights(weight_file, path=weight_path, im=1, df=skin, m='index')
+            cmds.skinPercent(skin, skin_mesh, nrm=1)
+    else:
+        cmds.warning(f'Skin object does not exist in the scene >> {skin_mesh}')
+
+def get_shape_points(shape, world=True):
+    '''
+    Point positions of a mesh, or CV positions of a nurbsSurface / nurbsCurve, as a (N, 3) numpy array.
+    Order matches get_skin_weights() rows.
+
+    shape = (str) Shape or transform node
+    world = (bol) World space, otherwise object space
+    '''
+
+    dag_path = OpenMaya.MSelectionList().add(shape).getDagPath(0)
+    dag_path.extendToShape()
+    space = OpenMaya.MSpace.kWorld if world else OpenMaya.MSpace.kObject
+
+    if dag_path.hasFn(OpenMaya.MFn.kMesh):
+        points = OpenMaya.MFnMesh(dag_path).getPoints(space)
+    elif dag_path.hasFn(OpenMaya.MFn.kNurbsSurface):
+        points = OpenMaya.MFnNurbsSurface(dag_path).cvPositions(space)
+    elif dag_path.hasFn(OpenMaya.MFn.kNurbsCurve):
+        points = OpenMaya.MFnNurbsCurve(dag_path).cvPositions(space)
+    else:
+        raise TypeError(f'Unsupported geometry type >> {shape}')
+
+    return np.array([(p.x, p.y, p.z) for p in points], dtype=np.float64).reshape(-1, 3)
+
+def get_mesh_triangles(mesh):
+    '''
+    Triangulated faces of a mesh as a (T, 3) numpy array of vertex indices
+    '''
+
+    dag_path = OpenMaya.MSelectionList().add(mesh).getDagPath(0)
+    dag_path.extendToShape()
+    triangle_vertices = OpenMaya.MFnMesh(dag_path).getTriangles()[1]
+
+    return np.array(list(triangle_vertices), dtype=np.int64).reshape(-1, 3)
+
+_MESH_ADJACENCY = {}
+
+def get_mesh_adjacency(mesh):
+    '''
+    Vertex adjacency of a mesh as CSR arrays, built from the polygon edges. Cached per topology hash.
+
+    mesh = (str) Mesh shape or transform
+
+    Returns (indptr, indices) int arrays. Neighbours of point i are indices[indptr[i]:indptr[i + 1]]
+    '''
+
+    topology_hash = get_topology_hash(mesh)
+    if topology_hash not in _MESH_ADJACENCY:
+        dag_path = OpenMaya.MSelectionList().add(mesh).getDagPath(0)
+        dag_path.extendToShape()
+        if not dag_path.hasFn(OpenMaya.MFn.kMesh):
+            raise TypeError(f'Adjacency needs a mesh >> {mesh}')
+
+        mesh_fn = OpenMaya.MFnMesh(dag_path)
+        counts, connects = mesh_fn.getVertices()
+        _MESH_ADJACENCY[topology_hash] = mesh_adjacency(list(counts), list(connects), mesh_fn.numVertices)
+
+    return _MESH_ADJACENCY[topology_hash]
+
+def mesh_adjacency(counts, connects, vertex_count):
+    '''
+    CSR vertex adjacency from polygon data (MFnMesh.getVertices() layout)
+
+    counts       = ([int]) Vertex count per face
+    connects     = ([int]) Face vertex indices
+    vertex_count = (int) Number of vertices
+
+    Returns (indptr, indices) int arrays
+    '''
+
+    counts = np.asarray(counts, dtype=np.int64)
+    connects = np.asarray(connects, dtype=np.int64)
+
+    # Each face vertex connects to the next one around its face
+    face_starts = np.repeat(np.cumsum(counts) - counts, counts)
+    following = face_starts + (np.arange(len(connects)) - face_starts + 1) % np.repeat(counts, counts)
+    start, end = connects, connects[following]
+
+    keys = np.unique(np.concatenate((start * vertex_count + end, end * vertex_count + start)))
+    rows, indices = np.divmod(keys, vertex_count)
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=vertex_count)))).astype(np.int64)
+
+    return indptr, indices
+
+def smooth_skin_weights(mesh, iterations=1, strength=0.5, mask=None, weighting='uniform'):
+    '''
+    Smooths the skin weights of a mesh with SkinWeights.smooth(). One getWeights and one setWeights call.
+
+    mesh       = (str) Skinned mesh
+    iterations = (int) Smoothing passes
+    strength   = (float) 0-1 blend towards the neighbour average per pass
+    mask       = (numpy array / [int]) Per point 0-1 multiplier, or a list of vertex indices to smooth
+    weighting  = (str) 'uniform' or 'distance' (inverse edge length)
+
+    Returns SkinWeights
+    '''
+
+    skin_cluster = get_skin_clusters(mesh_name=mesh)
+    if not skin_cluster:
+        raise NameError(f'Object does not contain a skinCluster >> {mesh}')
+
+    indptr, indices = get_mesh_adjacency(mesh)
+    vertex_count = len(indptr) - 1
+
+    if mask is not None:
+        mask = np.asarray(mask)
+        if mask.dtype.kind in 'iu' and len(mask) != vertex_count:
+            vertex_mask = np.zeros(vertex_count, dtype=np.float64)
+            vertex_mask[mask] = 1.0
+            mask = vertex_mask
+
+    edge_weights = None
+    if weighting == 'distance':
+        points = get_shape_points(mesh, world=False)
+        rows = np.repeat(np.arange(vertex_count), np.diff(indptr))
+        edge_weights = 1.0 / np.maximum(np.linalg.norm(points[indices] - points[rows], axis=1), 1e-8)
+    elif weighting != 'uniform':
+        raise ValueError(f'Unknown weighting, use uniform or distance >> {weighting}')
+
+    skin_weights = SkinWeights.from_skin_cluster(skin_cluster)
+    skin_weights.smooth(indptr, indices, iterations=iterations, strength=strength, mask=mask, 
+                        edge_weights=edge_weights)
+    skin_weights.apply(skin_cluster)
+
+    return skin_weights
+
+def create_skin_cluster(target, influences):
+    '''
+    Creates a skinCluster on target with exactly the given influences.
+
+    target     = (str) Object to skin
+    influences = ([str]) Influence names
+    '''
+
+    cmds.select(influences, r=True) # cmds.skinCluster kept adding joint heirarchy. Using select instead.
+    cmds.select(target, add=True)
+
+    return cmds.skinCluster(target, influences, tsb=True)[0]
+
+
+class WeightTransfer(object):
+    '''
+    Closest point skin weight transfer.
+
+    Source points, triangles and weights are read once. Every target is then
+    sampled in NumPy (barycentric interpolation on the closest source triangle)
+    and written with a single setWeights call.
+    Mesh sources use closest point on surface, nurbs sources use closest CV.
+
+    Usage:
+        engine = WeightTransfer('body_geo')
+        [engine.transfer(tgt) for tgt in cloth_meshes]
+    '''
+
+    def __init__(self, source):
+        self.source = source
+        self.skin_cluster = get_skin_clusters(mesh_name=source)
+        if not self.skin_cluster:
+            raise AttributeError(f'Source object does not have a skinCluster >> {source}')
+
+        self.weights, self.influences = get_skin_weights(self.skin_cluster)
+        self.points = get_shape_points(source)
+        self.grid = sg.PointGrid(self.points)
+
+        if cmds.objectType(omu.get_dag_path(source, shape=True)) == 'mesh':
+            self.triangles = get_mesh_triangles(source)
+        else:
+            self.triangles = None
+
+        # Nurbs sources and meshes without faces use the closest point
+        self.triangle_grid = None
+        if self.triangles is not None and len(self.triangles):
+            self.triangle_grid = sg.TriangleGrid(self.points, self.triangles)
+
+    def sample(self, positions, chunk=16384):
+        '''
+        Source weights at the closest source point of each position.
+
+        positions = (numpy array) (N, 3) world positions
+
+        Returns (N, influences) weight matrix
+        '''
+
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        if self.triangle_grid is None:
+            return self.weights[self.grid.nearest(positions)[0]]
+
+        triangle, bary, _ = self.triangle_grid.closest(positions, chunk=chunk)
+        if np.any(triangle < 0):
+            raise ValueError(f'No closest triangle found on source mesh >> {self.source}')
+
+        corners = self.triangles[triangle]
+        weights = np.empty((len(positions), self.weights.shape[1]), dtype=np.float64)
+        for start in range(0, len(positions), chunk):
+            end = min(start + chunk, len(positions))
+            weights[start:end] = np.einsum('qk,qkm->qm', bary[start:end], self.weights[corners[start:end]])
+
+        return weights
+
+    def transfer(self, target, remove=False):
+        '''
+        Transfers weights to target, creating its skinCluster with the source influences if needed.
+
+        target = (str) Mesh, nurbsSurface or nurbsCurve
+        remove = (bol) Remove unused influences
+
+        Returns target skinCluster
+        '''
+
+        target_skin = get_skin_clusters(mesh_name=target)
+        if not target_skin:
+            target_skin = create_skin_cluster(target, self.influences)
+
+        skin_weights = SkinWeights.from_dense(self.sample(get_shape_points(target)), self.influences)
+        skin_weights.normalize()
+        skin_weights.apply(target_skin)
+
+        if remove:
+            remove_unused_influences(skin_cluster=target_skin)
+
+        return target_skin
+
+def transfer_weights(object_list=[], remove=False, method='closestPoint'):
     '''
     object_list = ([]) List of object, source first.
     remove = (bol) Remove unused influences
+    method = (str) 'closestPoint' = WeightTransfer, source is prepared once for all targets.
+                   'copySkinWeights' = cmds.copySkinWeights per target.
 
     If no object_list, then selection based. 
     Target first. Multiple targets allowed.
@@ -197,70 +1495,258 @@ def transfer_weights(object_list=[], remove=False):
     else:
         source, target = object_list[0], object_list[1:]
 
-
-    for tgt in target:
-        src_skn = None
-        tgt_skn = None
+    if method == 'copySkinWeights':
         src_skn = get_skin_clusters(mesh_name=source)
-        tgt_skn = get_skin_clusters(mesh_name=tgt)
-        tgt_typ = cmds.objectType(omu.get_dag_path(tgt, shape=True))
-
-        if tgt_typ == 'nurbsSurface':
-            if src_skn and tgt_skn:
-                cmds.copySkinWeights(sourceSkin=src_skn, destinationSkin=tgt_skn, noMirror=True, 
-                                         surfaceAssociation="closestPoint", 
-                                         influenceAssociation=["oneToOne", "name", "label", "closestJoint"])
-            else:
-                if src_skn and not tgt_skn:
-                    jts = get_skin_cluster_influences(skin_cluster=src_skn)
-                    cmds.select(jts, r=True) # cmds.skinCluster kept adding joint heirarchy. Using select instead.
-                    cmds.select(tgt, add=True)
-                    tgt_skn = cmds.skinCluster(tgt, jts, tsb=True)[0]
-                    cmds.copySkinWeights(sourceSkin=src_skn, destinationSkin=tgt_skn, noMirror=True, 
-                                         surfaceAssociation="closestPoint", 
-                                         influenceAssociation=["oneToOne", "name", "label", "closestJoint"])
-
-
-        elif tgt_typ == 'mesh':
-            if src_skn and tgt_skn:
-                cmds.copySkinWeights(ss=src_skn, ds=tgt_skn, noMirror=True, sa='closestPoint', ia=['closestJoint', 'oneToOne'])
-            else:
-                if src_skn and not tgt_skn:
-                    jts = get_skin_cluster_influences(skin_cluster=src_skn)
-                    cmds.select(jts, r=True) # cmds.skinCluster kept adding joint heirarchy. Using select instead.
-                    cmds.select(tgt, add=True)
-                    tgt_skn = cmds.skinCluster(tgt, jts, tsb=True)[0]
-                    cmds.copySkinWeights(ss=src_skn, ds=tgt_skn, noMirror=True, sa='closestPoint', ia=['closestJoint', 'oneToOne'])
-
-
-        elif tgt_typ == 'nurbsCurve':
-            if src_skn and tgt_skn:
-                cmds.copySkinWeights(sourceSkin=src_skn, destinationSkin=tgt_skn, noMirror=True, 
-                                         surfaceAssociation="closestPoint", 
-                                         influenceAssociation=["oneToOne", "name", "label", "closestJoint"])
+        if not src_skn:
+            raise AttributeError(f'Source object does not have a skinCluster >> {source}')
+
+        for tgt in target:
+            tgt_skn = get_skin_clusters(mesh_name=tgt)
+            if not tgt_skn:
+                tgt_skn = create_skin_cluster(tgt, get_skin_cluster_influences(skin_cluster=src_skn))
+
+            if cmds.objectType(omu.get_dag_path(tgt, shape=True)) == 'mesh':
+                influence_association = ['closestJoint', 'oneToOne']
             else:
-                if src_skn and not tgt_skn:
-                    jts = get_skin_cluster_influences(skin_cluster=src_skn)
-                    cmds.select(jts, r=True) # cmds.skinCluster kept adding joint heirarchy. Using select instead.
-                    cmds.select(tgt, add=True)
-                    tgt_skn = cmds.skinCluster(tgt, jts, tsb=True)[0]
-                    cmds.copySkinWeights(sourceSkin=src_skn, destinationSkin=tgt_skn, noMirror=True, 
-                                         surfaceAssociation="closestPoint", 
-                                         influenceAssociation=["oneToOne", "name", "label", "closestJoint"])
-        if remove:
-            remove_unused_influences(skin_cluster=tgt_skn)
+                influence_association = ['oneToOne', 'name', 'label', 'closestJoint']
+            cmds.copySkinWeights(sourceSkin=src_skn, destinationSkin=tgt_skn, noMirror=True, 
+                                 surfaceAssociation='closestPoint', influenceAssociation=influence_association)
+            if remove:
+                remove_unused_influences(skin_cluster=tgt_skn)
+    else:
+        engine = WeightTransfer(source)
+        for tgt in target:
+            engine.transfer(tgt, remove=remove)
 
     cmds.select(target[-1], r=True)
 
-def remove_unused_influences(skin_cluster):
-    influences = cmds.skinCluster(skin_cluster, q=True, inf=True)
-    used_influences = cmds.skinCluster(skin_cluster, q=True, weightedInfluence=True)
+def remove_unused_influences(skin_cluster, threshold=None, max_influences=None):
+    '''
+    Removes influences that carry no weight, in one skinCluster edit.
+
+    skin_cluster   = (str) skinCluster node
+    threshold      = (float) Prune mode. Weights below threshold are zeroed and each point is renormalized
+                     before looking for unused influences. Locked influences are not pruned.
+    max_influences = (int) Prune mode. Keep only the N largest weights per point.
+
+    Returns list of removed influences
+    '''
+
+    skin_weights = SkinWeights.from_skin_cluster(skin_cluster)
+    if threshold is not None or max_influences:
+        if threshold is not None:
+            skin_weights.prune(threshold)
+        if max_influences:
+            skin_weights.limit(max_influences)
+        skin_weights.normalize()
+        skin_weights.apply(skin_cluster)
+
+    used = np.zeros(len(skin_weights.influences), dtype=bool)
+    used[skin_weights.influence_ids] = True
+    if used.all():
+        return []
+    if not used.any():
+        cmds.warning(f'skinCluster has no weighted influences, nothing removed >> {skin_cluster}')
+        return []
+
+    remove_influences = [inf for inf, keep in zip(skin_weights.influences, used) if not keep]
+    cmds.skinCluster(skin_cluster, e=True, ri=remove_influences)
+    get_skin_cluster_info(skin_cluster, rebuild=True)
+
+    return remove_influences
+
+
+#____ mirror skin weights start
+_SYMMETRY_MAPS = {}
+MIRROR_AXES = {'x': 0, 'y': 1, 'z': 2}
+
+def get_symmetry_cache_dir():
+    '''
+    Folder for cached symmetry maps
+    '''
+
+    return os.path.join(cmds.internalVar(userAppDir=True), 'symmetryMaps')
+
+def get_symmetry_map(mesh, axis='x', tolerance=None, cache_dir=None, rebuild=False):
+    '''
+    Mirrored point index for every point, from the bind (orig) shape positions.
+    Points are matched to the closest mirrored position, points without a match within tolerance
+    are matched through their already mapped neighbours (meshes only).
+    Cached in memory and on disk, keyed by topology hash and axis.
+
+    mesh      = (str) Mesh, nurbsSurface or nurbsCurve
+    axis      = (str) Mirror axis, 'x', 'y' or 'z'
+    tolerance = (float) Largest distance for a positional match. Defaults to 0.1% of the bounding box size.
+    cache_dir = (str) Folder for the cache files. Defaults to get_symmetry_cache_dir(), '' disables the disk cache.
+    rebuild   = (bol) Ignore cached maps
+
+    Returns numpy int array
+    '''
+
+    if axis not in MIRROR_AXES:
+        raise ValueError(f'Mirror axis must be x, y or z >> {axis}')
+
+    key = f'{get_topology_hash(mesh)}_{axis}'
+    if cache_dir is None:
+        cache_dir = get_symmetry_cache_dir()
+    cache_file = os.path.join(cache_dir, f'{key}.npy') if cache_dir else None
+
+    if not rebuild:
+        if key in _SYMMETRY_MAPS:
+            return _SYMMETRY_MAPS[key]
+        if cache_file and os.path.isfile(cache_file):
+            _SYMMETRY_MAPS[key] = np.load(cache_file)
+            return _SYMMETRY_MAPS[key]
+
+    points = get_shape_points(_orig_shape(mesh), world=False)
+    mirrored = points.copy()
+    mirrored[:, MIRROR_AXES[axis]] *= -1.0
+
+    if tolerance is None:
+        tolerance = 1e-3 * np.linalg.norm(points.max(axis=0) - points.min(axis=0))
+
+    symmetry, distance = sg.PointGrid(points).nearest(mirrored)
+    unmatched = distance > tolerance
+    if unmatched.any() and cmds.nodeType(omu.get_dag_path(mesh, shape=True)) == 'mesh':
+        symmetry[unmatched] = -1
+        _topological_symmetry(symmetry, points, mirrored, *get_mesh_adjacency(mesh))
+        missing = symmetry < 0
+        symmetry[missing] = sg.PointGrid(points).nearest(mirrored[missing])[0]
+        unmatched = missing
+
+    if unmatched.any():
+        cmds.warning(f'{int(unmatched.sum())} point(s) have no symmetric match, using the closest point >> {mesh}')
+
+    if cache_file:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        np.save(cache_file, symmetry)
+    _SYMMETRY_MAPS[key] = symmetry
+
+    return symmetry
+
+def _orig_shape(mesh):
+    '''
+    Intermediate (orig) shape feeding the deformers of mesh, mesh itself if there is none
+    '''
+
+    orig = cmds.deformableShape(mesh, originalGeometry=True) or ['']
+    orig_shape = orig[0].split('.')[0]
+
+    return orig_shape if orig_shape and cmds.objExists(orig_shape) else mesh
+
+def _topological_symmetry(symmetry, points, mirrored, indptr, indices):
+    '''
+    Fills unmatched (-1) entries of symmetry in place, growing from matched neighbours.
+    An unmatched point picks the neighbour of its neighbours' mirrors closest to its mirrored position.
+    '''
+
+    degree = np.diff(indptr)
+    pending_count = None
+    while True:
+        pending = np.flatnonzero(symmetry < 0)
+        # Done, or the last pass found no candidates (isolated points)
+        if not len(pending) or len(pending) == pending_count:
+            return
+        pending_count = len(pending)
+
+        # Matched neighbours of the pending points
+        rows = np.repeat(pending, degree[pending])
+        neighbours = indices[np.repeat(indptr[pending] - np.concatenate(([0], np.cumsum(degree[pending])[:-1])), 
+                                       degree[pending]) + np.arange(len(rows))]
+        matched = symmetry[neighbours] >= 0
+        rows, anchors = rows[matched], symmetry[neighbours[matched]]
+        if not len(rows):
+            return
+
+        # Neighbours of their mirrors are the candidates
+        counts = degree[anchors]
+        candidate_rows = np.repeat(rows, counts)
+        candidates = indices[np.repeat(indptr[anchors] - np.concatenate(([0], np.cumsum(counts)[:-1])), counts) + 
+                             np.arange(counts.sum())]
+        if not len(candidates):
+            return
+        distance = np.linalg.norm(points[candidates] - mirrored[candidate_rows], axis=1)
+
+        order = np.lexsort((distance, candidate_rows))
+        first = np.concatenate(([True], candidate_rows[order][1:] != candidate_rows[order][:-1]))
+        symmetry[candidate_rows[order][first]] = candidates[order][first]
+
+def mirror_influence_name(influence, search='L_', replace='R_'):
+    '''
+    Swaps search and replace in an influence name, first occurrence only (like rdCtl.mirrorCtlShapes).
+    Names without either pattern are returned unchanged.
+    '''
+
+    short_name = influence.split('|')[-1]
+    if search in short_name:
+        return short_name.replace(search, replace, 1)
+    if replace in short_name:
+        return short_name.replace(replace, search, 1)
+
+    return short_name
+
+def get_mirror_influence_map(influences, search='L_', replace='R_'):
+    '''
+    Mirrored influence for each influence. Mirrored influences that are not in the list 
+    are added to the end when they exist in the scene, otherwise the influence maps to itself.
+
+    influences = ([str]) Influence names
+    search     = (str) Left side pattern
+    replace    = (str) Right side pattern
+
+    Returns (influence list, numpy int array of the mirrored index for each influence in that list)
+    '''
+
+    influences = [x.split('|')[-1] for x in influences]
+    for influence in list(influences):
+        mirror_name = mirror_influence_name(influence, search, replace)
+        if mirror_name not in influences and cmds.objExists(mirror_name):
+            influences.append(mirror_name)
+
+    index = {x: i for i, x in enumerate(influences)}
+    mapping = np.array([index.get(mirror_influence_name(x, search, replace), i) for i, x in enumerate(influences)],
+                       dtype=np.int64)
+
+    return influences, mapping
+
+def mirror_skin_weights(mesh, axis='x', positive_to_negative=True, search='L_', replace='R_', tolerance=None, 
+                        cache_dir=None):
+    '''
+    Mirrors skin weights across axis with one getWeights and one setWeights call.
+    Points on the destination side take the weights of their symmetric point with L/R influences swapped.
+
+    mesh                 = (str) Skinned mesh, nurbsSurface or nurbsCurve
+    axis                 = (str) Mirror axis, 'x', 'y' or 'z'
+    positive_to_negative = (bol) Copy from the positive side to the negative side, otherwise the other way
+    search               = (str) Left side influence pattern
+    replace              = (str) Right side influence pattern
+    tolerance            = (float) See get_symmetry_map()
+    cache_dir            = (str) See get_symmetry_map()
+
+    Returns SkinWeights
+    '''
+
+    skin_cluster = get_skin_clusters(mesh_name=mesh)
+    if not skin_cluster:
+        raise NameError(f'Object does not contain a skinCluster >> {mesh}')
+
+    symmetry = get_symmetry_map(mesh, axis=axis, tolerance=tolerance, cache_dir=cache_dir)
+    weights, influences = get_skin_weights(skin_cluster)
+    influences, influence_map = get_mirror_influence_map(influences, search, replace)
+    if len(influences) > weights.shape[1]:
+        weights = np.pad(weights, ((0, 0), (0, len(influences) - weights.shape[1])))
+
+    side = get_shape_points(_orig_shape(mesh), world=False)[:, MIRROR_AXES[axis]]
+    centre = symmetry == np.arange(len(symmetry)) # Points on the mirror plane map to themselves
+    destination = np.flatnonzero(((side < 0) if positive_to_negative else (side > 0)) & ~centre)
+
+    # Column k of the mirrored row reads the mirrored influence of k
+    mirrored = weights.copy()
+    mirrored[destination] = weights[symmetry[destination]][:, influence_map]
 
-    remove_influences = []
-    for inf in influences:        
-        if inf not in used_influences:
-            remove_influences.append(inf)
+    skin_weights = SkinWeights.from_dense(mirrored, influences, locked=None)
+    skin_weights.apply(skin_cluster)
 
-    if remove_influences != []:
-        for inf in remove_influences:
-            cmds.skinCluster(skin_cluster, e=True, ri=inf)
+    return skin_weights
+#____ mirror skin weights end
@@ -0,0 +1,378 @@
+import numpy as np
+
+
+'''
+Uniform grid spatial queries in NumPy (no Maya, no scipy).
+Used by the skin weight transfer and mirror tools.
+
+####################################################
+Usage:
+
+grid = PointGrid(points)
+index, distance = grid.nearest(query_points)
+
+triangle_grid = TriangleGrid(points, triangles)
+triangle, bary, distance = closest_point_on_mesh(query_points, points, triangles, triangle_grid)
+####################################################
+'''
+
+
+class PointGrid(object):
+    '''
+    Buckets points in a uniform grid for fast nearest point queries.
+
+    points    = (numpy array) (N, 3) positions
+    cell_size = (float) Grid cell size. Defaults to a size giving roughly eight points per cell.
+    '''
+
+    def __init__(self, points, cell_size=None):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if not len(self.points):
+            raise ValueError('PointGrid needs at least one point')
+
+        self.origin = self.points.min(axis=0)
+        extent = np.maximum(self.points.max(axis=0) - self.origin, 1e-6)
+        if cell_size is None:
+            # Aim for ~8 points per occupied cell, treating the points as a surface
+            cell_size = np.sqrt(extent[np.argsort(extent)[1:]].prod() * 8.0 / len(self.points))
+        self.cell_size = max(float(cell_size), float(extent.max()) / 1024.0, 1e-6)
+        self.dims = (np.floor(extent / self.cell_size).astype(np.int64) + 1)
+
+        cells = self._cell_ids(self._cells(self.points))
+        self.order = np.argsort(cells, kind='stable')
+        self.sorted_cells = cells[self.order]
+
+    def _cells(self, positions):
+        return np.floor((positions - self.origin) / self.cell_size).astype(np.int64)
+
+    def _cell_ids(self, cells):
+        return (cells[:, 0] * self.dims[1] + cells[:, 1]) * self.dims[2] + cells[:, 2]
+
+    def _cell_ranges(self, query_cells, radius):
+        '''
+        Sorted point ranges of the cube of cells around each query cell.
+
+        Returns (query index, range start, range count) per non empty cell
+        '''
+
+        offsets = self._offsets(radius)
+        cells = query_cells[:, None, :] + offsets[None, :, :]
+        valid = np.all((cells >= 0) & (cells < self.dims), axis=-1)
+        query_index = np.repeat(np.arange(len(query_cells)), len(offsets))[valid.ravel()]
+
+        starts, counts = self._lookup(self._cell_ids(cells[valid]))
+        occupied = counts > 0
+
+        return query_index[occupied], starts[occupied], counts[occupied]
+
+    def _offsets(self, radius):
+        offsets = np.arange(-radius, radius + 1)
+        return np.stack(np.meshgrid(offsets, offsets, offsets, indexing='ij'), axis=-1).reshape(-1, 3)
+
+    def _lookup(self, cell_ids):
+        starts = np.searchsorted(self.sorted_cells, cell_ids, side='left')
+        return starts, np.searchsorted(self.sorted_cells, cell_ids, side='right') - starts
+
+    def _expand(self, query_index, starts, counts):
+        '''
+        Flattened (query, point) pairs from cell ranges
+        '''
+
+        query_index = np.repeat(query_index, counts)
+        run_starts = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        point_index = self.order[run_starts + np.arange(counts.sum())]
+
+        return query_index, point_index
+
+    def _searched_distance(self, queries, query_cells, radius):
+        '''
+        Distance from each query to the closest face of its searched cube of cells.
+        Faces on the grid border are ignored, there are no points past them.
+        '''
+
+        lower = query_cells - radius
+        upper = query_cells + radius + 1
+        to_lower = np.where(lower > 0, queries - (self.origin + lower * self.cell_size), np.inf)
+        to_upper = np.where(upper < self.dims, (self.origin + upper * self.cell_size) - queries, np.inf)
+
+        return np.minimum(to_lower, to_upper).min(axis=1)
+
+    def nearest(self, queries, chunk=65536):
+        '''
+        Nearest grid point for each query point.
+
+        queries = (numpy array) (Q, 3) positions
+        chunk   = (int) Queries processed per batch, limits memory use
+
+        Returns (index array, distance array)
+        '''
+
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        index = np.full(len(queries), -1, dtype=np.int64)
+        distance = np.full(len(queries), np.inf)
+
+        for start in range(0, len(queries), chunk):
+            end = min(start + chunk, len(queries))
+            index[start:end], distance[start:end] = self._nearest_chunk(queries[start:end])
+
+        return index, distance
+
+    def _nearest_chunk(self, queries):
+        index = np.full(len(queries), -1, dtype=np.int64)
+        distance = np.full(len(queries), np.inf)
+        query_cells = np.clip(self._cells(queries), 0, self.dims - 1)
+
+        pending = np.arange(len(queries))
+        for radius in (1, 2, 3):
+            # Keep the (query, cell) table around 1M entries
+            batch = max(1, 1000000 // (2 * radius + 1) ** 3)
+            for start in range(0, len(pending), batch):
+                rows = pending[start:start + batch]
+                cell_query, cell_starts, cell_counts = self._cell_ranges(query_cells[rows], radius)
+                if not len(cell_query):
+                    continue
+
+                # Expand in pieces of at most ~4M (query, point) pairs
+                total = np.cumsum(cell_counts)
+                bounds = np.searchsorted(total, np.arange(4000000, total[-1], 4000000), side='right')
+                for piece in np.split(np.arange(len(cell_query)), bounds):
+                    if not len(piece):
+                        continue
+                    query_index, point_index = self._expand(cell_query[piece], cell_starts[piece], cell_counts[piece])
+                    dist = np.linalg.norm(self.points[point_index] - queries[rows][query_index], axis=1)
+                    best = _group_argmin(query_index, dist)
+                    hits = rows[query_index[best]]
+                    improved = dist[best] < distance[hits]
+                    index[hits[improved]] = point_index[best][improved]
+                    distance[hits[improved]] = dist[best][improved]
+
+            # Exact once the best hit is closer than the searched cube
+            pending = pending[distance[pending] > self._searched_distance(queries[pending], query_cells[pending],
+                                                                          radius)]
+            if not len(pending):
+                break
+
+        # Far away queries, brute force in batches of ~4M distances
+        squared = np.einsum('ij,ij->i', self.points, self.points)
+        batch = max(1, 4000000 // len(self.points))
+        for start in range(0, len(pending), batch):
+            rows = pending[start:start + batch]
+            dist = squared[None, :] - 2.0 * queries[rows] @ self.points.T
+            best = np.argmin(dist, axis=1)
+            index[rows] = best
+            distance[rows] = np.linalg.norm(self.points[best] - queries[rows], axis=1)
+
+        return index, distance
+
+
+class TriangleGrid(PointGrid):
+    '''
+    Buckets mesh triangles in a uniform grid for exact closest point on mesh queries.
+    Each triangle is listed in every cell its bounding box touches, so the triangle holding
+    the closest point is always found in the cell of that point. The nearest mesh vertex gives
+    each query an upper bound, which sets the searched cube and prunes triangles by bounding box.
+
+    points    = (numpy array) (N, 3) mesh vertex positions
+    triangles = (numpy array) (T, 3) vertex indices
+    cell_size = (float) Grid cell size. Defaults to the median triangle bounding box size.
+    '''
+
+    def __init__(self, points, triangles, cell_size=None):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        if not len(self.triangles):
+            raise ValueError('TriangleGrid needs at least one triangle')
+
+        corners = self.points[self.triangles]
+        self.lower = corners.min(axis=1)
+        self.upper = corners.max(axis=1)
+        self.origin = self.lower.min(axis=0)
+        extent = np.maximum(self.upper.max(axis=0) - self.origin, 1e-6)
+        if cell_size is None:
+            cell_size = np.median((self.upper - self.lower).max(axis=1))
+        # At most 128 cells along the longest side, so big triangles span a bounded number of cells
+        self.cell_size = max(float(cell_size), float(extent.max()) / 128.0, 1e-6)
+        self.dims = (np.floor(extent / self.cell_size).astype(np.int64) + 1)
+
+        # One (cell, triangle) entry per cell of each bounding box
+        low_cells = np.clip(self._cells(self.lower), 0, self.dims - 1)
+        spans = np.clip(self._cells(self.upper), 0, self.dims - 1) - low_cells + 1
+        counts = spans.prod(axis=1)
+        triangle_ids = np.repeat(np.arange(len(self.triangles)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        span = spans[triangle_ids]
+        offsets = np.stack((local // (span[:, 1] * span[:, 2]), (local // span[:, 2]) % span[:, 1], 
+                            local % span[:, 2]), axis=1)
+        cells = self._cell_ids(low_cells[triangle_ids] + offsets)
+
+        order = np.argsort(cells, kind='stable')
+        self.order = triangle_ids[order]
+        self.sorted_cells = cells[order]
+        # Dense start table, the grid has at most 128^3 cells
+        self.cell_starts = np.searchsorted(self.sorted_cells, np.arange(self.dims.prod() + 1))
+
+        # Vertices used by triangles, isolated vertices are not on the surface
+        self.vertex_grid = PointGrid(self.points[np.unique(self.triangles)])
+
+    def _offsets(self, radius):
+        # Only cells that can hold a point within radius cells of the query cell
+        offsets = super(TriangleGrid, self)._offsets(radius)
+        gaps = np.maximum(np.abs(offsets) - 1, 0)
+        return offsets[(gaps ** 2).sum(axis=1) <= radius ** 2]
+
+    def _lookup(self, cell_ids):
+        starts = self.cell_starts[cell_ids]
+        return starts, self.cell_starts[cell_ids + 1] - starts
+
+    def closest(self, queries, chunk=16384):
+        '''
+        Closest point on the mesh for each query point.
+
+        queries = (numpy array) (Q, 3) positions
+        chunk   = (int) Queries processed per batch, limits memory use
+
+        Returns (triangle index (Q,), barycentric (Q, 3), distance (Q,))
+        '''
+
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        triangle_index = np.full(len(queries), -1, dtype=np.int64)
+        bary = np.zeros((len(queries), 3))
+        distance = np.full(len(queries), np.inf)
+
+        for start in range(0, len(queries), chunk):
+            end = min(start + chunk, len(queries))
+            triangle_index[start:end], bary[start:end], distance[start:end] = self._closest_chunk(queries[start:end])
+
+        return triangle_index, bary, distance
+
+    def _closest_chunk(self, queries):
+        triangle_index = np.full(len(queries), -1, dtype=np.int64)
+        bary = np.zeros((len(queries), 3))
+        distance = np.full(len(queries), np.inf)
+
+        # The nearest vertex is on the mesh, the closest point is no further than it
+        bound = self.vertex_grid.nearest(queries)[1] * (1.0 + 1e-9) + 1e-12
+
+        def test(rows, query_index, tris):
+            # Closest of the (query, triangle) pairs per query, query_index must be sorted.
+            # Triangles whose bounding box is past the bound can not hold the closest point.
+            query_points = queries[rows][query_index]
+            gap = np.maximum(np.maximum(self.lower[tris] - query_points, query_points - self.upper[tris]), 0.0)
+            keep = np.einsum('ij,ij->i', gap, gap) <= bound[rows][query_index] ** 2
+            query_index, tris, query_points = query_index[keep], tris[keep], query_points[keep]
+            if not len(tris):
+                return
+
+            corners = self.points[self.triangles[tris]]
+            pair_bary, pair_distance = closest_point_on_triangles(query_points, corners[:, 0], corners[:, 1], 
+                                                                  corners[:, 2])
+            best = _group_argmin(query_index, pair_distance)
+            hits = rows[query_index[best]]
+            improved = pair_distance[best] < distance[hits]
+            triangle_index[hits[improved]] = tris[best][improved]
+            bary[hits[improved]] = pair_bary[best][improved]
+            distance[hits[improved]] = pair_distance[best][improved]
+
+        # Every point within the bound lies in the cube of cells of this radius around the query cell
+        query_cells = np.clip(self._cells(queries), 0, self.dims - 1)
+        radii = np.ceil(bound / self.cell_size).astype(np.int64)
+        brute = radii > 16
+        for radius in np.unique(radii[~brute]):
+            pending = np.flatnonzero(radii == radius)
+            batch = max(1, 1000000 // (2 * radius + 1) ** 3)
+            for start in range(0, len(pending), batch):
+                rows = pending[start:start + batch]
+                cell_query, cell_starts, cell_counts = self._cell_ranges(query_cells[rows], radius)
+                if not len(cell_query):
+                    continue
+
+                # Test in pieces of at most ~1M (query, triangle) pairs
+                total = np.cumsum(cell_counts)
+                bounds = np.searchsorted(total, np.arange(1000000, total[-1], 1000000), side='right')
+                for piece in np.split(np.arange(len(cell_query)), bounds):
+                    if len(piece):
+                        test(rows, *self._expand(cell_query[piece], cell_starts[piece], cell_counts[piece]))
+
+        # Queries far from the mesh, every triangle in batches of ~1M pairs
+        pending = np.flatnonzero(brute)
+        batch = max(1, 1000000 // len(self.triangles))
+        for start in range(0, len(pending), batch):
+            rows = pending[start:start + batch]
+            test(rows, np.repeat(np.arange(len(rows)), len(self.triangles)), 
+                 np.tile(np.arange(len(self.triangles)), len(rows)))
+
+        return triangle_index, bary, distance
+
+
+def _group_argmin(keys, values):
+    '''
+    Position of the smallest value for each run of equal keys. keys must be sorted.
+    '''
+
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    counts = np.diff(np.concatenate((starts, [len(keys)])))
+    is_min = values == np.repeat(np.minimum.reduceat(values, starts), counts)
+    positions = np.flatnonzero(is_min)
+    group_keys = keys[positions]
+
+    return positions[np.concatenate(([True], group_keys[1:] != group_keys[:-1]))]
+
+
+def closest_point_on_triangles(points, a, b, c):
+    '''
+    Closest point on triangle (a, b, c) for each point, all arrays (N, 3).
+
+    Returns (barycentric (N, 3) weights of a, b, c, distance (N,))
+    '''
+
+    ab, ac = b - a, c - a
+    ap = points - a
+    d00 = np.einsum('ij,ij->i', ab, ab)
+    d01 = np.einsum('ij,ij->i', ab, ac)
+    d11 = np.einsum('ij,ij->i', ac, ac)
+    d20 = np.einsum('ij,ij->i', ap, ab)
+    d21 = np.einsum('ij,ij->i', ap, ac)
+    denominator = d00 * d11 - d01 * d01
+
+    # Projection onto the triangle plane
+    safe = np.abs(denominator) > 1e-20
+    v = np.where(safe, (d11 * d20 - d01 * d21) / np.where(safe, denominator, 1.0), -1.0)
+    w = np.where(safe, (d00 * d21 - d01 * d20) / np.where(safe, denominator, 1.0), -1.0)
+    inside = (v >= 0) & (w >= 0) & (v + w <= 1)
+    bary = np.stack((1.0 - v - w, v, w), axis=1)
+    projected = a + ab * v[:, None] + ac * w[:, None]
+    distance = np.where(inside, np.linalg.norm(points - projected, axis=1), np.inf)
+
+    # Otherwise the closest point is on one of the edges
+    for start, end, i, j in ((a, b, 0, 1), (b, c, 1, 2), (c, a, 2, 0)):
+        edge = end - start
+        length = np.einsum('ij,ij->i', edge, edge)
+        t = np.clip(np.einsum('ij,ij->i', points - start, edge) / np.where(length > 0, length, 1.0), 0.0, 1.0)
+        edge_distance = np.linalg.norm(points - (start + edge * t[:, None]), axis=1)
+        closer = edge_distance < distance
+        distance = np.where(closer, edge_distance, distance)
+        edge_bary = np.zeros_like(bary)
+        edge_bary[:, i] = 1.0 - t
+        edge_bary[:, j] = t
+        bary = np.where(closer[:, None], edge_bary, bary)
+
+    return bary, distance
+
+
+def closest_point_on_mesh(queries, points, triangles, grid=None, chunk=16384):
+    '''
+    Closest point on a triangle mesh for each query point, searched over a TriangleGrid.
+
+    queries   = (numpy array) (Q, 3) positions
+    points    = (numpy array) (N, 3) mesh vertex positions
+    triangles = (numpy array) (T, 3) vertex indices, raises ValueError when empty
+    grid      = (TriangleGrid) Prebuilt grid over the mesh triangles
+    chunk     = (int) Queries processed per batch
+
+    Returns (triangle index (Q,), barycentric (Q, 3), distance (Q,))
+    '''
+
+    if grid is None:
+        grid = TriangleGrid(points, triangles)
+
+    return grid.closest(queries, chunk=chunk)
@@ -1,7 +1,100 @@
 import maya.cmds as cmds
+from maya.api import OpenMaya
 from . import omUtil as omu
 from . import rigUtils as rigu
+from . import nurbsEval as nev
+import numpy as np
+import hashlib
+import logging
+import time
 
+LOG = logging.getLogger(__name__)
+LOG.setLevel(logging.INFO)
+
+
+_SURFACE_DATA = {}
+ATTACH_MODES = ['matrix', 'compact']
+ATTACH_MODE_ATTR = 'attachMode'
+
+def get_surface_data(surface_name, rebuild=False):
+    '''
+    Object space nurbsEval.NurbsSurface snapshot of surface_name, cached by a hash of its CVs and knots
+
+    surface_name = (str) nurbsSurface shape or transform
+    rebuild      = (bol) Ignore the cache
+    '''
+
+    dag_path = OpenMaya.MSelectionList().add(surface_name).getDagPath(0)
+    dag_path.extendToShape()
+    if not dag_path.hasFn(OpenMaya.MFn.kNurbsSurface):
+        raise TypeError(f'Object is not of type nurbsSurface >> {surface_name}')
+
+    surface_fn = OpenMaya.MFnNurbsSurface(dag_path)
+    cvs = np.array([tuple(p) for p in surface_fn.cvPositions(OpenMaya.MSpace.kObject)], dtype=np.float64)
+    knots_u = np.array(list(surface_fn.knotsInU()), dtype=np.float64)
+    knots_v = np.array(list(surface_fn.knotsInV()), dtype=np.float64)
+    settings = np.array([surface_fn.degreeInU, surface_fn.degreeInV, surface_fn.formInU, surface_fn.formInV], 
+                        dtype=np.int32)
+
+    sha = hashlib.sha1()
+    [sha.update(x.tobytes()) for x in (settings, knots_u, knots_v, cvs)]
+    key = sha.hexdigest()
+
+    if rebuild or key not in _SURFACE_DATA:
+        # CVs come in u major order
+        cvs = cvs.reshape(surface_fn.numCVsInU, surface_fn.numCVsInV, 4)
+        periodic = OpenMaya.MFnNurbsSurface.kPeriodic
+        _SURFACE_DATA[key] = nev.NurbsSurface(cvs[..., :3], knots_u, knots_v, surface_fn.degreeInU, 
+                                              surface_fn.degreeInV, periodic_u=surface_fn.formInU == periodic,
+                                              periodic_v=surface_fn.formInV == periodic, weights=cvs[..., 3])
+
+    return _SURFACE_DATA[key]
+
+def get_uv_params(points, surface_name, iterations=8):
+    '''
+    Closest (u, v) parameters on surface_name for many world space points in one call
+
+    points       = (numpy array) (N, 3) world positions, cmds.xform(obj, q=True, ws=True, t=True) per row
+    surface_name = (str) Surface name
+    iterations   = (int) Newton steps after the nearest sample lookup
+
+    Returns (u array, v array)
+    '''
+
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    dag_path = OpenMaya.MSelectionList().add(surface_name).getDagPath(0)
+    dag_path.extendToShape()
+
+    # Surface data is in object space
+    world_inverse = np.array(list(dag_path.inclusiveMatrixInverse()), dtype=np.float64).reshape(4, 4)
+    local = points @ world_inverse[:3, :3] + world_inverse[3, :3]
+
+    return get_surface_data(surface_name).closest_params(local, iterations=iterations)
+
+def get_surface_uvs(points, surface_name, margin=0.001):
+    '''
+    Closest parameters on surface_name for many world space points, pulled margin away from the edges
+    of open directions. Uses the surface minMaxRangeU / minMaxRangeV, fetched once.
+
+    points       = (numpy array) (N, 3) world positions
+    surface_name = (str) Surface name
+    margin       = (float) Distance kept from open surface edges, in parameter units
+
+    Returns (u, v, u normalized 0-1, v normalized 0-1) arrays
+    '''
+
+    surface_shape = omu.get_dag_path(surface_name, shape=1)
+    u, v = get_uv_params(points, surface_name)
+
+    result = []
+    for direction, params in (('U', u), ('V', v)):
+        start, end = cmds.getAttr(f'{surface_shape}.minMaxRange{direction}')[0]
+        if cmds.getAttr(f'{surface_shape}.form{direction}') == 0: # Open
+            params = np.clip(params, start + margin, end - margin)
+        result.append(params)
+        result.append(np.clip((params - start) / max(end - start, 1e-12), 0.0, 1.0))
+
+    return result[0], result[2], result[1], result[3]
 
 def nurb_surf_prep(surface_name=None, create=False):
     '''
@@ -16,17 +109,7 @@ def nurb_surf_prep(surface_name=None, create=False):
         if not cmds.objExists(surface_name):
             raise NameError('Specified surface does not exist in the scene')
         else:
-            if cmds.listRelatives(surface_name, c=True, type='transform'):
-                [cmds.delete(child) for child in cmds.listRelatives(surface_name, c=True, type='transform')]
-
-            cmds.delete(surface_name, ch=True)
-            cmds.makeIdentity(surface_name, apply=True, t=1, r=1, s=1, n=0, pn=1)
-            prepSrf = cmds.rebuildSurface(surface_name, rt=0, kc=0, fr=0, ch=1, end=1, sv=0, su=0, kr=0, dir=2, kcp=0, 
-                                            tol=0.01, dv=3, du=3, rpo=0)[0]
-            cmds.ToggleSurfaceOrigin()
-            cmds.delete(prepSrf, ch=1)
-            cmds.delete(surface_name)
-            cmds.rename(prepSrf, surface_name)
+            prep_surfaces([surface_name], degree=3)
             return surface_name
 
     if create:
@@ -36,6 +119,76 @@ def nurb_surf_prep(surface_name=None, create=False):
         cmds.ToggleSurfaceOrigin(temp_surface)
         return temp_surface
 
+def prep_surfaces(surfaces, degree=None, delete_children=True):
+    '''
+    Headless batch version of nurb_surf_prep(), safe to run from mayapy. Reparameterizes surfaces to 0-1
+    without selection or UI commands. History is deleted and transforms are frozen, then the knot vectors are
+    rescaled through MFnNurbsSurface, which keeps the shape exactly. Surfaces are only rebuilt when degree
+    is given and differs from the current degree. Logs the time spent on each surface.
+
+    surfaces        = ([str]) Nurbs surfaces
+    degree          = (int) Rebuild to this degree in u and v. None keeps the current degree.
+    delete_children = (bol) Delete child transforms, like nurb_surf_prep()
+
+    Returns list of {'surface', 'clean', 'knots'} timings in seconds
+    '''
+
+    if type(surfaces) != list:
+        surfaces = [surfaces]
+
+    for surface in surfaces:
+        if not cmds.objExists(surface):
+            raise NameError(f'Surface does not exist in the scene >> {surface}')
+        if cmds.objectType(omu.get_dag_path(surface, shape=1)) != 'nurbsSurface':
+            raise TypeError(f'Object is not of type nurbsSurface >> {surface}')
+
+    start = time.perf_counter()
+    report = []
+    for surface in surfaces:
+        tick = time.perf_counter()
+        if delete_children:
+            children = cmds.listRelatives(surface, c=True, type='transform', f=True)
+            if children:
+                cmds.delete(children)
+        cmds.delete(surface, ch=True)
+        cmds.makeIdentity(surface, apply=True, t=1, r=1, s=1, n=0, pn=1)
+        clean = time.perf_counter() - tick
+
+        tick = time.perf_counter()
+        dag_path = OpenMaya.MSelectionList().add(surface).getDagPath(0)
+        dag_path.extendToShape()
+        surface_fn = OpenMaya.MFnNurbsSurface(dag_path)
+        if degree is not None and (surface_fn.degreeInU != degree or surface_fn.degreeInV != degree):
+            # Rebuild with a 0-1 knot range, keeping the span count
+            cmds.rebuildSurface(surface, rt=0, kc=0, fr=0, ch=0, end=1, sv=0, su=0, kr=0, dir=2, kcp=0, tol=0.01, 
+                                dv=degree, du=degree, rpo=1)
+        else:
+            _normalize_surface_knots(surface_fn)
+        report.append({'surface': surface, 'clean': clean, 'knots': time.perf_counter() - tick})
+
+    for entry in report:
+        LOG.info(f'{entry["surface"]}: clean {entry["clean"]:.3f}s, knots {entry["knots"]:.3f}s')
+    LOG.info(f'Prepared {len(report)} surface(s) in {time.perf_counter() - start:.3f}s')
+
+    return report
+
+def _normalize_surface_knots(surface_fn):
+    '''
+    Rescales the knot vectors of a MFnNurbsSurface to a 0-1 range. CVs are untouched, the shape stays the same.
+    '''
+
+    for direction, count, degree in (('U', surface_fn.numCVsInU, surface_fn.degreeInU), 
+                                     ('V', surface_fn.numCVsInV, surface_fn.degreeInV)):
+        knots = np.array(list(getattr(surface_fn, f'knotsIn{direction}')()), dtype=np.float64)
+        # Maya knot layout, the parameter range runs from knot degree - 1 to knot count - 1
+        start, end = knots[degree - 1], knots[count - 1]
+        if np.isclose(start, 0.0) and np.isclose(end, 1.0):
+            continue
+        knots = (knots - start) / (end - start)
+        getattr(surface_fn, f'setKnotsIn{direction}')(OpenMaya.MDoubleArray(knots.tolist()), 0, len(knots) - 1)
+
+    surface_fn.updateSurface()
+
 def surface_reverse_direction():
     '''
     Swaps nurbs UV direction
@@ -102,7 +255,7 @@ def curve_along_surface(surface_name, open_closed='', uv='v'):
 
     return surface_curve
 
-def curve_along_surface_multi(surface_name, rows, open_closed='', uv='v'):
+def curve_along_surface_multi(surface_name, rows, open_closed='', uv='v', live=True):
     '''
     Creates several curves along nurbs surface
 
@@ -110,8 +263,13 @@ def curve_along_surface_multi(surface_name, rows, open_closed='', uv='v'):
     open_closed  = (str) Determine if the open or closed(periodic)
     rows    = (int) Number of curves to create on nurbs surface
     uv      = (str) 'u'(0) or 'v'(1) direction along nurbs surface
+    live    = (bol) Keep curveFromSurfaceIso nodes driving the curves.
+              False creates static curves with iso_curves_from_surface(), no history.
     '''
 
+    if not live:
+        return iso_curves_from_surface(surface_name, rows, uv=uv)
+
     # Detect if nurbs is open or closed shape
     if cmds.getAttr(f'{surface_name}.formU') > 1:
         open_closed='closed'
@@ -156,6 +314,52 @@ def curve_along_surface_multi(surface_name, rows, open_closed='', uv='v'):
 
     return curves_list
 
+def iso_curves_from_surface(surface_name, rows, uv='v'):
+    '''
+    Creates static isoparm curves, evenly spaced over the surface range, without curveFromSurfaceIso nodes.
+    Curves are computed from the surface CVs and knots with nurbsEval and created in one
+    undoable modifier pass (omUtil.UndoableModifier).
+
+    surface_name = (str) Name of nurbs surface
+    rows         = (int) Number of curves to create on nurbs surface
+    uv           = (str) 'u' or 'v', parameter held constant along each curve, like isoparmDirection
+
+    Returns list of curves, parented under the surface
+    '''
+
+    if uv not in ['u', 'v']:
+        raise ValueError(f'uv must be u or v >> {uv}')
+
+    surface = get_surface_data(surface_name)
+    start, end = surface.domain_u if uv == 'u' else surface.domain_v
+    values = np.linspace(start, end, rows) if rows > 1 else np.array([start])
+    cvs, weights, knots, degree, periodic = surface.isoparms(values, direction=uv)
+
+    # Curves are built in world space then parented, like the live curves
+    surface_path = OpenMaya.MSelectionList().add(surface_name).getDagPath(0)
+    surface_path.extendToShape()
+    surface_world = np.array(list(surface_path.inclusiveMatrix()), dtype=np.float64).reshape(4, 4)
+    cvs = cvs @ surface_world[:3, :3] + surface_world[3, :3]
+
+    if periodic:
+        form = OpenMaya.MFnNurbsCurve.kPeriodic
+    elif np.allclose(cvs[:, 0], cvs[:, -1]):
+        form = OpenMaya.MFnNurbsCurve.kClosed
+    else:
+        form = OpenMaya.MFnNurbsCurve.kOpen
+
+    short_name = surface_name.split('|')[-1]
+    with omu.UndoableModifier(name='Iso curves from surface') as modifier:
+        transforms = []
+        for i, curve_cvs in enumerate(cvs):
+            transform = modifier.createCurve(curve_cvs, knots, degree, form, 
+                                             weights=None if weights is None else weights[i], 
+                                             name=f'{short_name}_srfCrv_{str(i)}')
+            transforms.append(transform)
+        modifier.doIt()
+
+        return cmds.parent([OpenMaya.MFnDagNode(x).fullPathName() for x in transforms], surface_name)
+
 def constrain_to_surface_follicle(object_name, surface_name, translate=True, rotate=True, 
                                 world_space=True, offset=False, return_pos=False, driver_obj=None):
     '''
@@ -338,55 +542,43 @@ def constrain_to_surface_matrix(object_name, surface_name, translate=True, rotat
             except:
                 pass
 
-    pos_node = cmds.createNode('closestPointOnSurface', n=f'{object_name}pos_node', ss=True)
     pos_info_node = cmds.createNode('pointOnSurfaceInfo', n=f'{object_name}pos_info_node', ss=True)
     pos_matrix_node = cmds.createNode('fourByFourMatrix', n=f'{object_name}posMat', ss=True)
-
-    cmds.connectAttr(f'{surface_name}.worldSpace[0]', f'{pos_node}.inputSurface')
     cmds.connectAttr(f'{surface_name}.worldSpace[0]', f'{pos_info_node}.inputSurface')
-    cmds.connectAttr(f'{pos_node}.parameterU', f'{pos_info_node}.parameterU')
-    cmds.connectAttr(f'{pos_node}.parameterV', f'{pos_info_node}.parameterV')
-    
-
-    # Get world translation
-    if world_space:
-        decomp_node = cmds.createNode('decomposeMatrix', n=f'{object_name}_world_pos', ss=True)
-        cmds.connectAttr(f'{object_name}.worldMatrix[0]', f'{decomp_node}.inputMatrix')
-        cmds.connectAttr(f'{decomp_node}.outputTranslate', f'{pos_node}.inPosition')
-    else:
-        cmds.connectAttr(f'{object_name}.translate', f'{pos_node}.inPosition')
 
-    
-    if not return_pos:
-        if world_space:
-            cmds.disconnectAttr(f'{decomp_node}.outputTranslate', f'{pos_node}.inPosition')
-            cmds.disconnectAttr(f'{pos_node}.parameterU', f'{pos_info_node}.parameterU')
-            cmds.disconnectAttr(f'{pos_node}.parameterV', f'{pos_info_node}.parameterV')
+    if return_pos:
+        pos_node = cmds.createNode('closestPointOnSurface', n=f'{object_name}pos_node', ss=True)
+        cmds.connectAttr(f'{surface_name}.worldSpace[0]', f'{pos_node}.inputSurface')
+        cmds.connectAttr(f'{pos_node}.parameterU', f'{pos_info_node}.parameterU')
+        cmds.connectAttr(f'{pos_node}.parameterV', f'{pos_info_node}.parameterV')
+
+        # Get world translation
+        if world_space or driver_obj:
+            position_obj = driver_obj or object_name
+            decomp_node = cmds.createNode('decomposeMatrix', n=f'{position_obj}_world_pos', ss=True)
+            cmds.connectAttr(f'{position_obj}.worldMatrix[0]', f'{decomp_node}.inputMatrix')
+            cmds.connectAttr(f'{decomp_node}.outputTranslate', f'{pos_node}.inPosition')
         else:
-            cmds.disconnectAttr(f'{object_name}.outputTranslate', f'{pos_node}.inPosition')
-            cmds.disconnectAttr(f'{pos_node}.parameterU', f'{pos_info_node}.parameterU')
-            cmds.disconnectAttr(f'{pos_node}.parameterV', f'{pos_info_node}.parameterV')
+            cmds.connectAttr(f'{object_name}.translate', f'{pos_node}.inPosition')
 
-    if driver_obj:
+    else:
         if world_space:
-            cmds.disconnectAttr(f'{decomp_node}.outputTranslate', f'{pos_node}.inPosition')
+            point = cmds.xform(object_name, q=True, ws=True, t=True)
         else:
-            cmds.disconnectAttr(f'{object_name}.outputTranslate', f'{pos_node}.inPosition')
-        decomp_node = cmds.createNode('decomposeMatrix', n=f'{driver_obj}_world_pos', ss=True)
-        cmds.connectAttr(f'{driver_obj}.worldMatrix[0]', f'{decomp_node}.inputMatrix')
-        cmds.connectAttr(f'{decomp_node}.outputTranslate', f'{pos_node}.inPosition')
-
-
-    # Pull away from the edge of the nurbs surface
-    # Cannot limit this attr minValue, maxValue
-    if cmds.getAttr(f'{pos_info_node}.parameterV') == 0:
-        cmds.setAttr(f'{pos_info_node}.parameterV', 0.001)
-    if cmds.getAttr(f'{pos_info_node}.parameterV') == 1.0999999999999999:
-        cmds.setAttr(f'{pos_info_node}.parameterV', 1.098)
-    if cmds.getAttr(f'{pos_info_node}.parameterU') == 0:
-        cmds.setAttr(f'{pos_info_node}.parameterU', 0.001)
-    if cmds.getAttr(f'{pos_info_node}.parameterU') == 1:
-        cmds.setAttr(f'{pos_info_node}.parameterU', 0.999)
+            point = cmds.getAttr(f'{object_name}.translate')[0]
+        u, v, u_normalized, v_normalized = [float(x[0]) for x in get_surface_uvs([point], surface_name)]
+
+        # U, V attributes (locator guides) drive the parameters as 0-1 percentages
+        uv_attrs = [x for x in ['U', 'V'] if cmds.attributeQuery(x, node=object_name, exists=True)]
+        if uv_attrs:
+            cmds.setAttr(f'{pos_info_node}.turnOnPercentage', 1)
+            u, v = u_normalized, v_normalized
+        for attr, value in (('U', u), ('V', v)):
+            if attr in uv_attrs:
+                cmds.setAttr(f'{object_name}.{attr}', value)
+                cmds.connectAttr(f'{object_name}.{attr}', f'{pos_info_node}.parameter{attr}')
+            else:
+                cmds.setAttr(f'{pos_info_node}.parameter{attr}', value)
 
     if x_axis=='u':
         # X vector
@@ -456,32 +648,310 @@ def constrain_to_surface_matrix(object_name, surface_name, translate=True, rotat
                     cmds.setAttr(f'{object_name}.jointOrient{a}', 0)
 
     
-    # Connect U, V if they exist (locator guides)
-    if 'U' in cmds.listAttr(object_name):
-        if cmds.getAttr(f'{pos_info_node}.parameterU') > 1.0: # I think I'm getting rounding errors creating values above 1.0
-            cmds.setAttr(f'{object_name}.U', 1.0)
-        else:
-            if cmds.getAttr(pos_info_node+'.parameterU') < 0:
-                pos = 0
-            else:
-                pos = cmds.getAttr(f'{pos_info_node}.parameterU')
-            cmds.setAttr(f'{object_name}.U', pos)
-        cmds.connectAttr(f'{object_name}.U', f'{pos_info_node}.parameterU')
+    if return_pos:
+        return pos_node, pos_info_node
+    else:
+        return pos_info_node
 
-    if 'V' in cmds.listAttr(object_name):
-        if cmds.getAttr(f'{pos_info_node}.parameterV') > 1.0: # I think I'm getting rounding errors creating values above 1.0
-            cmds.setAttr(f'{object_name}.V', 1.0)
-        else:
-            if cmds.getAttr(f'{pos_info_node}.parameterV') < 0:
-                pos = 0
-            else:
-                pos = cmds.getAttr(f'{pos_info_node}.parameterV')
-            cmds.setAttr(f'{object_name}.V', pos)
-        cmds.connectAttr(f'{object_name}.V', f'{pos_info_node}.parameterV')
+def constrain_to_surface_matrix_batch(objects, surface_name, translate=True, rotate=True, offset=False, x_axis='v', 
+                                      world_space=True, return_pos=False, mode='auto'):
+    '''
+    Constrains many objects to closest point on nurbs surface by matrix, like constrain_to_surface_matrix().
+    UVs are solved at once with get_surface_uvs(), offsets are computed with numpy and every node and 
+    connection is made in one pass (omUtil.UndoableModifier). Objects are not reparented.
+    closestPointOnSurface nodes are only created when return_pos is on.
+
+    The 'matrix' mode builds pointOnSurfaceInfo > fourByFourMatrix per object. The 'compact' mode uses
+    one uvPin node for every object. uvPin orthonormalizes its frame, so compact output differs from matrix
+    on sheared surfaces and flips Z with x_axis='u' (uvPin Z is -tangentV). 'auto' uses the mode recorded
+    on the surface (attachMode attr) by an earlier build, otherwise matrix. The mode used is recorded on the surface.
+
+    objects      = ([str]) Items to be constrained
+    surface_name = (str) Surface that items will be constrained to
+    translate    = (bol) Constrain translation
+    rotate       = (bol) Constrain rotation
+    offset       = (bol) Keep the current object transforms as an offset
+    x_axis       = (str) 'u' or 'v' direction of srf to use for joint X vector
+    world_space  = (bol) Use constrained objects ws for closest point on surface
+    return_pos   = (bol) Also return live closestPointOnSurface nodes, to animate the constraints
+    mode         = (str) 'auto', 'matrix' or 'compact'
 
+    Returns list of pointOnSurfaceInfo nodes (uvPin node in compact mode), one per object (duplicates removed).
+    List of (closestPointOnSurface, node) if return_pos
+    '''
 
-    if return_pos:
-        return pos_node, pos_info_node
+    if cmds.objExists(surface_name):
+        if cmds.objectType(omu.get_dag_path(surface_name, shape=1)) != 'nurbsSurface':
+            raise TypeError(f'Object is not of type nurbsSurface >> {surface_name}')
+    else:
+        raise NameError(f'Surface does not exist in the scene >> {surface_name}')
+
+    if x_axis not in ['u', 'v']:
+        raise ValueError(f'x_axis must be u or v >> {x_axis}')
+
+    mode = get_attach_mode(surface_name, mode)
+
+    if type(objects) != list:
+        objects = [objects]
+
+    objects, paths = omu.get_dag_paths(objects)
+    fns = [OpenMaya.MFnDependencyNode(path.node()) for path in paths]
+
+    if world_space:
+        points = [cmds.xform(obj, q=True, ws=True, t=True) for obj in objects]
     else:
-        cmds.delete(pos_node)
-        return pos_info_node
\ No newline at end of file
+        points = [cmds.getAttr(f'{obj}.translate')[0] for obj in objects]
+    u, v, u_normalized, v_normalized = get_surface_uvs(points, surface_name)
+    surface = get_surface_data(surface_name)
+
+    surface_path = OpenMaya.MSelectionList().add(surface_name).getDagPath(0)
+    surface_path.extendToShape()
+    world_space_plug = OpenMaya.MFnDependencyNode(surface_path.node()).findPlug('worldSpace', False)
+    world_space_plug = world_space_plug.elementByLogicalIndex(0)
+
+    if offset:
+        # World matrices the matrix nodes will output, to bake the maintain offset matrices
+        surface_world = np.array(list(surface_path.inclusiveMatrix()), dtype=np.float64).reshape(4, 4)
+        values = surface.derivatives(u, v, order=1)
+        tangent_u = values['u'] @ surface_world[:3, :3]
+        tangent_v = values['v'] @ surface_world[:3, :3]
+        normal = np.cross(tangent_u, tangent_v)
+        tangent_u, tangent_v, normal = [x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12) 
+                                        for x in (tangent_u, tangent_v, normal)]
+        frames = np.zeros((len(objects), 4, 4))
+        if mode == 'compact':
+            # uvPin builds an orthonormal right handed frame from the normal and the u tangent
+            tangent_u = np.cross(normal, np.cross(tangent_u, normal))
+            tangent_v = np.cross(tangent_u, normal) if x_axis == 'u' else np.cross(normal, tangent_u)
+            tangent_u, tangent_v = [x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12) 
+                                    for x in (tangent_u, tangent_v)]
+        frames[:, 0, :3], frames[:, 2, :3] = (tangent_u, tangent_v) if x_axis == 'u' else (tangent_v, tangent_u)
+        frames[:, 1, :3] = normal
+        frames[:, 3, :3] = values['p'] @ surface_world[:3, :3] + surface_world[3, :3]
+        frames[:, 3, 3] = 1.0
+        object_world = np.array([list(path.inclusiveMatrix()) for path in paths], dtype=np.float64).reshape(-1, 4, 4)
+        offsets = np.einsum('nij,njk->nik', object_world, np.linalg.inv(frames))
+
+    tra = ['X', 'Y', 'Z'] if translate else []
+    rot = ['X', 'Y', 'Z'] if rotate else []
+    # fourByFourMatrix rows, x, y, z vectors
+    rows = [('normalizedTangentU', 0), ('normalizedNormal', 1), ('normalizedTangentV', 2)]
+    if x_axis == 'v':
+        rows = [('normalizedTangentV', 0), ('normalizedNormal', 1), ('normalizedTangentU', 2)]
+
+    with omu.UndoableModifier(name='Constrain to surface') as modifier:
+        if mode == 'compact':
+            pin_fn = OpenMaya.MFnDependencyNode(modifier.createNode('uvPin'))
+            modifier.renameNode(pin_fn.object(), f'{surface_name.split("|")[-1]}_uvPin')
+            modifier.connect(world_space_plug, pin_fn.findPlug('deformedGeometry', False))
+            # Normal on Y, u tangent on X or Z. closestPointOnSurface outputs raw parameters
+            modifier.newPlugValueBool(pin_fn.findPlug('normalizedIsoParms', False), not return_pos)
+            modifier.newPlugValueInt(pin_fn.findPlug('normalAxis', False), 1)
+            modifier.newPlugValueInt(pin_fn.findPlug('tangentAxis', False), 0 if x_axis == 'u' else 2)
+            coordinate_plug = pin_fn.findPlug('coordinate', False)
+            output_plug = pin_fn.findPlug('outputMatrix', False)
+
+        attach_nodes = []
+        pos_nodes = []
+        for i, (obj, path, obj_fn) in enumerate(zip(objects, paths, fns)):
+            name = obj.split('|')[-1]
+            if mode == 'compact':
+                coordinate = coordinate_plug.elementByLogicalIndex(i)
+                param_plugs = [coordinate.child(pin_fn.attribute(f'coordinate{x}')) for x in 'UV']
+                source_plug = output_plug.elementByLogicalIndex(i)
+                attach_nodes.append(pin_fn)
+            else:
+                info_fn = OpenMaya.MFnDependencyNode(modifier.createNode('pointOnSurfaceInfo'))
+                matrix_fn = OpenMaya.MFnDependencyNode(modifier.createNode('fourByFourMatrix'))
+                modifier.renameNode(info_fn.object(), f'{name}pos_info_node')
+                modifier.renameNode(matrix_fn.object(), f'{name}posMat')
+                modifier.connect(world_space_plug, info_fn.findPlug('inputSurface', False))
+                for attr, row in rows:
+                    for column, axis in enumerate('XYZ'):
+                        modifier.connect(info_fn.findPlug(f'{attr}{axis}', False), 
+                                         matrix_fn.findPlug(f'in{row}{column}', False))
+                for column, axis in enumerate('XYZ'):
+                    modifier.connect(info_fn.findPlug(f'position{axis}', False), 
+                                     matrix_fn.findPlug(f'in3{column}', False))
+                param_plugs = [info_fn.findPlug(f'parameter{x}', False) for x in 'UV']
+                source_plug = matrix_fn.findPlug('output', False)
+                attach_nodes.append(info_fn)
+
+            mult_fn = OpenMaya.MFnDependencyNode(modifier.createNode('multMatrix'))
+            decomp_fn = OpenMaya.MFnDependencyNode(modifier.createNode('decomposeMatrix'))
+            modifier.renameNode(mult_fn.object(), f'{name}_multMatrix_pm_rigUParCon')
+            modifier.renameNode(decomp_fn.object(), f'{name}_matrixDecomp_pm_rigUParCon')
+
+            if return_pos:
+                pos_fn = OpenMaya.MFnDependencyNode(modifier.createNode('closestPointOnSurface'))
+                modifier.renameNode(pos_fn.object(), f'{name}pos_node')
+                modifier.connect(world_space_plug, pos_fn.findPlug('inputSurface', False))
+                if world_space:
+                    world_fn = OpenMaya.MFnDependencyNode(modifier.createNode('decomposeMatrix'))
+                    modifier.renameNode(world_fn.object(), f'{name}_world_pos')
+                    modifier.connect(obj_fn.findPlug('worldMatrix', False).elementByLogicalIndex(0), 
+                                     world_fn.findPlug('inputMatrix', False))
+                    modifier.connect(world_fn.findPlug('outputTranslate', False), pos_fn.findPlug('inPosition', False))
+                else:
+                    modifier.connect(obj_fn.findPlug('translate', False), pos_fn.findPlug('inPosition', False))
+                for attr, param_plug in zip(['parameterU', 'parameterV'], param_plugs):
+                    modifier.connect(pos_fn.findPlug(attr, False), param_plug)
+                pos_nodes.append(pos_fn)
+            else:
+                # Guides with U, V attributes drive the parameters as 0-1 percentages
+                uv_attrs = [x for x in 'UV' if obj_fn.hasAttribute(x)]
+                values = (u[i], v[i])
+                if mode == 'compact':
+                    values = (u_normalized[i], v_normalized[i])
+                elif uv_attrs:
+                    modifier.newPlugValueBool(info_fn.findPlug('turnOnPercentage', False), True)
+                    values = (u_normalized[i], v_normalized[i])
+                for attr, value, param_plug in zip('UV', values, param_plugs):
+                    if attr in uv_attrs:
+                        modifier.newPlugValueDouble(obj_fn.findPlug(attr, False), float(value))
+                        modifier.connect(obj_fn.findPlug(attr, False), param_plug)
+                    else:
+                        modifier.newPlugValueDouble(param_plug, float(value))
+
+            matrix_in = mult_fn.findPlug('matrixIn', False)
+            index = 0
+            if offset:
+                offset_matrix = OpenMaya.MMatrix(offsets[i].ravel().tolist())
+                modifier.newPlugValueMMatrix(matrix_in.elementByLogicalIndex(0), offset_matrix)
+                index = 1
+            modifier.connect(source_plug, matrix_in.elementByLogicalIndex(index))
+            modifier.connect(obj_fn.findPlug('parentInverseMatrix', False).elementByLogicalIndex(0), 
+                             matrix_in.elementByLogicalIndex(index + 1))
+            modifier.connect(mult_fn.findPlug('matrixSum', False), decomp_fn.findPlug('inputMatrix', False))
+
+            for axis in tra:
+                modifier.connect(decomp_fn.findPlug(f'outputTranslate{axis}', False), 
+                                 obj_fn.findPlug(f'translate{axis}', False))
+            for axis in rot:
+                modifier.connect(decomp_fn.findPlug(f'outputRotate{axis}', False), 
+                                 obj_fn.findPlug(f'rotate{axis}', False))
+            if rotate and path.hasFn(OpenMaya.MFn.kJoint):
+                for axis in 'XYZ':
+                    modifier.newPlugValueMAngle(obj_fn.findPlug(f'jointOrient{axis}', False), OpenMaya.MAngle(0.0))
+
+        modifier.doIt()
+        set_attach_mode(surface_name, mode)
+
+    attach_nodes = [x.name() for x in attach_nodes]
+    if return_pos:
+        return list(zip([x.name() for x in pos_nodes], attach_nodes))
+
+    return attach_nodes
+
+def uv_pin_available():
+    '''
+    Checks for the uvPin node type, loading the matrixNodes plugin if needed (Maya 2020+)
+    '''
+
+    if 'uvPin' not in cmds.allNodeTypes():
+        try:
+            cmds.loadPlugin('matrixNodes', quiet=True)
+        except RuntimeError:
+            return False
+
+    return 'uvPin' in cmds.allNodeTypes()
+
+def get_attach_mode(surface_name, mode='auto'):
+    '''
+    Surface attachment mode for constrain_to_surface_matrix_batch()
+
+    surface_name = (str) Nurbs surface
+    mode         = (str) 'auto' = mode recorded on the surface, else 'matrix' so existing rigs keep their output.
+                   'compact' falls back to 'matrix' when uvPin is not available.
+                   Compact frames are orthonormal, with x_axis='u' their Z is -tangentV, matrix uses +tangentV.
+    '''
+
+    if mode not in ['auto'] + ATTACH_MODES:
+        raise ValueError(f'Attach mode must be auto, matrix or compact >> {mode}')
+
+    if mode == 'auto':
+        if cmds.attributeQuery(ATTACH_MODE_ATTR, node=surface_name, exists=True):
+            mode = cmds.getAttr(f'{surface_name}.{ATTACH_MODE_ATTR}')
+        if mode not in ATTACH_MODES:
+            mode = 'matrix'
+
+    if mode == 'compact' and not uv_pin_available():
+        LOG.warning(f'uvPin is not available, using the matrix attach mode >> {surface_name}')
+        mode = 'matrix'
+
+    return mode
+
+def set_attach_mode(surface_name, mode):
+    '''
+    Records the attachment mode on the surface, so rebuilds use the same network
+    '''
+
+    if not cmds.attributeQuery(ATTACH_MODE_ATTR, node=surface_name, exists=True):
+        cmds.addAttr(surface_name, ln=ATTACH_MODE_ATTR, dt='string')
+    cmds.setAttr(f'{surface_name}.{ATTACH_MODE_ATTR}', mode, type='string')
+
+def benchmark_attach_modes(count=500, frames=100, rows=10, new_scene=False):
+    '''
+    Compares evaluation time of the matrix and compact attachment networks on a strap like surface.
+    Builds count locators on a new surface per mode, animates the surface CVs and times playback
+    through frames in DG evaluation, pulling every locator world matrix each frame.
+    Works in new scenes, run it in mayapy or an empty session.
+
+    count     = (int) Number of pinned objects
+    frames    = (int) Frames evaluated per mode
+    rows      = (int) Guide rows on the surface
+    new_scene = (bol) Discard the current scene even if it has unsaved changes
+
+    Returns dict, mode: seconds per frame
+    '''
+
+    if not new_scene and cmds.file(q=True, modified=True):
+        raise RuntimeError('Scene has unsaved changes, save it or pass new_scene=True to discard it')
+
+    results = {}
+    for mode in ATTACH_MODES:
+        if mode == 'compact' and not uv_pin_available():
+            LOG.warning('uvPin is not available, skipping the compact benchmark')
+            continue
+
+        cmds.file(new=True, force=True)
+        columns = count // rows
+        surface = cmds.nurbsPlane(n=f'benchmark_{mode}_srf', ch=0, d=3, u=columns, v=rows, w=columns, 
+                                  lr=float(rows) / columns, ax=(0, 1, 0))[0]
+        surface_data = get_surface_data(surface)
+        u, v = np.meshgrid((np.arange(columns) + 0.5) / columns, (np.arange(rows) + 0.5) / rows)
+        u = surface_data.domain_u[0] + u.ravel() * (surface_data.domain_u[1] - surface_data.domain_u[0])
+        v = surface_data.domain_v[0] + v.ravel() * (surface_data.domain_v[1] - surface_data.domain_v[0])
+        locators = []
+        for i, position in enumerate(surface_data.points(u, v)):
+            locator = cmds.spaceLocator(n=f'benchmark_{i}_loc')[0]
+            cmds.xform(locator, ws=True, t=[float(x) for x in position])
+            locators.append(locator)
+
+        start = time.perf_counter()
+        constrain_to_surface_matrix_batch(locators, surface, mode=mode)
+        build = time.perf_counter() - start
+
+        # Wave every other CV so the surface changes each frame
+        surface_shape = omu.get_dag_path(surface, shape=1)
+        for i in range(0, surface_data.cvs.shape[0] * surface_data.cvs.shape[1], 2):
+            plug = f'{surface_shape}.controlPoints[{i}].yValue'
+            cmds.setKeyframe(plug, t=1, v=0)
+            cmds.setKeyframe(plug, t=frames // 2, v=1)
+            cmds.setKeyframe(plug, t=frames, v=0)
+
+        # DG evaluation, pulling every world matrix makes every pin evaluate each frame
+        evaluation_mode = cmds.evaluationManager(q=True, mode=True)[0]
+        cmds.evaluationManager(mode='off')
+        plugs = [f'{x}.worldMatrix[0]' for x in locators]
+        try:
+            start = time.perf_counter()
+            for frame in range(1, frames + 1):
+                cmds.currentTime(frame, update=False)
+                cmds.dgeval(plugs)
+            results[mode] = (time.perf_counter() - start) / frames
+        finally:
+            cmds.evaluationManager(mode=evaluation_mode)
+        LOG.info(f'{mode}: {count} pins, build {build:.3f}s, evaluation {results[mode] * 1000.0:.3f}ms per frame')
+
+    return results
@@ -0,0 +1,60 @@
+import importlib
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+
+# curves imports Maya and the rig packages at module level, the orient math itself only uses numpy
+pytest.importorskip('maya.cmds')
+pytest.importorskip('lib_python_velan')
+_PACKAGE = types.ModuleType('rigUtilsScripts')
+_PACKAGE.__path__ = [os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')]
+sys.modules.setdefault('rigUtilsScripts', _PACKAGE)
+crv = importlib.import_module('rigUtilsScripts.curves')
+
+
+@pytest.mark.parametrize('joint_axis', ['xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx'])
+def test_joint_orient_matrices_aim_and_up(joint_axis):
+    positions = np.array([[0.0, 0.0, 0.0], [1.0, 0.5, 0.0], [2.0, 0.5, 1.0], [3.0, 1.0, 1.0]])
+    matrices = crv.joint_orient_matrices(positions, joint_axis=joint_axis)
+    aim_axis, up_axis = ['xyz'.index(x) for x in joint_axis[:2]]
+
+    aim = np.diff(positions, axis=0)
+    assert np.allclose(matrices[:-1, aim_axis], aim / np.linalg.norm(aim, axis=1, keepdims=True))
+    # Secondary axis in the plane of aim and up, on the up side
+    assert np.all(matrices[:-1, up_axis, 1] > 0.0)
+    assert np.allclose(np.einsum('ij,ij->i', matrices[:-1, up_axis], np.cross(matrices[:-1, aim_axis], [0.0, 1.0, 0.0])),
+                       0.0)
+    # Orthonormal, right handed
+    assert np.allclose(matrices @ matrices.transpose(0, 2, 1), np.eye(3))
+    assert np.allclose(np.linalg.det(matrices), 1.0)
+    assert np.allclose(matrices[-1], matrices[-2])
+
+def test_joint_orient_matrices_aim_along_up():
+    positions = np.array([[0.0, 0.0, 0.0], [0.0, 2.0, 0.0], [0.0, 3.0, 0.0]])
+    matrices = crv.joint_orient_matrices(positions)
+
+    assert np.allclose(matrices[:, 0], [0.0, 1.0, 0.0])
+    assert np.allclose(matrices @ matrices.transpose(0, 2, 1), np.eye(3))
+
+def test_joint_orient_matrices_none():
+    matrices = crv.joint_orient_matrices(np.random.default_rng(0).normal(size=(4, 3)), joint_axis='none')
+
+    assert np.allclose(matrices, np.eye(3))
+
+def test_matrix_to_euler_xyz_round_trip():
+    matrices = crv.joint_orient_matrices([[0.0, 0.0, 0.0], [1.0, 2.0, 0.5], [1.5, 2.5, 2.0]])
+    x, y, z = crv.matrix_to_euler_xyz(matrices).T
+
+    # Row vector convention, rotate x then y then z
+    rotate_x = np.stack([np.stack([np.ones_like(x), 0 * x, 0 * x], -1), np.stack([0 * x, np.cos(x), np.sin(x)], -1),
+                         np.stack([0 * x, -np.sin(x), np.cos(x)], -1)], 1)
+    rotate_y = np.stack([np.stack([np.cos(y), 0 * y, -np.sin(y)], -1), np.stack([0 * y, np.ones_like(y), 0 * y], -1),
+                         np.stack([np.sin(y), 0 * y, np.cos(y)], -1)], 1)
+    rotate_z = np.stack([np.stack([np.cos(z), np.sin(z), 0 * z], -1), np.stack([-np.sin(z), np.cos(z), 0 * z], -1),
+                         np.stack([0 * z, 0 * z, np.ones_like(z)], -1)], 1)
+
+    assert np.allclose(rotate_x @ rotate_y @ rotate_z, matrices)
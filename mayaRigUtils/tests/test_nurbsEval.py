@@ -0,0 +1,115 @@
+import importlib
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+
+# nurbsEval and spatialGrid only need numpy, load them as a package without Maya
+_PACKAGE = types.ModuleType('rigUtilsScripts')
+_PACKAGE.__path__ = [os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')]
+sys.modules.setdefault('rigUtilsScripts', _PACKAGE)
+nev = importlib.import_module('rigUtilsScripts.nurbsEval')
+
+
+def _plane():
+    '''
+    Flat 1 x 2 cubic Bezier plane, evenly spaced CVs so (u, v) = (x, y / 2)
+    '''
+
+    steps = np.linspace(0.0, 1.0, 4)
+    cvs = np.zeros((4, 4, 3))
+    cvs[..., 0] = steps[:, None]
+    cvs[..., 1] = 2.0 * steps[None, :]
+
+    return nev.NurbsSurface(cvs, [0, 0, 0, 1, 1, 1], [0, 0, 0, 1, 1, 1], 3, 3)
+
+def _cylinder(radius=2.0, height=3.0):
+    '''
+    Rational quadratic circle in u, closed by a coincident seam, linear along z in v
+    '''
+
+    circle = np.array([[1, 0], [1, 1], [0, 1], [-1, 1], [-1, 0], [-1, -1], [0, -1], [1, -1], [1, 0]], dtype=np.float64)
+    weights = np.tile([1.0, np.sqrt(0.5)], 5)[:9]
+    cvs = np.zeros((9, 2, 3))
+    cvs[..., :2] = radius * circle[:, None, :]
+    cvs[:, 1, 2] = height
+
+    return nev.NurbsSurface(cvs, [0, 0, 1, 1, 2, 2, 3, 3, 4, 4], [0, 1], 2, 1, 
+                            weights=np.repeat(weights[:, None], 2, axis=1))
+
+def _wavy():
+    rng = np.random.default_rng(1)
+    steps = np.linspace(0.0, 1.0, 5)
+    cvs = np.zeros((5, 5, 3))
+    cvs[..., 0] = steps[:, None]
+    cvs[..., 1] = steps[None, :]
+    cvs[..., 2] = rng.normal(scale=0.3, size=(5, 5))
+    knots = [0, 0, 0, 0.5, 1, 1, 1]
+
+    return nev.NurbsSurface(cvs, knots, knots, 3, 3)
+
+
+@pytest.mark.parametrize('point, expected', [
+    ((0.3, 0.8, 0.5), (0.3, 0.4)),
+    ((1.5, 0.6, 0.2), (1.0, 0.3)),
+    ((-0.7, 1.4, -0.3), (0.0, 0.7)),
+    ((0.6, 2.9, 0.1), (0.6, 1.0)),
+    ((0.2, -1.0, 0.4), (0.2, 0.0)),
+    ((1.4, 2.5, 0.0), (1.0, 1.0)),
+    ((-0.5, -0.5, 1.0), (0.0, 0.0)),
+])
+def test_plane_closest_params(point, expected):
+    u, v = _plane().closest_params([point])
+
+    assert np.allclose([u[0], v[0]], expected, atol=1e-8)
+
+@pytest.mark.parametrize('angle, z', [(0.4, 1.2), (2.5, -1.5), (4.0, 4.5), (5.9, 3.0), (np.pi, 0.0)])
+@pytest.mark.parametrize('distance', [0.5, 3.0])
+def test_cylinder_closest_points(angle, z, distance):
+    surface = _cylinder()
+    point = np.array([[distance * np.cos(angle), distance * np.sin(angle), z]])
+    expected = np.array([2.0 * np.cos(angle), 2.0 * np.sin(angle), np.clip(z, 0.0, 3.0)])
+
+    u, v, closest, _ = surface.closest_points(point)
+
+    assert np.allclose(closest[0], expected, atol=1e-6)
+    assert np.isclose(v[0], np.clip(z, 0.0, 3.0) / 3.0, atol=1e-8)
+
+def test_closest_params_past_open_edges_match_brute_force():
+    surface = _wavy()
+    points = np.array([[1.3, 0.3, 0.2], [-0.4, 0.6, -0.1], [0.4, 1.5, 0.3], [0.7, -0.3, 0.0], 
+                       [1.2, 1.2, 0.4], [1.1, 0.8, -0.5], [0.5, 0.5, 1.5]])
+    u, v, _, distance = surface.closest_points(points)
+
+    grid_u, grid_v = np.meshgrid(np.linspace(0, 1, 801), np.linspace(0, 1, 801), indexing='ij')
+    samples = surface.points(grid_u.ravel(), grid_v.ravel())
+    for i, point in enumerate(points):
+        sample_distance = np.linalg.norm(samples - point, axis=1)
+        best = np.argmin(sample_distance)
+        assert distance[i] <= sample_distance[best] + 1e-9
+        assert np.allclose([u[i], v[i]], [grid_u.ravel()[best], grid_v.ravel()[best]], atol=2.5e-3)
+
+def test_surface_points_and_normals_on_cylinder():
+    surface = _cylinder()
+    u, v = np.meshgrid(np.linspace(0, 4, 9), np.linspace(0, 1, 3), indexing='ij')
+    points = surface.points(u.ravel(), v.ravel())
+    normals = surface.normals(u.ravel(), v.ravel())
+
+    assert np.allclose(np.linalg.norm(points[:, :2], axis=1), 2.0)
+    assert np.allclose(np.abs(np.einsum('ij,ij->i', normals[:, :2], points[:, :2] / 2.0)), 1.0)
+    assert np.allclose(normals[:, 2], 0.0)
+
+def test_circle_closest_points():
+    circle = np.array([[1, 0], [1, 1], [0, 1], [-1, 1], [-1, 0], [-1, -1], [0, -1], [1, -1], [1, 0]], dtype=np.float64)
+    cvs = np.zeros((9, 3))
+    cvs[:, :2] = circle
+    curve = nev.NurbsCurve(cvs, [0, 0, 1, 1, 2, 2, 3, 3, 4, 4], 2, weights=np.tile([1.0, np.sqrt(0.5)], 5)[:9])
+
+    angles = np.linspace(0.0, 2.0 * np.pi, 13)
+    points = np.stack((3.0 * np.cos(angles), 3.0 * np.sin(angles), np.ones_like(angles)), axis=1)
+    _, closest, _ = curve.closest_points(points)
+
+    assert np.allclose(closest, np.stack((np.cos(angles), np.sin(angles), np.zeros_like(angles)), axis=1), atol=1e-8)
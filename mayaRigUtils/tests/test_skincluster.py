@@ -0,0 +1,126 @@
+import importlib
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+
+# skincluster imports Maya at module level, the weight kernels themselves only use numpy
+pytest.importorskip('maya.cmds')
+_PACKAGE = types.ModuleType('rigUtilsScripts')
+_PACKAGE.__path__ = [os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')]
+sys.modules.setdefault('rigUtilsScripts', _PACKAGE)
+skn = importlib.import_module('rigUtilsScripts.skincluster')
+
+
+def _strip(count=6):
+    '''
+    Row of count quads (2 x (count + 1) vertices), polygon counts and connects in MFnMesh.getVertices() layout
+    '''
+
+    bottom = np.arange(count + 1)
+    top = bottom + count + 1
+    connects = np.stack((bottom[:-1], bottom[1:], top[1:], top[:-1]), axis=1).ravel()
+
+    return [4] * count, connects, 2 * (count + 1)
+
+def _neighbours(indptr, indices, point):
+    return sorted(indices[indptr[point]:indptr[point + 1]].tolist())
+
+
+def test_mesh_adjacency_strip():
+    counts, connects, vertex_count = _strip(2)
+    indptr, indices = skn.mesh_adjacency(counts, connects, vertex_count)
+
+    assert len(indptr) == vertex_count + 1
+    assert _neighbours(indptr, indices, 0) == [1, 3]
+    assert _neighbours(indptr, indices, 1) == [0, 2, 4]
+    assert _neighbours(indptr, indices, 4) == [1, 3, 5]
+    # Symmetric, no duplicated edges
+    pairs = set(zip(np.repeat(np.arange(vertex_count), np.diff(indptr)).tolist(), indices.tolist()))
+    assert len(pairs) == len(indices)
+    assert all((b, a) in pairs for a, b in pairs)
+
+def test_limit_keeps_largest_and_locked():
+    matrix = np.array([[0.5, 0.3, 0.15, 0.05], [0.1, 0.2, 0.3, 0.4]])
+    weights = skn.SkinWeights.from_dense(matrix, ['a', 'b', 'c', 'd'], locked=[False, False, False, True])
+
+    dense = weights.limit(2).to_dense()
+
+    assert np.allclose(dense, [[0.5, 0.3, 0.0, 0.05], [0.0, 0.0, 0.3, 0.4]])
+
+def test_normalize_keeps_locked_weights():
+    matrix = np.array([[0.2, 0.2, 0.4], [1.0, 1.0, 0.0], [0.0, 0.0, 0.5]])
+    weights = skn.SkinWeights.from_dense(matrix, ['a', 'b', 'c'], locked=[False, False, True])
+
+    dense = weights.normalize().to_dense()
+
+    assert np.allclose(dense, [[0.3, 0.3, 0.4], [0.5, 0.5, 0.0], [0.0, 0.0, 0.5]])
+
+def test_smooth_blends_neighbours_and_normalizes():
+    counts, connects, vertex_count = _strip()
+    indptr, indices = skn.mesh_adjacency(counts, connects, vertex_count)
+    # Hard split between the left and right half of the strip
+    column = np.tile(np.arange(7), 2)
+    matrix = np.stack((column < 3, column >= 3), axis=1).astype(np.float64)
+    weights = skn.SkinWeights.from_dense(matrix, ['left', 'right'])
+
+    dense = weights.smooth(indptr, indices, iterations=2, strength=0.5).to_dense()
+
+    assert np.allclose(dense.sum(axis=1), 1.0)
+    assert np.allclose(dense[:, 0], dense[:, 0].reshape(2, 7)[[0, 0]].ravel())
+    assert 0.0 < dense[2, 0] < 1.0 and 0.0 < dense[3, 1] < 1.0
+    assert np.all(np.diff(dense[:7, 0]) <= 1e-12)
+
+def test_smooth_mask_and_locked_influence():
+    counts, connects, vertex_count = _strip()
+    indptr, indices = skn.mesh_adjacency(counts, connects, vertex_count)
+    rng = np.random.default_rng(0)
+    matrix = rng.uniform(0.1, 1.0, (vertex_count, 3))
+    matrix[:, 2] = 0.2
+    matrix[:, :2] *= 0.8 / matrix[:, :2].sum(axis=1, keepdims=True)
+    mask = np.zeros(vertex_count)
+    mask[3] = 1.0
+    weights = skn.SkinWeights.from_dense(matrix, ['a', 'b', 'c'], locked=[False, False, True])
+
+    dense = weights.smooth(indptr, indices, iterations=3, mask=mask).to_dense()
+
+    assert np.allclose(dense[:, 2], 0.2)
+    assert np.allclose(np.delete(dense, 3, axis=0), np.delete(matrix, 3, axis=0))
+    assert not np.allclose(dense[3], matrix[3])
+    assert np.allclose(dense.sum(axis=1), 1.0)
+
+def test_smooth_rejects_other_topology():
+    indptr, indices = skn.mesh_adjacency(*_strip(2))
+    weights = skn.SkinWeights.from_dense(np.ones((3, 1)), ['a'])
+
+    with pytest.raises(IndexError):
+        weights.smooth(indptr, indices)
+
+def test_topological_symmetry_fills_unmatched():
+    counts, connects, vertex_count = _strip()
+    indptr, indices = skn.mesh_adjacency(counts, connects, vertex_count)
+    column = np.tile(np.arange(7), 2)
+    points = np.stack((column - 3.0, np.repeat([0.0, 1.0], 7), np.zeros(vertex_count)), axis=1)
+    # Slightly asymmetric, so position matching alone fails on the left side
+    points[[0, 1, 7, 8], 1] += 0.05
+    mirrored = points * [-1.0, 1.0, 1.0]
+    expected = np.concatenate((6 - np.arange(7), 13 - np.arange(7)))
+
+    symmetry = expected.copy()
+    symmetry[[0, 1, 7, 8, 12, 13]] = -1
+    skn._topological_symmetry(symmetry, points, mirrored, indptr, indices)
+
+    assert np.array_equal(symmetry, expected)
+
+def test_topological_symmetry_leaves_isolated_points():
+    indptr, indices = skn.mesh_adjacency(*_strip(1))
+    indptr = np.concatenate((indptr, [indptr[-1]]))
+    points = np.array([[-1.0, 0.0, 0.0], [1.0, 0.0, 0.0], [-1.0, 1.0, 0.0], [1.0, 1.0, 0.0], [0.0, 5.0, 0.0]])
+    symmetry = np.array([1, 0, 3, -1, -1])
+
+    skn._topological_symmetry(symmetry, points, points * [-1.0, 1.0, 1.0], indptr, indices)
+
+    assert np.array_equal(symmetry, [1, 0, 3, 2, -1])
@@ -0,0 +1,80 @@
+import importlib
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+
+# spatialGrid only needs numpy, load it as a package without Maya
+_PACKAGE = types.ModuleType('rigUtilsScripts')
+_PACKAGE.__path__ = [os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')]
+sys.modules.setdefault('rigUtilsScripts', _PACKAGE)
+sg = importlib.import_module('rigUtilsScripts.spatialGrid')
+
+
+def _grid_mesh(count=12):
+    '''
+    Wavy count x count vertex grid over the unit square, two triangles per quad
+    '''
+
+    x, y = np.meshgrid(np.linspace(0.0, 1.0, count), np.linspace(0.0, 1.0, count), indexing='ij')
+    points = np.stack((x.ravel(), y.ravel(), 0.1 * np.sin(6.0 * x.ravel())), axis=1)
+    i, j = np.meshgrid(np.arange(count - 1), np.arange(count - 1), indexing='ij')
+    a = (i * count + j).ravel()
+    triangles = np.concatenate((np.stack((a, a + 1, a + count), axis=1),
+                                np.stack((a + 1, a + count + 1, a + count), axis=1)))
+
+    return points, triangles
+
+def _brute_closest(queries, points, triangles):
+    corners = points[triangles]
+    distance = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        repeated = np.repeat(query[None], len(triangles), axis=0)
+        distance[i] = sg.closest_point_on_triangles(repeated, corners[:, 0], corners[:, 1], corners[:, 2])[1].min()
+
+    return distance
+
+
+def test_point_grid_nearest_matches_brute_force():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-1.0, 1.0, (500, 3))
+    queries = np.concatenate((rng.uniform(-1.0, 1.0, (200, 3)), rng.uniform(-10.0, 10.0, (20, 3))))
+
+    index, distance = sg.PointGrid(points).nearest(queries)
+
+    brute = np.linalg.norm(queries[:, None] - points[None], axis=2)
+    assert np.allclose(distance, brute.min(axis=1))
+    assert np.allclose(np.linalg.norm(points[index] - queries, axis=1), distance)
+
+def test_closest_point_on_mesh_matches_brute_force():
+    rng = np.random.default_rng(1)
+    points, triangles = _grid_mesh()
+    # Long thin triangle whose vertices are far from the queries above its middle, and an isolated vertex
+    points = np.concatenate((points, [[-1.0, 0.5, 1.0], [2.0, 0.5, 1.0], [0.5, 0.52, 1.0], [0.5, 0.5, 0.5]]))
+    count = len(points)
+    triangles = np.concatenate((triangles, [[count - 4, count - 3, count - 2]]))
+    queries = np.concatenate((rng.uniform(-0.2, 1.2, (300, 3)), rng.uniform(-20.0, 20.0, (20, 3)),
+                              [[0.5, 0.51, 1.05], [0.5, 0.5, 0.55]]))
+
+    triangle, bary, distance = sg.closest_point_on_mesh(queries, points, triangles)
+
+    assert np.all(triangle >= 0)
+    assert np.allclose(distance, _brute_closest(queries, points, triangles))
+    closest = np.einsum('qk,qkm->qm', bary, points[triangles[triangle]])
+    assert np.allclose(np.linalg.norm(closest - queries, axis=1), distance)
+    assert triangle[-2] == len(triangles) - 1
+
+def test_closest_point_on_mesh_reuses_grid():
+    points, triangles = _grid_mesh()
+    grid = sg.TriangleGrid(points, triangles)
+    queries = np.array([[0.3, 0.4, 0.5], [0.9, 0.1, -0.5]])
+
+    assert np.allclose(sg.closest_point_on_mesh(queries, points, triangles, grid)[2],
+                       _brute_closest(queries, points, triangles))
+
+def test_triangle_grid_needs_triangles():
+    with pytest.raises(ValueError):
+        sg.TriangleGrid(np.zeros((3, 3)), np.zeros((0, 3), dtype=np.int64))